@@ -1,9 +1,23 @@
 import streamlit as st
-import requests
 import json
 import time
-from typing import Dict, List, Optional
-import re
+import uuid
+
+from budget import ARTICLE_WORD_LIMIT
+from clinics import CLINICS
+from completion_cache import get_cache
+from dedup import get_dedup_index
+from drafts import ArticleDraft
+from http_pool import PoolConfig, pool_stats
+from errors import ProviderError
+from failover import get_router
+from jobs import ArticleJob, get_job_queue
+from library import get_library
+from providers import API_KEY_ENV, PROVIDER_NAMES
+from rate_limit import scheduler_stats
+from research import GOOGLE_SEARCH_ENDPOINT, SEARCH_ENDPOINT, ResearchConfig, ResearchError, Researcher
+from routing import ROUTING_PRESETS, preset_policy, route_report, trace_cost
+from writer import ArticleWriter
 
 # Konfiguracja strony
 st.set_page_config(
@@ -12,271 +26,6 @@ st.set_page_config(
     layout="wide"
 )
 
-# Stałe konfiguracyjne
-CLINICS = {
-    "Klinika Hospittal": {
-        "nazwa": "Klinika Hospittal",
-        "opis": "innowacyjny szpital chirurgii plastycznej łączący najwyższe standardy medyczne z dbałością o naturalne efekty",
-        "specjalizacje": ["chirurgia plastyczna", "chirurgia rekonstrukcyjna", "medycyna estetyczna", "zabiegi estetyczne"]
-    },
-    "Centrum Medyczne Gunarys": {
-        "nazwa": "Centrum Medyczne Gunarys",
-        "opis": "nowoczesna klinika oferująca kompleksową opiekę medyczną z indywidualnym podejściem do każdego pacjenta",
-        "specjalizacje": ["chirurgia estetyczna", "ginekologia", "laseroterapia", "medycyna estetyczna", "blefaroplastyka", "profilaktyka zdrowotna"]
-    },
-    "Klinika Ambroziak": {
-        "nazwa": "Klinika Ambroziak",
-        "opis": "klinika z ponad 20-letnim doświadczeniem wyznaczająca trendy dermatologii klinicznej i estetycznej w Polsce",
-        "specjalizacje": ["dermatologia kliniczna", "dermatologia estetyczna", "medycyna estetyczna", "kosmetologia", "autorskie kosmetyki Dr Ambroziak Laboratorium"]
-    }
-}
-
-class ArticleWriter:
-    def __init__(self):
-        self.api_key = None
-        self.model_provider = "claude"
-        self.outline = []
-        self.title = ""
-        self.article_content = ""
-        
-    def set_config(self, api_key: str, model_provider: str):
-        self.api_key = api_key
-        self.model_provider = model_provider
-    
-    def call_api(self, messages: List[Dict], max_tokens: int = 2000) -> str:
-        """Wywołuje odpowiednie API w zależności od wybranego modelu"""
-        if not self.api_key:
-            return "Błąd: Brak klucza API"
-        
-        try:
-            if self.model_provider == "claude":
-                return self._call_claude(messages, max_tokens)
-            elif self.model_provider == "openai":
-                return self._call_openai(messages, max_tokens)
-            elif self.model_provider == "deepseek":
-                return self._call_deepseek(messages, max_tokens)
-            else:
-                return "Błąd: Nieznany model"
-                
-        except Exception as e:
-            return f"Błąd API: {str(e)}"
-    
-    def _call_claude(self, messages: List[Dict], max_tokens: int) -> str:
-        """Wywołuje API Claude Sonnet 4"""
-        headers = {
-            'Content-Type': 'application/json',
-            'x-api-key': self.api_key,
-            'anthropic-version': '2023-06-01'
-        }
-        
-        data = {
-            'model': 'claude-sonnet-4-20250514',
-            'max_tokens': max_tokens,
-            'messages': messages
-        }
-        
-        response = requests.post(
-            'https://api.anthropic.com/v1/messages',
-            headers=headers,
-            json=data
-        )
-        
-        response.raise_for_status()
-        result = response.json()
-        
-        if 'content' in result and len(result['content']) > 0:
-            return result['content'][0]['text']
-        else:
-            return "Błąd: Brak odpowiedzi od API"
-    
-    def _call_openai(self, messages: List[Dict], max_tokens: int) -> str:
-        """Wywołuje API OpenAI"""
-        headers = {
-            'Content-Type': 'application/json',
-            'Authorization': f'Bearer {self.api_key}'
-        }
-        
-        data = {
-            'model': 'gpt-4o',
-            'messages': messages,
-            'max_tokens': max_tokens,
-            'temperature': 0.7
-        }
-        
-        response = requests.post(
-            'https://api.openai.com/v1/chat/completions',
-            headers=headers,
-            json=data
-        )
-        
-        response.raise_for_status()
-        result = response.json()
-        
-        if 'choices' in result and len(result['choices']) > 0:
-            return result['choices'][0]['message']['content']
-        else:
-            return "Błąd: Brak odpowiedzi od API"
-    
-    def _call_deepseek(self, messages: List[Dict], max_tokens: int) -> str:
-        """Wywołuje API DeepSeek"""
-        headers = {
-            'Content-Type': 'application/json',
-            'Authorization': f'Bearer {self.api_key}'
-        }
-        
-        data = {
-            'model': 'deepseek-chat',
-            'messages': messages,
-            'max_tokens': max_tokens,
-            'temperature': 0.7
-        }
-        
-        response = requests.post(
-            'https://api.deepseek.com/v1/chat/completions',
-            headers=headers,
-            json=data
-        )
-        
-        response.raise_for_status()
-        result = response.json()
-        
-        if 'choices' in result and len(result['choices']) > 0:
-            return result['choices'][0]['message']['content']
-        else:
-            return "Błąd: Brak odpowiedzi od API"
-    
-    def create_outline(self, topic: str, clinic: str, context: str = "") -> Dict[str, any]:
-        """Tworzy tytuł i konspekt artykułu"""
-        clinic_info = CLINICS.get(clinic, {})
-        
-        context_section = f"\nDodatkowy kontekst: {context}" if context else ""
-        
-        prompt = f"""Stwórz tytuł i zwięzły konspekt artykułu na temat: "{topic}"{context_section}
-
-WAŻNE: Artykuł ma być krótki - maksymalnie 800 słów, więc konspekt musi być zwięzły!
-
-Wymagania:
-1. Artykuł ma być merytoryczny, ale przystępny i lifestyleowy
-2. Musi zawierać subtelną wzmiankę o klinice: {clinic_info.get('nazwa', clinic)}
-3. Konspekt powinien składać się z 4-5 głównych punktów (śródtytułów) - NIE WIĘCEJ!
-4. Każdy punkt powinien być konkretny i interesujący
-5. Nie używaj słów "kluczowy", "innowacyjny", "nowoczesny"
-6. Tytuł ma być chwytliwy i intrygujący
-7. Naturalny zapis jak w zdaniu.
-
-Zwróć w formacie:
-TYTUŁ: [tutaj tytuł artykułu]
-
-ŚRÓDTYTUŁY:
-1. Tytuł pierwszego punktu
-2. Tytuł drugiego punktu
-etc.
-
-Pamiętaj - to ma być artykuł lifestyleowy, nie medyczny podręcznik!"""
-
-        messages = [{"role": "user", "content": prompt}]
-        response = self.call_api(messages, 800)
-        
-        # Parsowanie odpowiedzi
-        lines = response.split('\n')
-        title = ""
-        outline = []
-        
-        for line in lines:
-            line = line.strip()
-            if line.startswith("TYTUŁ:"):
-                title = line.replace("TYTUŁ:", "").strip()
-            elif re.match(r'^\d+\.', line):
-                clean_line = re.sub(r'^\d+\.\s*', '', line)
-                if clean_line and len(clean_line) > 10:
-                    outline.append(clean_line)
-        
-        # Ograniczenie do maksymalnie 5 punktów
-        self.outline = outline[:5]
-        self.title = title
-        
-        return {"title": title, "outline": outline}
-    
-    def write_introduction(self, title: str, topic: str, outline: List[str], context: str = "") -> str:
-        """Pisze wstęp z hookiem"""
-        context_section = f"\nKontekst artykułu: {context}" if context else ""
-        
-        prompt = f"""Napisz krótki, chwytliwy wstęp do artykułu o tytule: "{title}"
-Temat: {topic}{context_section}
-
-Konspekt artykułu:
-{chr(10).join([f"- {point}" for point in outline])}
-
-Wymagania:
-1. MAKSYMALNIE 2-3 zdania (około 50-80 słów)
-2. Zaczynamy od ciekawego hooka - faktu, pytania retorycznego lub zaskakującej informacji
-3. Naturalny, lifestyleowy ton
-4. Bez zwracania się bezpośrednio do czytelnika (bez "Ci", "Twój", "Ciebie")
-5. Bez metafor i sztucznych sformułowań AI
-6. Ma płynnie wprowadzać w temat artykułu
-
-Napisz tylko wstęp, bez żadnych dodatkowych komentarzy."""
-
-        messages = [{"role": "user", "content": prompt}]
-        return self.call_api(messages, 500)
-    
-    def write_section(self, section_title: str, section_index: int, 
-                     title: str, topic: str, clinic: str, outline: List[str], 
-                     written_content: str, context: str = "") -> str:
-        """Pisze pojedynczą sekcję artykułu"""
-        clinic_info = CLINICS.get(clinic, {})
-        
-        # Co już napisano
-        previous_sections = outline[:section_index]
-        current_section = outline[section_index]
-        remaining_sections = outline[section_index + 1:]
-        
-        # Sprawdzenie, czy to odpowiednie miejsce na wzmiankę o klinice
-        should_mention_clinic = (section_index == len(outline) // 2 or 
-                               section_index == len(outline) - 1)
-        
-        clinic_instruction = ""
-        if should_mention_clinic:
-            clinic_instruction = f"""
-WAŻNE: W tej sekcji umieść subtelną wzmiankę o {clinic_info.get('nazwa', clinic)} - {clinic_info.get('opis', '')}. 
-Wzmianka powinna być naturalna i pasować do kontekstu.
-Specjalizacje kliniki: {', '.join(clinic_info.get('specjalizacje', []))}
-"""
-
-        context_section = f"\nKontekst artykułu: {context}" if context else ""
-
-        prompt = f"""Napisz treść sekcji "{section_title}" dla artykułu o tytule: "{title}"
-Temat główny: {topic}{context_section}
-
-Informacje o strukturze:
-- Już napisane sekcje: {previous_sections if previous_sections else 'tylko wstęp'}
-- Obecna sekcja: {current_section}
-- Pozostałe sekcje: {remaining_sections if remaining_sections else 'to ostatnia sekcja'}
-
-Fragment tego, co już napisano (koniec):
-{written_content[-400:] if len(written_content) > 400 else written_content}
-
-{clinic_instruction}
-
-WAŻNE OGRANICZENIA:
-- Ta sekcja powinna mieć 150-250 słów (2-3 krótkie akapity)
-- NIE powtarzaj informacji z wcześniejszych sekcji
-- Bądź konkretny i podawaj praktyczne informacje
-
-Wymagania stylistyczne:
-1. Merytoryczna, ale przystępna treść, która jest ciekawa dla czytelnika
-2. Bez zwracania się do czytelnika (bez "Ci", "Twój")
-3. Naturalny, płynny język
-4. Możesz użyć wypunktowań, jeżeli to zasadne
-5. Pamiętaj o kontekście - co już było, co będzie
-
-Napisz tylko treść sekcji, bez tytułu i dodatkowych komentarzy."""
-
-        messages = [{"role": "user", "content": prompt}]
-        return self.call_api(messages, 800)
-    
-
-
 # Inicjalizacja aplikacji
 if 'writer' not in st.session_state:
     st.session_state.writer = ArticleWriter()
@@ -284,6 +33,15 @@ if 'writer' not in st.session_state:
 if 'generated_article' not in st.session_state:
     st.session_state.generated_article = ""
 
+# Identyfikator sesji trzymany w adresie strony - po odświeżeniu przeglądarki wracają zadania z tła
+if 'session_id' not in st.session_state:
+    st.session_state.session_id = st.query_params.get("sesja") or uuid.uuid4().hex[:12]
+    st.session_state.running_jobs = set()
+st.query_params["sesja"] = st.session_state.session_id
+
+# Każdy gotowy artykuł trafia do trwałej biblioteki (SQLite), także po zamknięciu sesji
+get_job_queue().set_library(get_library())
+
 # Interfejs użytkownika
 st.title("📝 Agent do Pisania Artykułów Sponsorowanych")
 st.markdown("---")
@@ -295,28 +53,89 @@ with st.sidebar:
     # Wybór modelu
     model_provider = st.selectbox(
         "🤖 Wybierz model językowy",
-        options=["claude", "openai", "deepseek"],
-        format_func=lambda x: {
-            "claude": "Claude Sonnet 4",
-            "openai": "GPT-4o", 
-            "deepseek": "DeepSeek Chat"
-        }[x]
+        options=list(PROVIDER_NAMES),
+        format_func=lambda x: PROVIDER_NAMES[x]
     )
     
     # Odpowiedni klucz API w zależności od modelu
-    api_key = ""
-    if model_provider == "claude":
-        api_key = st.secrets.get("ANTHROPIC_API_KEY", "") if hasattr(st, 'secrets') else ""
-        if not api_key:
-            api_key = st.text_input("Klucz API Anthropic", type="password")
-    elif model_provider == "openai":
-        api_key = st.secrets.get("OPENAI_API_KEY", "") if hasattr(st, 'secrets') else ""
-        if not api_key:
-            api_key = st.text_input("Klucz API OpenAI", type="password")
-    elif model_provider == "deepseek":
-        api_key = st.secrets.get("DEEPSEEK_API_KEY", "") if hasattr(st, 'secrets') else ""
-        if not api_key:
-            api_key = st.text_input("Klucz API DeepSeek", type="password")
+    key_labels = {"claude": "Anthropic", "openai": "OpenAI", "deepseek": "DeepSeek"}
+    api_key = st.secrets.get(API_KEY_ENV[model_provider], "") if hasattr(st, 'secrets') else ""
+    if not api_key:
+        api_key = st.text_input(f"Klucz API {key_labels[model_provider]}", type="password")
+    
+    # Zapasowi dostawcy (hedging)
+    fallback_keys = {}
+    with st.expander("🛟 Zapasowi dostawcy"):
+        fallbacks = st.multiselect(
+            "Gdy główny model zwleka lub nie działa, wyślij to samo zapytanie do:",
+            options=[p for p in PROVIDER_NAMES if p != model_provider],
+            format_func=lambda x: PROVIDER_NAMES[x],
+            help="Zapasowe zapytanie startuje, gdy główny dostawca nie odpowie w czasie swojego p95"
+        )
+        for fallback in fallbacks:
+            key = st.secrets.get(API_KEY_ENV[fallback], "") if hasattr(st, 'secrets') else ""
+            if not key:
+                key = st.text_input(f"Klucz API {PROVIDER_NAMES[fallback]}", type="password", key=f"fallback_key_{fallback}")
+            if key:
+                fallback_keys[fallback] = key
+    active_fallbacks = [p for p in fallbacks if p in fallback_keys]
+    router = get_router(active_fallbacks) if active_fallbacks else None
+    st.session_state.writer.set_fallbacks(fallback_keys, router)
+    
+    # Routing modeli - szybki model do prostych kroków, główny tam, gdzie liczy się jakość
+    with st.expander("🧭 Routing modeli"):
+        routing_preset = st.radio(
+            "Które kroki pisze model główny",
+            options=list(ROUTING_PRESETS),
+            format_func=lambda x: ROUTING_PRESETS[x],
+            help="Oszczędny: konspekt, wstęp i zwykłe sekcje pisze szybszy model, a sekcje ze wzmianką o klinice "
+                 "i poprawki - model główny. Szkic i rewizja: szkice szybszego modelu sprawdza i w razie "
+                 "potrzeby poprawia model główny. Czas i koszt tras są w tabeli „Czasy generowania”."
+        )
+    st.session_state.writer.set_routing(preset_policy(routing_preset, model_provider))
+    
+    # Ustawienia połączeń
+    with st.expander("🔌 Połączenia"):
+        pool_config = PoolConfig(
+            pool_size=int(st.number_input("Rozmiar puli połączeń", min_value=1, max_value=100, value=10)),
+            connect_timeout=float(st.number_input("Timeout połączenia (s)", min_value=1.0, max_value=60.0, value=5.0)),
+            read_timeout=float(st.number_input("Timeout odpowiedzi (s)", min_value=10.0, max_value=600.0, value=120.0))
+        )
+    
+    # Cache odpowiedzi
+    cache_enabled = st.checkbox(
+        "💾 Cache odpowiedzi",
+        value=True,
+        help="Identyczne zapytania (np. ponowne generowanie niezmienionego konspektu) są zwracane z dysku bez wywołania API"
+    )
+    st.session_state.writer.set_cache(get_cache() if cache_enabled else None)
+    
+    # Powtórzenia sekcji między artykułami (MinHash + LSH)
+    dedup_enabled = st.checkbox(
+        "🧬 Wykrywaj powtórzenia z innych artykułów",
+        value=True,
+        help="Każda napisana sekcja jest porównywana z sekcjami wcześniej wygenerowanych artykułów"
+    )
+    dedup_regenerate = st.checkbox(
+        "♻️ Przepisuj powtórzone sekcje",
+        disabled=not dedup_enabled,
+        help="Sekcja podobna do innego artykułu jest pisana jeszcze raz - jedno dodatkowe wywołanie API"
+    )
+    st.session_state.writer.set_dedup(get_dedup_index() if dedup_enabled else None, dedup_regenerate)
+    
+    # Research (Google Custom Search)
+    google_api_key = st.secrets.get("GOOGLE_API_KEY", "") if hasattr(st, 'secrets') else ""
+    google_cse_id = st.secrets.get("GOOGLE_CSE_ID", "") if hasattr(st, 'secrets') else ""
+    # Klucze Google są potrzebne tylko dla prawdziwej wyszukiwarki (SEARCH_ENDPOINT może wskazywać serwer testowy)
+    search_keys_needed = SEARCH_ENDPOINT == GOOGLE_SEARCH_ENDPOINT
+    with st.expander("🔎 Research"):
+        if not search_keys_needed:
+            st.caption(f"Wyszukiwarka: {SEARCH_ENDPOINT}")
+        if not google_api_key:
+            google_api_key = st.text_input("Klucz Google Search API", type="password")
+        if not google_cse_id:
+            google_cse_id = st.text_input("Custom Search Engine ID")
+        research_sources = int(st.number_input("Liczba źródeł", min_value=1, max_value=10, value=8))
     
     # Status API
     st.divider()
@@ -324,10 +143,41 @@ with st.sidebar:
     if api_key:
         st.success(f"✅ {model_provider.upper()} API aktywne")
         # Automatyczne ustawienie konfiguracji
-        st.session_state.writer.set_config(api_key, model_provider)
+        st.session_state.writer.set_config(api_key, model_provider, pool_config)
     else:
         st.error(f"❌ Brak klucza API dla {model_provider}")
     
+    if cache_enabled:
+        cache_stats = get_cache().stats()
+        st.caption(
+            f"💾 Cache: {cache_stats['hits']} trafień, {cache_stats['misses']} chybień, "
+            f"{cache_stats['entries']} wpisów ({cache_stats['bytes'] / 1024:.0f} KB)"
+        )
+    
+    for provider, stats in scheduler_stats().items():
+        if stats['retries'] or stats['waited'] >= 1:
+            st.caption(
+                f"⏳ {provider}: {stats['retries']} ponowień ({stats['rate_limited']}× limit 429), "
+                f"oczekiwanie w kolejce: {stats['waited']:.0f} s"
+            )
+    
+    if router is not None:
+        for provider, stats in router.stats().items():
+            p95 = f"{stats['p95']:.1f} s" if stats['p95'] is not None else "—"
+            state = {"closed": "✅", "open": "⛔", "half-open": "⚠️"}[stats['state']]
+            st.caption(f"🛟 {state} {provider}: p95 {p95}, wygrane: {stats['wins']} (hedging: {stats['hedged']}×)")
+    
+    job_stats = get_job_queue().stats()
+    if job_stats['queued'] or job_stats['running']:
+        st.caption(f"🧵 Zadania w tle: {job_stats['running']} w trakcie, {job_stats['queued']} w kolejce")
+    
+    for provider, stats in pool_stats().items():
+        st.caption(
+            f"🔌 {provider}: {stats['requests']} żądań, {stats['connections']} połączeń "
+            f"({stats['reused']} ponownie użytych), błędy: {stats['errors']}, "
+            f"śr. czas: {stats['avg_time']:.1f} s"
+        )
+    
     # Informacje o modelach
     st.divider()
     st.subheader("ℹ️ O modelach")
@@ -368,6 +218,30 @@ with col1:
     if clinic:
         clinic_info = CLINICS[clinic]
         st.info(f"**{clinic_info['nazwa']}** - {clinic_info['opis']}")
+    
+    # Research: źródła pobierane równolegle, każda sekcja dostaje fragmenty pasujące do jej śródtytułu
+    research = st.session_state.get("research")
+    if research is not None and research.topic != topic:
+        research = st.session_state.research = None
+    st.session_state.writer.set_research(research)
+    
+    research_ready = (google_api_key and google_cse_id) or not search_keys_needed
+    if st.button("🔎 Przeprowadź research", disabled=not topic or not research_ready):
+        with st.spinner("Szukam i pobieram źródła..."):
+            try:
+                researcher = Researcher(ResearchConfig(api_key=google_api_key, cse_id=google_cse_id,
+                                                       results_per_query=research_sources))
+                research = st.session_state.research = researcher.run(topic)
+                st.session_state.writer.set_research(research)
+            except ResearchError as e:
+                st.error(f"❌ Research nie powiódł się: {e}")
+    
+    if research is not None:
+        with st.expander(f"📚 Źródła ({len(research.sources)}, fragmentów: {research.passage_count})"):
+            for source in research.sources:
+                cached = " 💾" if source.cached else ""
+                st.markdown(f"- [{source.title or source.url}]({source.url}) — {source.status}, "
+                            f"fragmentów: {source.passages}{cached}")
 
 with col2:
     st.header("🔍 Generowanie")
@@ -376,10 +250,14 @@ with col2:
     if st.button("📝 Stwórz konspekt", disabled=not topic or not api_key):
         if topic and api_key:
             with st.spinner("Tworzę tytuł i konspekt artykułu..."):
-                result = st.session_state.writer.create_outline(topic, clinic, context)
-                st.session_state.writer.title = result["title"]
-                st.session_state.writer.outline = result["outline"]
-                st.success("✅ Konspekt gotowy!")
+                try:
+                    st.session_state.writer.trace.reset()
+                    result = st.session_state.writer.create_outline(topic, clinic, context)
+                    st.session_state.writer.title = result["title"]
+                    st.session_state.writer.outline = result["outline"]
+                    st.success("✅ Konspekt gotowy!")
+                except ProviderError as e:
+                    st.error(f"❌ Błąd API: {e}")
     
     # Wyświetlenie i edycja konspektu
     if st.session_state.writer.title or st.session_state.writer.outline:
@@ -438,45 +316,210 @@ if st.session_state.writer.outline and st.session_state.writer.title:
         for i, section in enumerate(st.session_state.writer.outline, 1):
             st.write(f"{i}. {section}")
     
+    stream_preview = st.checkbox(
+        "⚡ Podgląd na żywo (streaming)",
+        value=True,
+        help="Tekst pojawia się na bieżąco, w trakcie generowania kolejnych sekcji"
+    )
+    
+    col1, col2 = st.columns([1, 1])
+    with col1:
+        parallel_sections = st.checkbox(
+            "🔀 Równoległe generowanie sekcji",
+            help="Sekcje są pisane jednocześnie na podstawie konspektu - artykuł powstaje kilka razy szybciej"
+        )
+    with col2:
+        smooth_seams = st.checkbox(
+            "🪡 Wygładź przejścia między sekcjami",
+            value=True,
+            disabled=not parallel_sections,
+            help="Dodatkowe, krótkie wywołanie na każdą granicę sekcji"
+        )
+    
+    structured_engine = st.checkbox(
+        "🧩 Wstęp i sekcje jednym wywołaniem (JSON)",
+        help="Jedno zapytanie zamiast osobnego dla wstępu i każdej sekcji - sekcje pojawiają się, gdy są gotowe. "
+             "Opcje równoległości nie mają wtedy zastosowania."
+    )
+    
+    force_refresh = st.checkbox(
+        "🔄 Wygeneruj od nowa (pomiń cache)",
+        disabled=st.session_state.writer.cache is None,
+        help="Nowe odpowiedzi zamiast zapisanych w cache"
+    )
+    
+    # Regeneracja przyrostowa: niezmienione sekcje poprzedniej wersji są przenoszone bez wywołań API
+    previous_draft = None if force_refresh else st.session_state.get("article_draft")
+    if previous_draft is not None:
+        draft, plans = st.session_state.writer.plan_revision(
+            st.session_state.writer.title, topic, clinic, st.session_state.writer.outline, context, previous_draft
+        )
+        to_write = [plan for plan in plans if plan.reuse is None]
+        st.caption(
+            f"♻️ Do napisania: {'wstęp, ' if not draft.intro else ''}{len(to_write)} z {len(plans)} sekcji"
+            + "".join(f"\n- {plan.heading[:50]} ({plan.reason})" for plan in to_write)
+        )
+    
     if st.button("🚀 Wygeneruj pełny artykuł", type="primary"):
         if api_key and topic:
-            progress_bar = st.progress(0)
-            status_text = st.empty()
-            
-            # Rozpoczynamy od tytułu
-            full_article = f"# {st.session_state.writer.title}\n\n"
-            total_steps = len(st.session_state.writer.outline) + 1  # +1 dla wstępu
-            
-            # Generowanie wstępu
-            status_text.text("📝 Piszę wstęp...")
-            intro = st.session_state.writer.write_introduction(
-                st.session_state.writer.title, topic, 
-                st.session_state.writer.outline, context
+            st.session_state.writer.use_cache = not force_refresh
+            job = ArticleJob(
+                session_id=st.session_state.session_id, topic=topic, clinic=clinic, context=context,
+                title=st.session_state.writer.title, outline=list(st.session_state.writer.outline),
+                stream=stream_preview, parallel_sections=parallel_sections, smooth_seams=smooth_seams,
+                engine="structured" if structured_engine else "pipeline", previous=previous_draft
             )
-            full_article += intro + "\n\n"
-            progress_bar.progress(1 / total_steps)
-            time.sleep(0.5)
-            
-            # Generowanie sekcji
-            for i, section_title in enumerate(st.session_state.writer.outline):
-                status_text.text(f"✏️ Piszę sekcję {i+1}/{len(st.session_state.writer.outline)}: {section_title[:30]}...")
-                
-                section_content = st.session_state.writer.write_section(
-                    section_title, i, st.session_state.writer.title,
-                    topic, clinic, st.session_state.writer.outline,
-                    full_article, context
+            get_job_queue().submit(job, st.session_state.writer)
+            st.rerun()
+    
+    # Zużycie tokenów (łącznie z cache promptów u dostawcy)
+    if st.session_state.get("article_usage"):
+        usage = st.session_state.article_usage
+        st.caption(
+            f"🧮 Tokeny ({usage['calls']} wywołań API): wejście {usage['input_tokens']} "
+            f"(odczyt z cache promptu: {usage['cache_read_tokens']}, zapis do cache: {usage['cache_write_tokens']}), "
+            f"wyjście {usage['output_tokens']}"
+        )
+    
+    # Czasy i tokeny poszczególnych wywołań
+    if st.session_state.get("article_trace") and st.session_state.article_trace.records:
+        trace = st.session_state.article_trace
+        with st.expander("⏱️ Czasy generowania"):
+            st.dataframe(trace.summary(), use_container_width=True, hide_index=True)
+            st.caption(f"💵 Trasy modeli - koszt artykułu: {trace_cost(trace.snapshot()):.4f} USD (według cenników dostawców)")
+            st.dataframe(route_report(trace.snapshot()), use_container_width=True, hide_index=True)
+            col1, col2 = st.columns(2)
+            with col1:
+                st.download_button(
+                    label="📥 Ślad (.jsonl)",
+                    data=trace.to_jsonl(topic=topic),
+                    file_name="trace.jsonl",
+                    mime="application/x-ndjson"
                 )
-                
-                full_article += f"## {section_title}\n\n{section_content}\n\n"
-                progress_bar.progress((i + 2) / total_steps)
-                time.sleep(0.5)
-            
-            st.session_state.generated_article = full_article
-            progress_bar.progress(1.0)
-            status_text.text("✅ Artykuł gotowy!")
-            
-            st.success("🎉 Artykuł został wygenerowany!")
-            st.balloons()
+            with col2:
+                st.download_button(
+                    label="📥 Spany OpenTelemetry (.json)",
+                    data=json.dumps({"spans": trace.to_spans(topic or "article")}, ensure_ascii=False, indent=2),
+                    file_name="trace_spans.json",
+                    mime="application/json"
+                )
+
+# Artykuły generowane w tle - stan odpytywany co sekundę, dopóki któreś zadanie trwa
+session_jobs = get_job_queue().jobs_for(st.session_state.session_id)
+
+
+def show_job(job):
+    """Wczytuje gotowy artykuł zadania do edytora i statystyk"""
+    st.session_state.generated_article = job.article
+    st.session_state.article_usage = job.usage
+    st.session_state.article_trace = job.writer.trace
+    st.session_state.article_draft = job.draft
+
+
+@st.fragment(run_every=1.0 if any(job.active for job in session_jobs) else None)
+def jobs_panel():
+    jobs = get_job_queue().jobs_for(st.session_state.session_id)
+    if not jobs:
+        return
+    
+    # Zadania zakończone od poprzedniego odpytania - pełny rerun pokazuje gotowy artykuł
+    finished = [job for job in jobs if job.id in st.session_state.running_jobs and not job.active]
+    st.session_state.running_jobs = {job.id for job in jobs if job.active}
+    if finished:
+        done = [job for job in finished if job.status == "done"]
+        if done:
+            show_job(done[0])
+        st.rerun()
+    
+    st.markdown("---")
+    st.header("🧵 Artykuły w przygotowaniu")
+    for job in jobs:
+        with st.expander(f"{job.title} — {job.stage}", expanded=job.active):
+            st.progress(job.progress)
+            if job.previous is not None and job.status == "done":
+                st.caption(f"♻️ Napisano od nowa: {job.rewritten}, przeniesiono z poprzedniej wersji: "
+                           f"{len(job.outline) + 1 - job.rewritten}")
+            for flag in job.duplicates:
+                outcome = f" → po przepisaniu {flag.similarity_after:.0%}" if flag.regenerated else ""
+                st.warning(f'🧬 Sekcja "{flag.heading[:50]}" w {flag.match.similarity:.0%} powtarza '
+                           f'"{flag.match.heading[:50]}" z artykułu "{flag.match.title[:50]}"{outcome}')
+            if job.active:
+                st.markdown(job.partial_article() + "▌")
+                if st.button("⏹️ Anuluj", key=f"cancel_{job.id}"):
+                    get_job_queue().cancel(job.id)
+            elif job.status == "done":
+                col1, col2 = st.columns([1, 1])
+                with col1:
+                    if st.button("📄 Pokaż artykuł", key=f"show_{job.id}"):
+                        show_job(job)
+                        st.rerun()
+                with col2:
+                    if st.button("🗑️ Usuń z listy", key=f"remove_{job.id}"):
+                        get_job_queue().remove(job.id)
+                        st.rerun(scope="fragment")
+            else:
+                if job.error:
+                    st.error(f"❌ Nie udało się wygenerować artykułu: {job.error}")
+                if job.intro:
+                    with st.container():
+                        st.markdown(job.partial_article())
+                if st.button("🗑️ Usuń z listy", key=f"remove_{job.id}"):
+                    get_job_queue().remove(job.id)
+                    st.rerun(scope="fragment")
+
+
+jobs_panel()
+
+# Biblioteka artykułów - lista czyta tylko metadane, treść pobierana jest przy otwarciu
+library = get_library()
+with st.expander(f"📚 Biblioteka artykułów ({library.count()})"):
+    col1, col2 = st.columns([2, 1])
+    with col1:
+        library_query = st.text_input("Szukaj w tytułach, tematach i treści", key="library_query",
+                                      placeholder="np. skóra zimą")
+    with col2:
+        library_clinic = st.selectbox("Klinika", ["Wszystkie"] + list(CLINICS.keys()), key="library_clinic")
+    library_clinic = "" if library_clinic == "Wszystkie" else library_clinic
+    
+    # Nowe kryteria wyszukiwania wracają do pierwszej strony
+    criteria = (library_query, library_clinic)
+    if st.session_state.get("library_criteria") != criteria:
+        st.session_state.library_criteria = criteria
+        st.session_state.library_page = 0
+    
+    results = library.page(library_query, library_clinic, st.session_state.library_page)
+    st.caption(f"Wyników: {library.count(library_query, library_clinic)} · strona {results.page + 1}")
+    for entry in results.entries:
+        col1, col2, col3 = st.columns([5, 1, 1])
+        with col1:
+            created = time.strftime('%Y-%m-%d %H:%M', time.localtime(entry.created))
+            tokens = entry.usage.get("output_tokens")
+            st.markdown(f"**{entry.title}**  \n{entry.clinic} · {created} · {entry.words} słów"
+                        + (f" · {tokens} tok. wyj." if tokens else ""))
+        with col2:
+            if st.button("📄 Otwórz", key=f"library_open_{entry.id}"):
+                _, body, draft_data = library.get(entry.id)
+                st.session_state.generated_article = body
+                st.session_state.article_usage = entry.usage or None
+                st.session_state.article_trace = None
+                st.session_state.article_draft = ArticleDraft.from_dict(draft_data) if draft_data else None
+                st.session_state.writer.title = entry.title
+                st.session_state.writer.outline = list(entry.outline)
+                st.rerun()
+        with col3:
+            if st.button("🗑️ Usuń", key=f"library_delete_{entry.id}"):
+                library.delete(entry.id)
+                st.rerun()
+    
+    col1, col2 = st.columns([1, 1])
+    with col1:
+        if st.button("← Poprzednia", disabled=results.page == 0, key="library_prev"):
+            st.session_state.library_page -= 1
+            st.rerun()
+    with col2:
+        if st.button("Następna →", disabled=not results.has_more, key="library_next"):
+            st.session_state.library_page += 1
+            st.rerun()
 
 # Wyświetlenie i edycja artykułu
 if st.session_state.generated_article:
@@ -491,18 +534,37 @@ if st.session_state.generated_article:
     
     col1, col2, col3 = st.columns(3)
     with col1:
-        st.metric("Słowa", word_count, delta=f"{word_count - 800}" if word_count > 800 else None)
+        st.metric("Słowa", word_count,
+                  delta=f"{word_count - ARTICLE_WORD_LIMIT}" if word_count > ARTICLE_WORD_LIMIT else None)
     with col2:
         st.metric("Znaki ze spacjami", char_count, delta=f"{char_count - 5000}" if char_count > 5000 else None)
     with col3:
         st.metric("Znaki bez spacji", char_count_no_spaces)
     
     # Ostrzeżenia o długości
-    if word_count > 800:
-        st.warning(f"⚠️ Artykuł ma {word_count} słów - przekroczony limit 800 słów.")
+    if word_count > ARTICLE_WORD_LIMIT:
+        st.warning(f"⚠️ Artykuł ma {word_count} słów - przekroczony limit {ARTICLE_WORD_LIMIT} słów.")
     elif word_count < 600:
         st.info(f"ℹ️ Artykuł ma {word_count} słów - możesz go rozbudować.")
     
+    # Kontrola stylu - lokalnie, bez API; do modelu trafiają tylko zdania z problemami
+    draft = st.session_state.get("article_draft")
+    article_clinic = draft.clinic if draft is not None else clinic
+    style_issues = st.session_state.writer.check_style(article_text, article_clinic)
+    if style_issues:
+        with st.expander(f"🧹 Kontrola stylu: {len(style_issues)} do poprawy"):
+            for issue in style_issues:
+                st.write(f"- **{issue.kind}** — {issue.message}")
+            if st.button("🪄 Popraw tylko te zdania", key="fix_style", disabled=not api_key):
+                with st.spinner("Poprawiam zdania..."):
+                    fixed = st.session_state.writer.fix_style(article_text, article_clinic, style_issues)
+                st.session_state.generated_article = fixed
+                if draft is not None and not draft.update_from_markdown(fixed):
+                    st.session_state.article_draft = None
+                st.rerun()
+    else:
+        st.caption("🧹 Kontrola stylu: bez zastrzeżeń")
+    
     # Podgląd artykułu
     st.subheader("👁️ Podgląd artykułu:")
     
@@ -533,6 +595,7 @@ if st.session_state.generated_article:
     with col3:
         if st.button("🗑️ Usuń artykuł i zacznij od nowa"):
             st.session_state.generated_article = ""
+            st.session_state.article_draft = None
             st.session_state.writer.outline = []
             st.rerun()
     
@@ -547,6 +610,10 @@ if st.session_state.generated_article:
         
         if st.button("💾 Zapisz zmiany edytora", key="save_article_edits"):
             st.session_state.generated_article = edited_article
+            # Poprawki trafiają do szkicu; przy zmienionym układzie sekcji kolejne generowanie zacznie od zera
+            draft = st.session_state.get("article_draft")
+            if draft is not None and not draft.update_from_markdown(edited_article):
+                st.session_state.article_draft = None
             st.success("Zmiany zapisane!")
             st.rerun()
 
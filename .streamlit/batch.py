@@ -0,0 +1,350 @@
+"""Wsadowe generowanie artykułów z pliku CSV/JSONL (bez interfejsu Streamlit).
+
+Przykład:
+    python .streamlit/batch.py tematy.csv --out artykuly/ --provider claude --concurrency 4
+
+Plik wejściowy zawiera kolumny/klucze `topic`, `clinic` i opcjonalnie `context`.
+Każdy gotowy artykuł trafia do osobnego pliku .md, a wynik (również błędy) do
+`manifest.jsonl` w katalogu wyjściowym. Ponowne uruchomienie pomija artykuły,
+które mają już w manifeście status `ok`.
+
+Z `--base-url` wszystkie zapytania do dostawców (także Batch API) idą do jednego
+serwera zgodnego z ich API, np. lokalnego `mock_llm_server.py`:
+    python .streamlit/mock_llm_server.py --batch-seconds 5
+    python .streamlit/batch.py tematy.csv --out /tmp/artykuly --batch-api --base-url http://127.0.0.1:8900
+"""
+import argparse
+import csv
+import hashlib
+import json
+import os
+import re
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Dict, List, Set
+
+from clinics import CLINICS
+from completion_cache import get_cache
+from dedup import DEFAULT_DEDUP_PATH, DuplicateIndex, get_dedup_index
+from http_pool import PoolConfig
+from library import DEFAULT_LIBRARY_PATH, ArticleLibrary, get_library, step_timings
+from providers import API_KEY_ENV, BASE_URLS, BATCH_PROVIDERS
+from research import SEARCH_ENDPOINT, ResearchConfig, Researcher
+from routing import ROUTES, ROUTING_PRESETS, SPECULATIVE_ROUTES, RoutingPolicy, build_policy, trace_cost
+from writer import ENGINES, ArticleWriter
+
+MANIFEST_NAME = "manifest.jsonl"
+TRACE_NAME = "traces.jsonl"
+
+
+def job_id(row: Dict[str, str]) -> str:
+    """Stabilny identyfikator wiersza - ten sam temat, klinika i kontekst dają ten sam id"""
+    key = json.dumps([row["topic"], row["clinic"], row.get("context", "")], ensure_ascii=False)
+    return hashlib.sha1(key.encode("utf-8")).hexdigest()[:12]
+
+
+def read_topics(path: str) -> List[Dict[str, str]]:
+    """Wczytuje wiersze (topic, clinic, context) z pliku CSV lub JSONL"""
+    with open(path, encoding="utf-8") as f:
+        if path.endswith((".jsonl", ".ndjson")):
+            rows = [json.loads(line) for line in f if line.strip()]
+        else:
+            rows = list(csv.DictReader(f))
+
+    topics = []
+    for number, row in enumerate(rows, 1):
+        topic = (row.get("topic") or "").strip()
+        clinic = (row.get("clinic") or "").strip()
+        if not topic:
+            raise ValueError(f"Wiersz {number}: brak tematu")
+        if clinic not in CLINICS:
+            raise ValueError(f"Wiersz {number}: nieznana klinika {clinic!r}")
+        topics.append({"topic": topic, "clinic": clinic, "context": (row.get("context") or "").strip()})
+    return topics
+
+
+def completed_jobs(manifest_path: str) -> Set[str]:
+    """Identyfikatory artykułów zapisanych już z powodzeniem"""
+    done = set()
+    if not os.path.exists(manifest_path):
+        return done
+    with open(manifest_path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError:
+                continue  # urwana ostatnia linia po awarii
+            if entry.get("status") == "ok":
+                done.add(entry["id"])
+    return done
+
+
+def slugify(text: str, max_length: int = 60) -> str:
+    slug = re.sub(r"[^\w]+", "_", text.lower(), flags=re.UNICODE).strip("_")
+    return slug[:max_length] or "artykul"
+
+
+class BatchRunner:
+    """Generuje artykuły z ograniczoną współbieżnością i wznawialnym manifestem"""
+
+    def __init__(self, api_key: str, model_provider: str, out_dir: str, concurrency: int = 4,
+                 parallel_sections: bool = False, smooth_seams: bool = False,
+                 pool_config: PoolConfig = None, use_cache: bool = False,
+                 fallback_keys: Dict[str, str] = None, trace: bool = False,
+                 research: ResearchConfig = None, fix_style: bool = False, engine: str = "pipeline",
+                 library: ArticleLibrary = None, dedup: DuplicateIndex = None, dedup_regenerate: bool = False,
+                 batch_api: bool = False, poll_interval: float = 30.0, routing: RoutingPolicy = None,
+                 routing_keys: Dict[str, str] = None, base_url: str = ""):
+        self.api_key = api_key
+        self.model_provider = model_provider
+        self.out_dir = out_dir
+        self.concurrency = concurrency
+        self.parallel_sections = parallel_sections
+        self.smooth_seams = smooth_seams
+        # Wątki artykułów (i ewentualnie sekcji) dzielą jedną pulę połączeń dostawcy
+        self.pool_config = pool_config or PoolConfig(pool_size=concurrency * (5 if parallel_sections else 1))
+        self.cache = get_cache() if use_cache else None
+        self.fallback_keys = fallback_keys or {}
+        self.router = None
+        if self.fallback_keys:
+            from failover import get_router  # hedging (asyncio) tylko z zapasowymi dostawcami
+            self.router = get_router(list(self.fallback_keys))
+        self.manifest_path = os.path.join(out_dir, MANIFEST_NAME)
+        self.trace_path = os.path.join(out_dir, TRACE_NAME) if trace else None
+        self.researcher = Researcher(research) if research is not None else None
+        self.fix_style = fix_style
+        self.engine = engine
+        self.library = library
+        self.dedup = dedup
+        self.dedup_regenerate = dedup_regenerate
+        self.batch_api = batch_api
+        self.poll_interval = poll_interval
+        self.routing = routing
+        self.routing_keys = routing_keys or {}
+        self.base_url = base_url
+        self._manifest_lock = threading.Lock()
+
+    def run(self, topics: List[Dict[str, str]]) -> Dict[str, int]:
+        os.makedirs(self.out_dir, exist_ok=True)
+        done = completed_jobs(self.manifest_path)
+        pending = [row for row in topics if job_id(row) not in done]
+        counts = {"skipped": len(topics) - len(pending), "ok": 0, "error": 0}
+        print(f"Artykułów: {len(topics)}, pominiętych (gotowe): {counts['skipped']}, do zrobienia: {len(pending)}")
+
+        if self.batch_api:
+            self._run_batch_api(pending, counts)
+            return counts
+        with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            futures = [executor.submit(self._generate, row) for row in pending]
+            for number, future in enumerate(as_completed(futures), 1):
+                entry = future.result()
+                counts[entry["status"]] += 1
+                print(f"[{number}/{len(pending)}] {entry['status']}: {entry['topic']}")
+        return counts
+
+    def _writer(self) -> ArticleWriter:
+        writer = ArticleWriter()
+        writer.set_config(self.api_key, self.model_provider, self.pool_config)
+        if self.base_url:
+            writer.base_urls = {provider: self.base_url for provider in BASE_URLS}
+        writer.set_cache(self.cache)
+        writer.set_fallbacks(self.fallback_keys, self.router)
+        writer.set_dedup(self.dedup, self.dedup_regenerate)
+        writer.set_routing(self.routing, self.routing_keys)
+        return writer
+
+    def _generate(self, row: Dict[str, str]) -> Dict:
+        writer = self._writer()
+        entry = {"id": job_id(row), **row, "provider": self.model_provider, "engine": self.engine}
+        start = time.perf_counter()
+        try:
+            if self.researcher is not None:
+                writer.set_research(self.researcher.run(row["topic"]))
+            result = writer.generate_article(row["topic"], row["clinic"], row["context"],
+                                             self.parallel_sections, self.smooth_seams, self.fix_style,
+                                             self.engine)
+            self._store(entry, row, writer, result, time.perf_counter() - start)
+        except Exception as e:
+            entry.update(status="error", error=str(e))
+        return self._finish(entry, writer, time.perf_counter() - start)
+
+    def _run_batch_api(self, pending: List[Dict[str, str]], counts: Dict[str, int]):
+        """Wszystkie artykuły falami paczek Batch API (konspekty, potem wstępy i sekcje)"""
+        from batch_api import BATCH_JOURNAL_NAME, BatchArticleBuilder, BatchJournal, PollPolicy
+
+        # Paczki przerwanego przebiegu są odpytywane ponownie zamiast wysyłane jeszcze raz
+        journal = BatchJournal(os.path.join(self.out_dir, BATCH_JOURNAL_NAME))
+        if journal.batches:
+            print(f"Paczki z poprzedniego przebiegu w dzienniku: {len(journal.batches)}")
+        builder = BatchArticleBuilder(self._writer(), PollPolicy(interval=self.poll_interval),
+                                      engine=self.engine, on_progress=print, journal=journal)
+        start = time.perf_counter()
+        articles = builder.generate(pending, self.researcher.run if self.researcher is not None else None)
+        seconds = time.perf_counter() - start
+        for number, article in enumerate(articles, 1):
+            row = article.row
+            entry = {"id": job_id(row), **row, "provider": self.model_provider, "engine": self.engine,
+                     "batch_api": True}
+            if article.error:
+                entry.update(status="error", error=article.error)
+            else:
+                try:
+                    self._store(entry, row, article.writer, article.result, seconds)
+                except Exception as e:
+                    entry.update(status="error", error=str(e))
+            entry = self._finish(entry, article.writer, seconds)
+            counts[entry["status"]] += 1
+            print(f"[{number}/{len(pending)}] {entry['status']}: {entry['topic']}")
+        journal.clear()
+        print(f"Paczek: {builder.client.batches} (wznowionych: {builder.client.resumed}), "
+              f"odpytań stanu: {builder.client.polls}, czas: {seconds:.0f} s")
+
+    def _store(self, entry: Dict, row: Dict[str, str], writer: ArticleWriter, result: Dict, seconds: float):
+        """Zapisuje artykuł (plik .md i biblioteka) i uzupełnia wpis manifestu"""
+        file_name = f"{slugify(row['topic'])}_{entry['id']}.md"
+        self._write_atomic(os.path.join(self.out_dir, file_name), result["article"])
+        entry.update(status="ok", file=file_name, title=result["title"], outline=result["outline"],
+                     words=len(result["article"].split()), usage=result["usage"],
+                     cost_usd=round(trace_cost(writer.trace.snapshot()), 5),
+                     style_issues=len(writer.check_style(result["article"], row["clinic"])),
+                     problems=result.get("problems", []),
+                     duplicates=[{"section": flag.index + 1, "similar_to": flag.match.title,
+                                  "similarity": flag.match.similarity, "regenerated": flag.regenerated,
+                                  "similarity_after": flag.similarity_after} for flag in writer.duplicates])
+        if self.library is not None:
+            entry["library_id"] = self.library.add(
+                result["title"], row["topic"], row["clinic"], result["outline"], result["article"],
+                self.model_provider, self.engine, row["context"], result["usage"],
+                step_timings(writer.trace.snapshot()), round(seconds, 2), result["draft"].to_dict())
+
+    def _finish(self, entry: Dict, writer: ArticleWriter, seconds: float) -> Dict:
+        entry["seconds"] = round(seconds, 2)
+        self._append_manifest(entry)
+        if self.trace_path:
+            self._append(self.trace_path, writer.trace.to_jsonl(article_id=entry["id"]))
+        return entry
+
+    def _write_atomic(self, path: str, content: str):
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(content)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+
+    def _append_manifest(self, entry: Dict):
+        self._append(self.manifest_path, json.dumps(entry, ensure_ascii=False) + "\n")
+
+    def _append(self, path: str, text: str):
+        with self._manifest_lock:
+            with open(path, "a", encoding="utf-8") as f:
+                f.write(text)
+                f.flush()
+                os.fsync(f.fileno())
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description="Wsadowe generowanie artykułów sponsorowanych")
+    parser.add_argument("input", help="plik CSV lub JSONL z kolumnami topic, clinic, context")
+    parser.add_argument("--out", default="artykuly", help="katalog wyjściowy (.md + manifest.jsonl)")
+    parser.add_argument("--provider", choices=sorted(API_KEY_ENV), default="claude")
+    parser.add_argument("--concurrency", type=int, default=4, help="liczba artykułów generowanych jednocześnie")
+    parser.add_argument("--engine", choices=ENGINES, default="pipeline",
+                        help="pipeline: konspekt, wstęp i sekcje osobno; structured: cały artykuł jednym wywołaniem (JSON)")
+    parser.add_argument("--batch-api", action="store_true",
+                        help="Batch API dostawcy (claude, openai): ok. 50%% taniej, wyniki po kilku minutach do 24 h")
+    parser.add_argument("--poll-interval", type=float, default=30.0,
+                        help="początkowy odstęp sprawdzania stanu paczki w sekundach (rośnie do 5 min)")
+    parser.add_argument("--base-url", default="",
+                        help="adres serwera zgodnego z API dostawców dla wszystkich zapytań (np. mock_llm_server.py)")
+    parser.add_argument("--parallel-sections", action="store_true", help="sekcje artykułu pisane równolegle")
+    parser.add_argument("--smooth-seams", action="store_true", help="wygładzanie przejść między sekcjami")
+    parser.add_argument("--cache", action="store_true", help="używaj trwałego cache odpowiedzi")
+    parser.add_argument("--library", default=DEFAULT_LIBRARY_PATH,
+                        help="baza biblioteki artykułów (SQLite), w której zapisywany jest każdy artykuł")
+    parser.add_argument("--no-library", action="store_true", help="nie zapisuj artykułów w bibliotece")
+    parser.add_argument("--dedup", action="store_true",
+                        help="sprawdzaj sekcje pod kątem powtórzeń z wcześniej wygenerowanych artykułów")
+    parser.add_argument("--dedup-index", default=DEFAULT_DEDUP_PATH, help="baza indeksu powtórzeń (SQLite)")
+    parser.add_argument("--dedup-regenerate", action="store_true",
+                        help="przepisuj powtórzone sekcje (jedno wywołanie na sekcję; włącza --dedup)")
+    parser.add_argument("--fallback", action="append", choices=sorted(API_KEY_ENV), default=[],
+                        help="zapasowy dostawca dla hedgingu (można podać kilka razy)")
+    parser.add_argument("--trace", action="store_true", help="zapisuj czasy i tokeny wywołań do traces.jsonl")
+    parser.add_argument("--routing", choices=list(ROUTING_PRESETS), default="single",
+                        help="polityka routingu modeli: single - wszystko modelem głównym, economy - szybki model"
+                             " poza sekcjami ze wzmianką o klinice i poprawkami, speculative - szkic i rewizja")
+    parser.add_argument("--route", action="append", default=[], metavar="TRASA=DOSTAWCA[:MODEL]",
+                        help=f"nadpisanie trasy ({', '.join(ROUTES)}), np. sekcja=openai:gpt-4o-mini")
+    parser.add_argument("--speculative", action="append", choices=SPECULATIVE_ROUTES, default=[],
+                        help="trasa pisana szkicem i rewidowana trasą 'rewizja'")
+    parser.add_argument("--fix-style", action="store_true",
+                        help="popraw zdania z zakazanymi słowami, zwrotami do czytelnika i złymi wzmiankami o klinice")
+    parser.add_argument("--research", action="store_true",
+                        help="research źródeł przed pisaniem (GOOGLE_API_KEY i GOOGLE_CSE_ID)")
+    parser.add_argument("--search-endpoint", default="",
+                        help="adres API wyszukiwania zgodnego z Google Custom Search (domyślnie SEARCH_ENDPOINT,"
+                             " a z --base-url - /customsearch/v1 tego serwera)")
+    args = parser.parse_args(argv)
+
+    try:
+        from dotenv import load_dotenv
+        load_dotenv()
+    except ImportError:
+        pass
+
+    api_key = os.environ.get(API_KEY_ENV[args.provider], "")
+    if not api_key:
+        print(f"Brak klucza API: ustaw zmienną {API_KEY_ENV[args.provider]}", file=sys.stderr)
+        return 2
+
+    if args.batch_api and args.provider not in BATCH_PROVIDERS:
+        print(f"Batch API nie jest dostępne dla dostawcy {args.provider}", file=sys.stderr)
+        return 2
+    if args.batch_api and args.fix_style:
+        print("--fix-style poprawia zdania pojedynczymi wywołaniami - nie działa z --batch-api", file=sys.stderr)
+        return 2
+
+    try:
+        routing = build_policy(args.routing, args.provider, args.route, args.speculative)
+    except ValueError as e:
+        print(e, file=sys.stderr)
+        return 2
+    if routing is not None and args.batch_api:
+        print("Routing modeli wysyła kroki do różnych modeli pojedynczo - nie działa z --batch-api", file=sys.stderr)
+        return 2
+    routing_keys = {p: os.environ.get(API_KEY_ENV[p], "") for p in (routing.providers() if routing else ())
+                    if p != args.provider}
+    missing = [API_KEY_ENV[p] for p, key in routing_keys.items() if not key]
+    if missing:
+        print(f"Brak klucza API dla trasy: ustaw zmienną {', '.join(missing)}", file=sys.stderr)
+        return 2
+
+    fallback_keys = {p: os.environ[API_KEY_ENV[p]] for p in args.fallback
+                     if p != args.provider and os.environ.get(API_KEY_ENV[p])}
+
+    research = None
+    if args.research:
+        endpoint = args.search_endpoint or (f"{args.base_url.rstrip('/')}/customsearch/v1" if args.base_url
+                                            else SEARCH_ENDPOINT)
+        research = ResearchConfig(api_key=os.environ.get("GOOGLE_API_KEY", ""),
+                                  cse_id=os.environ.get("GOOGLE_CSE_ID", ""), endpoint=endpoint)
+
+    runner = BatchRunner(api_key, args.provider, args.out, max(1, args.concurrency),
+                         args.parallel_sections, args.smooth_seams, use_cache=args.cache,
+                         fallback_keys=fallback_keys, trace=args.trace, research=research,
+                         fix_style=args.fix_style, engine=args.engine,
+                         library=None if args.no_library else get_library(args.library),
+                         dedup=get_dedup_index(args.dedup_index) if args.dedup or args.dedup_regenerate else None,
+                         dedup_regenerate=args.dedup_regenerate, batch_api=args.batch_api,
+                         poll_interval=args.poll_interval, routing=routing, routing_keys=routing_keys,
+                         base_url=args.base_url.rstrip("/"))
+    counts = runner.run(read_topics(args.input))
+    print(f"Gotowe: {counts['ok']}, błędy: {counts['error']}, pominięte: {counts['skipped']}")
+    return 1 if counts["error"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,567 @@
+"""Tryb hurtowy przez Batch API dostawców - przepustowość i ok. 50% niższa cena zamiast niskich opóźnień.
+
+Artykuły z listy tematów powstają falami zależności: najpierw wszystkie
+konspekty w jednej paczce, potem wszystkie wstępy i sekcje (sekcje dostają
+kontekst z konspektu, jak w trybie równoległym), a przy przepisywaniu
+powtórzeń - jeszcze paczka poprawionych sekcji. Odpowiedzi są dopasowywane po
+`custom_id`; zapytania zakończone błędem wracają w kolejnej paczce tej samej
+fali. Obsługiwane są Anthropic Message Batches i OpenAI Batch API - DeepSeek
+nie ma odpowiednika.
+
+Id każdej wysłanej paczki trafia od razu do dziennika (`BatchJournal`), więc
+przerwany przebieg po ponownym uruchomieniu odpytuje paczki u dostawcy zamiast
+wysyłać i opłacać te same zapytania jeszcze raz.
+"""
+import json
+import os
+import time
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+import requests
+
+from budget import ARTICLE_WORD_TARGET, get_ratio, trim_to_sentence
+from drafts import ArticleDraft, SectionPlan, SectionRecord
+from errors import ConfigurationError, ProviderError, ProviderTimeoutError, error_for_status
+from http_pool import get_pool
+from providers import MODELS
+from rate_limit import get_scheduler
+from research import ResearchResult
+from structured import ARTICLE_SCHEMA, JSON_OVERHEAD_TOKENS, StructuredOutputError, parse_article
+from writer import ArticleWriter, GenerationError, check_response, parse_outline
+
+# Limit zapytań w jednej paczce (OpenAI: 50 000, Anthropic: 100 000) - większe fale idą w kilku paczkach
+MAX_BATCH_REQUESTS = 50_000
+BATCH_JOURNAL_NAME = "batches.jsonl"
+
+
+class BatchError(ProviderError):
+    """Paczka odrzucona przez dostawcę albo niezakończona w wyznaczonym czasie"""
+
+
+@dataclass
+class BatchRequest:
+    custom_id: str  # [a-zA-Z0-9_-], do 64 znaków (wymóg Anthropic)
+    step: str
+    messages: List[Dict]
+    max_tokens: int
+    schema: Optional[Dict] = None
+
+
+@dataclass
+class BatchOutcome:
+    """Wynik jednego zapytania paczki: odpowiedź API albo opis błędu"""
+    custom_id: str
+    response: Optional[Dict] = None
+    error: str = ""
+
+
+@dataclass
+class PollPolicy:
+    """Odpytywanie stanu paczki: odstęp rośnie wykładniczo do `max_interval`"""
+    interval: float = 30.0
+    max_interval: float = 300.0
+    backoff: float = 1.5
+    timeout: float = 24 * 3600.0  # okno przetwarzania obu dostawców
+
+
+class BatchJournal:
+    """Dziennik wysłanych paczek (JSONL): id paczki i jej zapytania (custom_id → skrót treści).
+
+    Wpis powstaje zaraz po utworzeniu paczki. Po przerwaniu przebiegu paczki z dziennika
+    (także zakończone - dostawcy trzymają wyniki do 29 dni) są odpytywane ponownie, o ile
+    zapytanie o tym samym custom_id ma tę samą treść.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.batches: Dict[str, Dict] = {}  # id paczki → wpis dziennika
+        if not os.path.exists(path):
+            return
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    continue  # urwana ostatnia linia po awarii
+                self.batches[entry["batch_id"]] = entry
+
+    def add(self, provider: str, batch_id: str, requests: Dict[str, str]):
+        entry = {"batch_id": batch_id, "provider": provider, "requests": requests}
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(entry) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        self.batches[batch_id] = entry
+
+    def drop(self, batch_id: str):
+        """Usuwa z dziennika paczkę, której nie da się już odebrać (odrzuconą albo nieznaną dostawcy)"""
+        if self.batches.pop(batch_id, None) is None:
+            return
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.writelines(json.dumps(entry) + "\n" for entry in self.batches.values())
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+
+    def find(self, provider: str, requests: Dict[str, str], skip: Set[str] = frozenset()) -> Dict[str, str]:
+        """custom_id → id najnowszej paczki z dziennika z tym samym zapytaniem (bez paczek z `skip`)"""
+        found = {}
+        for batch_id, entry in self.batches.items():
+            if entry["provider"] != provider or batch_id in skip:
+                continue
+            for custom_id, key in entry["requests"].items():
+                if requests.get(custom_id) == key:
+                    found[custom_id] = batch_id
+        return found
+
+    def clear(self):
+        """Usuwa dziennik po zapisaniu wyników przebiegu"""
+        self.batches.clear()
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+
+class BatchClient:
+    """Wspólna część klientów Batch API: zapytania kontrolne przez pulę i limiter, odpytywanie stanu"""
+    provider = ""
+
+    def __init__(self, writer: ArticleWriter, poll: PollPolicy = PollPolicy(),
+                 journal: Optional[BatchJournal] = None):
+        self.writer = writer
+        self.poll = poll
+        self.journal = journal
+        self.batches = 0
+        self.resumed = 0
+        self.polls = 0
+        self._collected: Set[str] = set()  # paczki, których wyniki już odebrano w tym przebiegu
+        self._failed: Dict[str, str] = {}  # id paczki bez wyników → opis błędu dla jej zapytań
+
+    def _headers(self) -> Dict[str, str]:
+        raise NotImplementedError
+
+    def _request(self, method: str, url: str, **kwargs) -> requests.Response:
+        if not url.startswith("http"):
+            url = self.writer.base_urls[self.provider].rstrip("/") + url
+
+        def send() -> requests.Response:
+            try:
+                response = get_pool(self.provider, self.writer.pool_config).request(
+                    method, url, headers=self._headers(), **kwargs)
+            except (requests.Timeout, requests.ConnectionError) as e:
+                raise ProviderTimeoutError(str(e), self.provider) from e
+            if response.status_code >= 400:
+                raise error_for_status(self.provider, response.status_code, response.headers, response.text)
+            return response
+
+        # Limiter ponawia błędy przejściowe; zapytania kontrolne nie zużywają tokenów
+        return get_scheduler(self.provider).run(send, 0)
+
+    def _jsonl(self, url: str) -> List[Dict]:
+        response = self._request("GET", url, stream=True)
+        with response:
+            response.encoding = "utf-8"
+            return [json.loads(line) for line in response.iter_lines(decode_unicode=True) if line.strip()]
+
+    def submit(self, batch: List[BatchRequest]) -> str:
+        raise NotImplementedError
+
+    def ended(self, batch_id: str) -> bool:
+        raise NotImplementedError
+
+    def results(self, batch_id: str) -> List[BatchOutcome]:
+        raise NotImplementedError
+
+    def _fail(self, batch_id: str, error: str):
+        """Paczka zakończona bez wyników: wszystkie jej zapytania wracają z błędem, a dziennik o niej zapomina"""
+        self._failed[batch_id] = error
+        if self.journal is not None:
+            self.journal.drop(batch_id)
+
+    def _ended(self, batch_id: str) -> bool:
+        try:
+            return self.ended(batch_id)
+        except ProviderError as e:
+            if e.retryable:
+                raise
+            # Np. paczka z dziennika, której dostawca już nie zna (404) - zapytania pójdą w nowej paczce
+            self._fail(batch_id, str(e))
+            return True
+
+    def run(self, batch: List[BatchRequest]) -> Dict[str, BatchOutcome]:
+        """Wysyła zapytania (w razie potrzeby w kilku paczkach), czeka na koniec i zwraca wyniki według `custom_id`.
+
+        Zapytania, które są już w paczce z dziennika, nie są wysyłane ponownie - ich wyniki
+        pochodzą z tamtej paczki.
+        """
+        keys = {request.custom_id: self.writer._cache_key(request.messages, request.max_tokens) for request in batch}
+        assigned = self.journal.find(self.provider, keys, self._collected) if self.journal is not None else {}
+        batch_ids = sorted(set(assigned.values()))
+        self.resumed += len(batch_ids)
+        fresh = [request for request in batch if request.custom_id not in assigned]
+        for i in range(0, len(fresh), MAX_BATCH_REQUESTS):
+            chunk = fresh[i:i + MAX_BATCH_REQUESTS]
+            batch_id = self.submit(chunk)
+            if self.journal is not None:
+                self.journal.add(self.provider, batch_id, {request.custom_id: keys[request.custom_id]
+                                                           for request in chunk})
+            assigned.update((request.custom_id, batch_id) for request in chunk)
+            batch_ids.append(batch_id)
+            self.batches += 1
+        waiting = list(batch_ids)
+        delay = self.poll.interval
+        deadline = time.monotonic() + self.poll.timeout
+        while waiting:
+            time.sleep(delay)
+            self.polls += len(waiting)
+            waiting = [batch_id for batch_id in waiting if not self._ended(batch_id)]
+            if waiting and time.monotonic() >= deadline:
+                raise BatchError(f"Paczki {', '.join(waiting)} nie zakończyły się w {self.poll.timeout:.0f} s",
+                                 self.provider)
+            delay = min(self.poll.max_interval, delay * self.poll.backoff)
+        outcomes = {}
+        for batch_id in batch_ids:
+            self._collected.add(batch_id)
+            if batch_id in self._failed:
+                error = self._failed.pop(batch_id)
+                outcomes.update((custom_id, BatchOutcome(custom_id, error=error))
+                                for custom_id, owner in assigned.items() if owner == batch_id)
+                continue
+            for outcome in self.results(batch_id):
+                if assigned.get(outcome.custom_id) == batch_id:
+                    outcomes[outcome.custom_id] = outcome
+        for request in batch:
+            outcomes.setdefault(request.custom_id, BatchOutcome(request.custom_id, error="brak wyniku w paczce"))
+        return outcomes
+
+
+class AnthropicBatches(BatchClient):
+    """Message Batches API: paczka zapytań w jednym POST, wyniki jako JSONL pod `results_url`"""
+    provider = "claude"
+
+    def __init__(self, writer: ArticleWriter, poll: PollPolicy = PollPolicy(),
+                 journal: Optional[BatchJournal] = None):
+        super().__init__(writer, poll, journal)
+        self._results_urls: Dict[str, str] = {}
+
+    def _headers(self) -> Dict[str, str]:
+        return {"x-api-key": self.writer._key_for("claude"), "anthropic-version": "2023-06-01"}
+
+    def submit(self, batch: List[BatchRequest]) -> str:
+        body = {"requests": [
+            {"custom_id": request.custom_id,
+             "params": self.writer._request_body("claude", request.messages, request.max_tokens, request.schema)}
+            for request in batch
+        ]}
+        return self._request("POST", "/v1/messages/batches", json=body).json()["id"]
+
+    def ended(self, batch_id: str) -> bool:
+        status = self._request("GET", f"/v1/messages/batches/{batch_id}").json()
+        if status.get("processing_status") != "ended":
+            return False
+        self._results_urls[batch_id] = status.get("results_url") or f"/v1/messages/batches/{batch_id}/results"
+        return True
+
+    def results(self, batch_id: str) -> List[BatchOutcome]:
+        outcomes = []
+        for line in self._jsonl(self._results_urls.pop(batch_id)):
+            result = line.get("result") or {}
+            if result.get("type") == "succeeded":
+                outcomes.append(BatchOutcome(line["custom_id"], response=result.get("message")))
+            else:
+                # errored (z opisem błędu), expired albo canceled
+                error = ((result.get("error") or {}).get("error") or {}).get("message") or result.get("type")
+                outcomes.append(BatchOutcome(line["custom_id"], error=str(error)))
+        return outcomes
+
+
+class OpenAIBatches(BatchClient):
+    """Batch API OpenAI: plik JSONL z zapytaniami, paczka wskazująca plik, wyniki w plikach wyjścia i błędów"""
+    provider = "openai"
+
+    def __init__(self, writer: ArticleWriter, poll: PollPolicy = PollPolicy(),
+                 journal: Optional[BatchJournal] = None):
+        super().__init__(writer, poll, journal)
+        self._files: Dict[str, Tuple[Optional[str], Optional[str]]] = {}
+
+    def _headers(self) -> Dict[str, str]:
+        return {"Authorization": f"Bearer {self.writer._key_for('openai')}"}
+
+    def submit(self, batch: List[BatchRequest]) -> str:
+        lines = "".join(
+            json.dumps({"custom_id": request.custom_id, "method": "POST", "url": "/v1/chat/completions",
+                        "body": self.writer._request_body("openai", request.messages, request.max_tokens,
+                                                          request.schema)},
+                       ensure_ascii=False) + "\n"
+            for request in batch
+        )
+        upload = self._request("POST", "/v1/files", data={"purpose": "batch"},
+                               files={"file": ("batch.jsonl", lines.encode("utf-8"), "application/jsonl")})
+        body = {"input_file_id": upload.json()["id"], "endpoint": "/v1/chat/completions",
+                "completion_window": "24h"}
+        return self._request("POST", "/v1/batches", json=body).json()["id"]
+
+    def ended(self, batch_id: str) -> bool:
+        status = self._request("GET", f"/v1/batches/{batch_id}").json()
+        state = status.get("status")
+        if state == "failed":
+            # Odrzucona przy walidacji pliku - wszystkie zapytania wrócą w kolejnej paczce
+            errors = (status.get("errors") or {}).get("data") or [{}]
+            self._fail(batch_id, f"Paczka {batch_id} odrzucona: {errors[0].get('message', 'brak opisu')}")
+            return True
+        if state not in ("completed", "expired", "cancelled"):
+            return False
+        # Paczka wygasła lub anulowana ma wyniki tylko dla części zapytań - reszta wróci w kolejnej paczce
+        self._files[batch_id] = (status.get("output_file_id"), status.get("error_file_id"))
+        return True
+
+    def results(self, batch_id: str) -> List[BatchOutcome]:
+        outcomes = []
+        for file_id in self._files.pop(batch_id):
+            if not file_id:
+                continue
+            for line in self._jsonl(f"/v1/files/{file_id}/content"):
+                response = line.get("response") or {}
+                if response.get("status_code") == 200:
+                    outcomes.append(BatchOutcome(line["custom_id"], response=response.get("body")))
+                else:
+                    error = line.get("error") or (response.get("body") or {}).get("error") or {}
+                    outcomes.append(BatchOutcome(line["custom_id"],
+                                                 error=error.get("message") or f"HTTP {response.get('status_code')}"))
+        return outcomes
+
+
+def batch_client(writer: ArticleWriter, poll: PollPolicy = PollPolicy(),
+                 journal: Optional[BatchJournal] = None) -> BatchClient:
+    """Klient Batch API dla dostawcy `writer`"""
+    if writer.model_provider == "claude":
+        return AnthropicBatches(writer, poll, journal)
+    if writer.model_provider == "openai":
+        return OpenAIBatches(writer, poll, journal)
+    raise ConfigurationError("Dostawca nie ma Batch API", writer.model_provider)
+
+
+@dataclass
+class BatchArticle:
+    """Artykuł jednego tematu w trybie hurtowym - własny writer (budżet, ślad, tokeny) i wynik"""
+    index: int
+    row: Dict[str, str]
+    writer: ArticleWriter
+    title: str = ""
+    outline: List[str] = field(default_factory=list)
+    draft: Optional[ArticleDraft] = None
+    plans: List[SectionPlan] = field(default_factory=list)
+    texts: Dict[str, str] = field(default_factory=dict)  # odpowiedzi według custom_id
+    result: Optional[Dict] = None  # pola jak w ArticleWriter.generate_article
+    error: str = ""
+
+
+class BatchArticleBuilder:
+    """Artykuły dla listy tematów, fala po fali przez Batch API dostawcy"""
+
+    def __init__(self, writer: ArticleWriter, poll: PollPolicy = PollPolicy(), max_attempts: int = 2,
+                 engine: str = "pipeline", on_progress: Optional[Callable[[str], None]] = None,
+                 journal: Optional[BatchJournal] = None):
+        writer._check_config()
+        self.writer = writer
+        self.client = batch_client(writer, poll, journal)
+        self.max_attempts = max_attempts
+        self.engine = engine
+        self.on_progress = on_progress
+
+    def _progress(self, message: str):
+        if self.on_progress:
+            self.on_progress(message)
+
+    def generate(self, rows: List[Dict[str, str]],
+                 research: Optional[Callable[[str], ResearchResult]] = None) -> List[BatchArticle]:
+        """Artykuły w kolejności `rows` (kolumny topic, clinic, context); błędy zapisane w `error`"""
+        articles = [BatchArticle(i, row, self.writer.spawn()) for i, row in enumerate(rows)]
+        if research is not None:
+            for article in articles:
+                try:
+                    article.writer.set_research(research(article.row["topic"]))
+                except Exception as e:
+                    article.error = f"research: {e}"
+
+        if self.engine == "structured":
+            self._wave("artykuły (JSON)", [(article, self._structured_request(article)) for article in articles])
+            for article in self._alive(articles):
+                self._assemble_structured(article)
+        else:
+            self._wave("konspekty", [(article, BatchRequest(
+                f"a{article.index}-outline", "konspekt",
+                article.writer._outline_messages(article.row["topic"], article.row["clinic"], article.row["context"]),
+                800)) for article in articles])
+            for article in self._alive(articles):
+                self._accept_outline(article)
+            self._wave("wstępy i sekcje", [(article, request) for article in self._alive(articles)
+                                           for request in self._content_requests(article)])
+            for article in self._alive(articles):
+                self._assemble(article)
+
+        rewrites = [(article, request) for article in self._alive(articles) if article.writer.dedup_regenerate
+                    for request in self._rewrite_requests(article)]
+        if rewrites:
+            self._wave("sekcje bez powtórzeń", rewrites, required=False)
+            for article in self._alive(articles):
+                self._accept_rewrites(article)
+        return articles
+
+    def _alive(self, articles: List[BatchArticle]) -> List[BatchArticle]:
+        return [article for article in articles if not article.error]
+
+    def _wave(self, name: str, jobs: List[Tuple[BatchArticle, BatchRequest]], required: bool = True):
+        """Jedna fala: odpowiedzi z cache od razu, reszta w paczce; nieudane zapytania w kolejnej paczce"""
+        pending = []
+        for article, request in jobs:
+            cached = self._cached(article.writer, request)
+            if cached is not None:
+                article.texts[request.custom_id] = cached
+            else:
+                pending.append((article, request))
+
+        errors: Dict[str, str] = {}
+        for attempt in range(1, self.max_attempts + 1):
+            if not pending:
+                break
+            self._progress(f"{name}: paczka {len(pending)} zapytań (próba {attempt}/{self.max_attempts})")
+            start = time.perf_counter()
+            try:
+                outcomes = self.client.run([request for _, request in pending])
+            except ProviderError as e:
+                # Przekroczony czas paczki albo błąd wysyłki/odpytywania - ta próba nie udała się dla całej fali
+                outcomes = {request.custom_id: BatchOutcome(request.custom_id, error=str(e)) for _, request in pending}
+            failed = []
+            for article, request in pending:
+                outcome = outcomes[request.custom_id]
+                if outcome.response is not None:
+                    try:
+                        article.texts[request.custom_id] = self._accept(article.writer, request, outcome.response)
+                        continue
+                    except ProviderError as e:
+                        outcome.error = str(e)
+                errors[request.custom_id] = outcome.error
+                failed.append((article, request))
+            self._progress(f"{name}: gotowe {len(pending) - len(failed)}/{len(pending)} "
+                           f"w {time.perf_counter() - start:.0f} s")
+            pending = failed
+
+        for article, request in pending:
+            if required and not article.error:
+                article.error = f"{request.step}: {errors.get(request.custom_id, 'brak wyniku')}"
+
+    def _cached(self, writer: ArticleWriter, request: BatchRequest) -> Optional[str]:
+        if writer.cache is None or not writer.use_cache:
+            return None
+        cached = writer.cache.get(writer._cache_key(request.messages, request.max_tokens))
+        if cached is not None:
+            with writer.trace.span(request.step, writer.model_provider, MODELS[writer.model_provider]) as record:
+                record.cached = True
+        return cached
+
+    def _accept(self, writer: ArticleWriter, request: BatchRequest, response: Dict) -> str:
+        """Tekst odpowiedzi z paczki; tokeny trafiają do licznika i śladu writera jak przy zwykłym wywołaniu"""
+        provider = writer.model_provider
+        with writer.trace.span(request.step, provider, MODELS[provider]):
+            text = writer._response_text(provider, response, request.schema)
+        if writer.cache is not None:
+            writer.cache.put(writer._cache_key(request.messages, request.max_tokens), text)
+        return text
+
+    def _accept_outline(self, article: BatchArticle):
+        title, outline = parse_outline(article.texts[f"a{article.index}-outline"])
+        if not title or not outline:
+            article.error = "konspekt: brak tytułu lub śródtytułów w odpowiedzi"
+            return
+        article.title, article.outline = title, outline[:5]
+
+    def _content_requests(self, article: BatchArticle) -> List[BatchRequest]:
+        """Wstęp i wszystkie sekcje naraz - sekcje opierają się na konspekcie, nie na poprzednich sekcjach"""
+        writer, row = article.writer, article.row
+        topic, clinic, context = row["topic"], row["clinic"], row["context"]
+        article.draft, article.plans = writer.plan_revision(article.title, topic, clinic, article.outline, context)
+        budget = writer.budget
+        requests = [BatchRequest(
+            f"a{article.index}-intro", "wstęp",
+            writer._introduction_messages(article.title, topic, article.outline, context, clinic),
+            budget.max_tokens(-1))]
+        for plan in article.plans:
+            words = budget.words_for(plan.index)
+            messages = writer._section_messages(plan.heading, plan.index, article.title, topic, clinic,
+                                                article.outline, writer._outline_context(article.outline, plan.index),
+                                                context, words)
+            requests.append(BatchRequest(f"a{article.index}-s{plan.index}", f"sekcja {plan.index + 1}",
+                                         messages, budget.ratio.tokens_for(words)))
+        return requests
+
+    def _assemble(self, article: BatchArticle):
+        writer, row = article.writer, article.row
+        topic, clinic, context = row["topic"], row["clinic"], row["context"]
+        draft, budget = article.draft, writer.budget
+        try:
+            draft.intro = check_response(trim_to_sentence(article.texts[f"a{article.index}-intro"]), "wstęp")
+            writer._track_budget(budget, -1, "wstęp", draft.intro)
+            for plan in article.plans:
+                step = f"sekcja {plan.index + 1}"
+                text = check_response(trim_to_sentence(article.texts[f"a{article.index}-s{plan.index}"]), step)
+                writer._track_budget(budget, plan.index, step, text)
+                text = writer.screen_section(plan.heading, plan.index, article.title, topic, clinic,
+                                             article.outline, text, context, regenerate=False)
+                draft.sections.append(SectionRecord(plan.heading, plan.fingerprint, text, plan.mentions_clinic))
+        except GenerationError as e:
+            article.error = str(e)
+            return
+        self._finish(article, draft)
+
+    def _structured_request(self, article: BatchArticle) -> BatchRequest:
+        writer, row = article.writer, article.row
+        max_tokens = get_ratio(writer.model_provider).tokens_for(ARTICLE_WORD_TARGET) + JSON_OVERHEAD_TOKENS
+        return BatchRequest(f"a{article.index}-article", "artykuł (JSON)",
+                            writer._structured_messages(row["topic"], row["clinic"], row["context"]),
+                            max_tokens, ARTICLE_SCHEMA)
+
+    def _assemble_structured(self, article: BatchArticle):
+        writer, row = article.writer, article.row
+        try:
+            structured = parse_article(article.texts[f"a{article.index}-article"])
+            article.result = writer.assemble_structured(structured, row["topic"], row["clinic"], row["context"],
+                                                        regenerate=False)
+        except StructuredOutputError as e:
+            article.error = f"artykuł (JSON): {e}"
+            return
+        except GenerationError as e:
+            article.error = str(e)
+            return
+        article.title, article.outline = article.result["title"], article.result["outline"]
+
+    def _rewrite_requests(self, article: BatchArticle) -> List[BatchRequest]:
+        writer, row = article.writer, article.row
+        requests = []
+        for flag in writer.duplicates:
+            messages, max_tokens = writer.duplicate_rewrite_messages(flag, article.title, row["topic"], row["clinic"],
+                                                                     article.outline, row["context"])
+            requests.append(BatchRequest(f"a{article.index}-r{flag.index}",
+                                         f"sekcja {flag.index + 1}: bez powtórzeń", messages, max_tokens))
+        return requests
+
+    def _accept_rewrites(self, article: BatchArticle):
+        """Przepisane sekcje zastępują powtórzenia; nieudane przepisanie zostawia sekcję bez zmian"""
+        writer, row = article.writer, article.row
+        draft = article.result["draft"]
+        for flag in writer.duplicates:
+            text = trim_to_sentence(article.texts.get(f"a{article.index}-r{flag.index}", ""))
+            if not text.strip():
+                continue
+            writer._track_budget(writer.budget_for(article.title, article.outline), flag.index,
+                                 f"sekcja {flag.index + 1}: bez powtórzeń", text)
+            draft.sections[flag.index].text = writer.accept_rewrite(flag, text, article.title, row["topic"],
+                                                                    row["clinic"], row["context"])
+        self._finish(article, draft)
+
+    def _finish(self, article: BatchArticle, draft: ArticleDraft):
+        result = article.result or {}
+        result.update(title=article.title, outline=article.outline, article=draft.render(), draft=draft,
+                      usage=article.writer.usage.summary())
+        article.result = result
@@ -0,0 +1,283 @@
+"""Powtarzalny benchmark generatora bez kosztów API - na lokalnym serwerze testowym.
+
+Przykład:
+    python .streamlit/benchmark.py --articles 12 --concurrency 1 4 8 --rate-limit-rate 0.05
+
+Dla każdego poziomu współbieżności uruchamia pełny proces (konspekt → wstęp →
+sekcje) na `mock_llm_server` i wypisuje: artykuły na minutę, p50/p95/p99 czasu
+każdego kroku (z `ArticleWriter.trace`), liczbę ponowień, tokeny wyjścia i długość
+artykułów oraz zużycie pamięci.
+Wyniki można zapisać do JSON (`--json`) i porównywać między wersjami.
+`--compare` uruchamia na tych samych tematach oba silniki (sekcja po sekcji i
+cały artykuł jednym wywołaniem JSON) i zestawia czas, tokeny i zgodność z limitem słów.
+`--routing single economy speculative` porównuje polityki routingu modeli: artykuły
+na minutę, koszt artykułu (cennik z `providers.PRICES`) i tabelę czasów i kosztów tras.
+"""
+import argparse
+import json
+import random
+import re
+import resource
+import sys
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List
+
+from clinics import CLINICS
+from completion_cache import CompletionCache
+from http_pool import PoolConfig
+from mock_llm_server import MockConfig, MockLLMServer
+from rate_limit import get_scheduler
+from research import ResearchConfig, Researcher
+from telemetry import Trace, percentile
+from budget import ARTICLE_WORD_LIMIT, trim_to_sentence
+from providers import MODELS
+from routing import ROUTE_REVIEW, ROUTING_PRESETS, preset_policy, route_report, trace_cost
+from writer import ENGINES, ArticleWriter
+
+TOPICS = [
+    "Jak stres wpływa na kondycję skóry",
+    "Sen a regeneracja skóry - co mówią badania",
+    "Pielęgnacja skóry zimą bez podrażnień",
+    "Nawyki, które postarzają skórę szybciej niż czas",
+    "Dieta dla zdrowej cery - mity i fakty",
+    "Jak przygotować skórę do lata",
+]
+
+
+def step_group(step: str) -> str:
+    """Sekcje i przejścia liczymy łącznie, niezależnie od numeru"""
+    return re.sub(r"^(sekcja) \d+$", r"\1", step.split(":")[0])
+
+
+class Benchmark:
+    """Uruchamia serię artykułów na serwerze testowym i zbiera pomiary"""
+
+    def __init__(self, server: MockLLMServer, provider: str = "claude", parallel_sections: bool = False,
+                 stream: bool = False, read_timeout: float = 5.0, research: bool = False,
+                 engine: str = "pipeline", routing: str = "single"):
+        self.server = server
+        self.provider = provider
+        self.parallel_sections = parallel_sections
+        self.stream = stream
+        self.read_timeout = read_timeout
+        self.research = research
+        self.engine = engine
+        self.routing = routing
+
+    def _writer(self, pool_config: PoolConfig) -> ArticleWriter:
+        writer = ArticleWriter()
+        writer.set_config("benchmark", self.provider, pool_config)
+        writer.base_urls = {provider: self.server.base_url for provider in MODELS}
+        writer.set_routing(preset_policy(self.routing, self.provider))
+        return writer
+
+    def _streamed_article(self, writer: ArticleWriter, topic: str, clinic: str) -> str:
+        """Ta sama ścieżka co w UI z podglądem na żywo: stream_introduction/stream_section"""
+        writer.usage.reset()
+        writer.create_outline(topic, clinic)
+        title, outline = writer.title, writer.outline
+        article = f"# {title}\n\n" + trim_to_sentence("".join(writer.stream_introduction(title, topic, outline,
+                                                                                          clinic=clinic)))
+        for i, section_title in enumerate(outline):
+            section = trim_to_sentence("".join(writer.stream_section(section_title, i, title, topic, clinic,
+                                                                     outline, article)))
+            article += f"\n\n## {section_title}\n\n{section}"
+        return article
+
+    def _article(self, number: int, pool_config: PoolConfig) -> Dict:
+        writer = self._writer(pool_config)
+        topic = TOPICS[number % len(TOPICS)]
+        clinic = list(CLINICS)[number % len(CLINICS)]
+        status, article = "ok", ""
+        research_trace = Trace()  # generate_article zaczyna własny ślad
+        start = time.perf_counter()
+        try:
+            if self.research:
+                config = ResearchConfig(endpoint=f"{self.server.base_url}/customsearch/v1",
+                                        read_timeout=self.read_timeout)
+                with research_trace.span("research", "research", "bm25"):
+                    # Cache HTTP w pamięci - pomiar bez trafień z poprzednich uruchomień
+                    writer.set_research(Researcher(config, CompletionCache(":memory:")).run(topic))
+            if self.engine == "structured":
+                article = writer.generate_article_structured(topic, clinic, stream=self.stream)["article"]
+            elif self.stream:
+                article = self._streamed_article(writer, topic, clinic)
+            else:
+                article = writer.generate_article(topic, clinic, parallel_sections=self.parallel_sections)["article"]
+        except Exception as e:
+            status = f"error: {e}"
+        return {"status": status, "words": len(article.split()), "seconds": time.perf_counter() - start,
+                "records": research_trace.snapshot() + writer.trace.snapshot()}
+
+    def run(self, articles: int, concurrency: int) -> Dict:
+        pool_config = PoolConfig(pool_size=concurrency * (5 if self.parallel_sections else 1),
+                                 read_timeout=self.read_timeout)
+        scheduler = get_scheduler(self.provider)
+        retries_before = scheduler.stats()["retries"]
+        requests_before = self.server.requests
+
+        tracemalloc.start()
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            results = list(executor.map(lambda n: self._article(n, pool_config), range(articles)))
+        elapsed = time.perf_counter() - start
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        latencies: Dict[str, List[float]] = {}
+        ttfts: Dict[str, List[float]] = {}
+        for result in results:
+            for record in result["records"]:
+                if record.status != "ok":
+                    continue
+                group = step_group(record.step)
+                latencies.setdefault(group, []).append(record.latency)
+                if record.ttft is not None:
+                    ttfts.setdefault(group, []).append(record.ttft)
+
+        ok = sum(1 for result in results if result["status"] == "ok")
+        records = [record for result in results for record in result["records"]]
+        output_tokens = sum(record.output_tokens for result in results for record in result["records"])
+        words = [result["words"] for result in results if result["status"] == "ok"]
+        article_seconds = [result["seconds"] for result in results if result["status"] == "ok"]
+        errors = [result["status"] for result in results if result["status"] != "ok"]
+        # Szkice bez ani jednej rewizji znaczą, że któraś ścieżka (np. strumieniowa) pomija sprawdzanie
+        policy = preset_policy(self.routing, self.provider)
+        reviews = sum(1 for record in records if record.route == ROUTE_REVIEW)
+        if self.engine == "pipeline" and policy is not None and policy.speculative and ok and not reviews:
+            errors.append(f"polityka {self.routing}: szkice bez wywołań rewizji")
+        return {
+            "engine": self.engine,
+            "routing": self.routing,
+            "concurrency": concurrency,
+            "articles": articles,
+            "ok": ok,
+            "errors": errors,
+            "reviews": reviews,
+            "seconds": round(elapsed, 2),
+            "articles_per_minute": round(ok / elapsed * 60, 2) if elapsed else 0.0,
+            "http_requests": self.server.requests - requests_before,
+            "retries": scheduler.stats()["retries"] - retries_before,
+            "output_tokens_per_article": round(output_tokens / max(1, len(results))),
+            "cost_per_article": round(trace_cost(records) / max(1, len(results)), 5),
+            "words_p50": percentile(words, 0.50),
+            "words_max": max(words, default=None),
+            "within_limit": sum(1 for count in words if count <= ARTICLE_WORD_LIMIT),
+            "article_p50": round(percentile(article_seconds, 0.50), 2) if article_seconds else None,
+            "article_p95": round(percentile(article_seconds, 0.95), 2) if article_seconds else None,
+            "steps": {
+                group: {
+                    "n": len(values),
+                    "p50": round(percentile(values, 0.50), 3),
+                    "p95": round(percentile(values, 0.95), 3),
+                    "p99": round(percentile(values, 0.99), 3),
+                    "ttft_p50": round(percentile(ttfts[group], 0.50), 3) if group in ttfts else None,
+                }
+                for group, values in latencies.items()
+            },
+            "routes": route_report(records),
+            "traced_peak_mb": round(peak / 2 ** 20, 2),
+            "max_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        }
+
+
+def print_report(result: Dict):
+    print(f"\n=== {result['engine']} ({result['routing']}), współbieżność {result['concurrency']}: {result['ok']}/{result['articles']} artykułów "
+          f"w {result['seconds']} s → {result['articles_per_minute']} art./min")
+    print(f"    zapytań HTTP: {result['http_requests']}, ponowień: {result['retries']}, "
+          f"pamięć: szczyt {result['traced_peak_mb']} MB (tracemalloc), RSS {result['max_rss_mb']} MB")
+    print(f"    tokeny wyjścia na artykuł: {result['output_tokens_per_article']}, "
+          f"słowa: p50 {result['words_p50']}, maks. {result['words_max']}, "
+          f"koszt artykułu: {result['cost_per_article']:.4f} USD")
+    print(f"    {'krok':<16}{'n':>5}{'p50':>9}{'p95':>9}{'p99':>9}{'TTFT p50':>10}")
+    for group, stats in result["steps"].items():
+        ttft = f"{stats['ttft_p50']:.3f}" if stats["ttft_p50"] is not None else "-"
+        print(f"    {group:<16}{stats['n']:>5}{stats['p50']:>9.3f}{stats['p95']:>9.3f}{stats['p99']:>9.3f}{ttft:>10}")
+    print(f"    {'trasa':<16}{'model':<28}{'n':>5}{'p50':>8}{'p95':>8}{'USD':>10}{'zatw.':>8}")
+    for row in result["routes"]:
+        p50 = f"{row['Czas p50 (s)']:.2f}" if row["Czas p50 (s)"] is not None else "-"
+        p95 = f"{row['Czas p95 (s)']:.2f}" if row["Czas p95 (s)"] is not None else "-"
+        print(f"    {row['Trasa']:<16}{row['Model']:<28}{row['Wywołania']:>5}{p50:>8}{p95:>8}"
+              f"{row['Koszt (USD)']:>10.4f}{row['Szkice zatwierdzone']:>8}")
+    for error in result["errors"][:5]:
+        print(f"    ! {error}")
+
+
+def print_comparison(results: List[Dict]):
+    """Silniki i polityki routingu obok siebie, osobno dla każdego poziomu współbieżności"""
+    print(f"\n{'silnik':<12}{'routing':<13}{'wsp.':>5}{'art./min':>10}{'art. p50':>10}{'art. p95':>10}"
+          f"{'HTTP/art.':>11}{'tok. wyj.':>11}{'USD/art.':>10}{'słowa p50':>11}{'≤ limit':>9}")
+    for result in sorted(results, key=lambda r: (r["concurrency"], r["engine"], r["routing"])):
+        per_article = result["http_requests"] / max(1, result["articles"])
+        print(f"{result['engine']:<12}{result['routing']:<13}{result['concurrency']:>5}"
+              f"{result['articles_per_minute']:>10}{result['article_p50'] or '-':>10}"
+              f"{result['article_p95'] or '-':>10}{per_article:>11.1f}{result['output_tokens_per_article']:>11}"
+              f"{result['cost_per_article']:>10.4f}{result['words_p50'] or '-':>11}"
+              f"{result['within_limit']:>5}/{result['ok']:<3}")
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark generatora na lokalnym serwerze testowym")
+    parser.add_argument("--articles", type=int, default=8, help="liczba artykułów na poziom współbieżności")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 8])
+    parser.add_argument("--provider", choices=sorted(MODELS), default="claude")
+    parser.add_argument("--engine", choices=ENGINES, default="pipeline")
+    parser.add_argument("--compare", action="store_true", help="oba silniki na tych samych tematach")
+    parser.add_argument("--routing", nargs="+", choices=list(ROUTING_PRESETS), default=["single"],
+                        help="polityki routingu modeli do porównania (routing.py)")
+    parser.add_argument("--fast-model-speedup", type=float, default=3.0,
+                        help="ile razy szybciej serwer testowy odpowiada małym modelom")
+    parser.add_argument("--review-approve-rate", type=float, default=0.6,
+                        help="odsetek szkiców zatwierdzanych przez rewizję bez zmian")
+    parser.add_argument("--parallel-sections", action="store_true")
+    parser.add_argument("--stream", action="store_true", help="ścieżka strumieniowa (jak podgląd na żywo w UI)")
+    parser.add_argument("--research", action="store_true", help="research na wyszukiwarce serwera testowego")
+    parser.add_argument("--median-latency", type=float, default=0.3, help="mediana opóźnienia serwera (s)")
+    parser.add_argument("--latency-sigma", type=float, default=0.5)
+    parser.add_argument("--tokens-per-second", type=float, default=400.0)
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="odsetek odpowiedzi 429")
+    parser.add_argument("--overload-rate", type=float, default=0.0, help="odsetek odpowiedzi 529")
+    parser.add_argument("--timeout-rate", type=float, default=0.0, help="odsetek odpowiedzi bez odpowiedzi")
+    parser.add_argument("--read-timeout", type=float, default=5.0)
+    parser.add_argument("--seed", type=int, default=1234)
+    parser.add_argument("--json", help="zapisz wyniki do pliku JSON")
+    args = parser.parse_args(argv)
+
+    random.seed(args.seed)  # jitter ponowień
+    config = MockConfig(
+        median_latency=args.median_latency, latency_sigma=args.latency_sigma,
+        tokens_per_second=args.tokens_per_second, rate_limit_rate=args.rate_limit_rate,
+        overload_rate=args.overload_rate, timeout_rate=args.timeout_rate,
+        hang_seconds=args.read_timeout * 2, retry_after=0.2, seed=args.seed,
+        fast_model_speedup=args.fast_model_speedup, review_approve_rate=args.review_approve_rate,
+    )
+    # Limiter ma mierzyć potok, a nie domyślne limity kont API
+    scheduler = get_scheduler(args.provider)
+    scheduler.requests.set_capacity(1_000_000)
+    scheduler.tokens.set_capacity(1_000_000_000)
+
+    results = []
+    with MockLLMServer(config) as server:
+        print(f"Serwer testowy: {server.base_url} (seed {args.seed})")
+        engines = ENGINES if args.compare else (args.engine,)
+        for concurrency in args.concurrency:
+            for engine in engines:
+                for routing in args.routing:
+                    benchmark = Benchmark(server, args.provider, args.parallel_sections, args.stream,
+                                          args.read_timeout, args.research, engine, routing)
+                    result = benchmark.run(args.articles, max(1, concurrency))
+                    print_report(result)
+                    results.append(result)
+        if args.compare or len(args.routing) > 1:
+            print_comparison(results)
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"args": vars(args), "results": results}, f, ensure_ascii=False, indent=2)
+    return 1 if any(result["errors"] for result in results) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
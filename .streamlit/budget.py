@@ -0,0 +1,144 @@
+"""Budżet słów artykułu - `max_tokens` każdego wywołania liczony z tego, co zostało.
+
+Limit 800 słów (liczonych jak w UI, razem z tytułem i śródtytułami) jest dzielony
+na wstęp i sekcje. Każda sekcja dostaje równą część słów, które zostały po już
+napisanych fragmentach - dłuższa sekcja skraca kolejne, krótsza je wydłuża.
+
+Tokeny na słowo szacujemy lokalnie, bez tokenizera dostawcy: punktem wyjścia są
+średnie dla polskiego tekstu, a każda odpowiedź z polem `usage` koryguje
+wartość dla modelu, który ją napisał (średnia wykładnicza, wspólna dla procesu).
+"""
+import math
+import re
+import threading
+from typing import Dict, List, Tuple
+
+from providers import MODELS
+
+ARTICLE_WORD_LIMIT = 800
+# Planujemy z zapasem - model rzadko trafia dokładnie w zadaną długość
+ARTICLE_WORD_TARGET = 740
+INTRO_WORDS = 70
+MIN_SECTION_WORDS = 80
+MAX_SECTION_WORDS = 250
+
+# Polskie słowo z interpunkcją i znacznikami Markdown - wartości startowe przed kalibracją
+TOKENS_PER_WORD = {
+    "claude": 2.3,
+    "openai": 1.8,
+    "deepseek": 2.1,
+}
+DEFAULT_TOKENS_PER_WORD = 2.3
+# Zapas ponad plan, żeby limit nie ucinał ostatniego zdania
+HEADROOM = 1.3
+MARKUP_TOKENS = 30
+# Limity zaokrąglane w górę - drobne zmiany kalibracji nie zmieniają kluczy cache odpowiedzi
+TOKEN_STEP = 50
+CALIBRATION_WEIGHT = 0.3
+MIN_CALIBRATION_WORDS = 20
+
+_SENTENCE_END = re.compile(r"[.!?…][\"”»)*_]*(?=\s|$)")
+
+
+def count_words(text: str) -> int:
+    """Liczba słów tak, jak liczy ją UI (`len(text.split())`)"""
+    return len(text.split())
+
+
+def trim_to_sentence(text: str) -> str:
+    """Obcina tekst ucięty limitem tokenów do ostatniego pełnego zdania.
+
+    Tekst zakończony zdaniem (albo punktem listy) zostaje bez zmian; tak samo,
+    gdy po obcięciu zostałoby mniej niż połowa.
+    """
+    stripped = text.rstrip()
+    last_line = stripped.splitlines()[-1].lstrip() if stripped else ""
+    if not stripped or _SENTENCE_END.search(stripped[-3:]) or last_line.startswith(("-", "*")):
+        return text
+    ends = [match.end() for match in _SENTENCE_END.finditer(stripped)]
+    if not ends or ends[-1] < len(stripped) / 2:
+        return text
+    return stripped[:ends[-1]]
+
+
+class TokenRatio:
+    """Tokeny wyjścia na słowo dla jednego dostawcy, korygowane z pól usage"""
+
+    def __init__(self, initial: float):
+        self._lock = threading.Lock()
+        self.value = initial
+        self.samples = 0
+
+    def observe(self, words: int, output_tokens: int):
+        if words < MIN_CALIBRATION_WORDS or output_tokens <= 0:
+            return  # cache lokalny, brak usage albo zbyt krótki tekst
+        with self._lock:
+            weight = 0.5 if self.samples == 0 else CALIBRATION_WEIGHT
+            self.value = (1 - weight) * self.value + weight * output_tokens / words
+            self.samples += 1
+
+    def tokens_for(self, words: float) -> int:
+        tokens = words * self.value * HEADROOM + MARKUP_TOKENS
+        return int(math.ceil(tokens / TOKEN_STEP)) * TOKEN_STEP
+
+
+class WordBudget:
+    """Podział słów jednego artykułu na wstęp (indeks -1) i sekcje (bezpieczny dla wątków)"""
+
+    def __init__(self, title: str, outline: List[str], ratio: TokenRatio,
+                 target_words: int = ARTICLE_WORD_TARGET, intro_words: int = INTRO_WORDS):
+        self.title = title
+        self.outline = list(outline)
+        self.ratio = ratio
+        self.intro_words = intro_words
+        # "# Tytuł" i "## Śródtytuł" też wliczają się do limitu
+        headings = count_words(f"# {title}") + sum(count_words(f"## {heading}") for heading in outline)
+        self.available = max(0, target_words - headings)
+        self.written: Dict[int, int] = {}
+        self._lock = threading.Lock()
+
+    def matches(self, title: str, outline: List[str]) -> bool:
+        return self.title == title and self.outline == list(outline)
+
+    def words_for(self, index: int) -> int:
+        """Planowana liczba słów wstępu (-1) albo sekcji `index`"""
+        if index < 0:
+            return min(self.intro_words, self.available // 4)
+        with self._lock:
+            used = sum(words for i, words in self.written.items() if i != index)
+            if -1 not in self.written:
+                used += self.intro_words
+            remaining = [i for i in range(len(self.outline)) if i == index or i not in self.written]
+        words = (self.available - used) / max(1, len(remaining))
+        return int(min(MAX_SECTION_WORDS, max(MIN_SECTION_WORDS, words)))
+
+    def max_tokens(self, index: int) -> int:
+        return self.ratio.tokens_for(self.words_for(index))
+
+    def record(self, index: int, text: str, output_tokens: int = 0):
+        """Zapisuje napisany fragment; `output_tokens` z usage kalibruje przelicznik dostawcy"""
+        words = count_words(text)
+        with self._lock:
+            self.written[index] = words
+        self.ratio.observe(words, output_tokens)
+
+    def summary(self) -> Dict[str, int]:
+        with self._lock:
+            written = sum(self.written.values())
+        return {"available": self.available, "written": written, "tokens_per_word": round(self.ratio.value, 2)}
+
+
+_ratios: Dict[Tuple[str, str], TokenRatio] = {}
+_registry_lock = threading.Lock()
+
+
+def get_ratio(provider: str, model: str = "") -> TokenRatio:
+    """Współdzielony przelicznik tokenów na słowo dla modelu (domyślnie głównego modelu dostawcy).
+
+    Kalibracja przeżywa artykuły; szybki model z routingu ma własny przelicznik.
+    """
+    key = (provider, model or MODELS.get(provider, ""))
+    with _registry_lock:
+        if key not in _ratios:
+            _ratios[key] = TokenRatio(TOKENS_PER_WORD.get(provider, DEFAULT_TOKENS_PER_WORD))
+        return _ratios[key]
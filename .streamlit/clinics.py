@@ -0,0 +1,29 @@
+"""Rejestr klinik partnerskich, o których wspominają artykuły.
+
+Czyste dane bez zależności - importują go zarówno aplikacja Streamlit, jak i
+procesy bez interfejsu (batch.py, benchmark.py, workery).
+"""
+from typing import Dict
+
+CLINICS = {
+    "Klinika Hospittal": {
+        "nazwa": "Klinika Hospittal",
+        "opis": "szpital chirurgii plastycznej łączący najwyższe standardy medyczne z dbałością o naturalne efekty",
+        "specjalizacje": ["chirurgia plastyczna", "chirurgia rekonstrukcyjna", "medycyna estetyczna", "zabiegi estetyczne"]
+    },
+    "Centrum Medyczne Gunarys": {
+        "nazwa": "Centrum Medyczne Gunarys",
+        "opis": "klinika oferująca kompleksową opiekę medyczną z indywidualnym podejściem do każdego pacjenta",
+        "specjalizacje": ["chirurgia estetyczna", "ginekologia", "laseroterapia", "medycyna estetyczna", "blefaroplastyka", "profilaktyka zdrowotna"]
+    },
+    "Klinika Ambroziak": {
+        "nazwa": "Klinika Ambroziak",
+        "opis": "klinika z ponad 20-letnim doświadczeniem wyznaczająca trendy dermatologii klinicznej i estetycznej w Polsce",
+        "specjalizacje": ["dermatologia kliniczna", "dermatologia estetyczna", "medycyna estetyczna", "kosmetologia", "autorskie kosmetyki Dr Ambroziak Laboratorium"]
+    }
+}
+
+
+def clinic_info(clinic: str) -> Dict:
+    """Dane kliniki; nieznana klinika ma tylko nazwę (taką, jak podano)"""
+    return CLINICS.get(clinic, {"nazwa": clinic})
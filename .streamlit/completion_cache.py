@@ -0,0 +1,120 @@
+"""Trwały cache odpowiedzi LLM adresowany treścią zapytania (SQLite).
+
+Klucz to skrót SHA-256 z (dostawca, model, max_tokens, temperatura, wiadomości),
+więc identyczny prompt - np. po rerunie Streamlit albo ponownym generowaniu
+niezmienionego konspektu - nie trafia drugi raz do API. Wpisy wygasają po TTL,
+a po przekroczeniu limitu rozmiaru usuwane są najdawniej używane (LRU).
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, List, Optional
+
+DEFAULT_CACHE_PATH = os.environ.get("COMPLETION_CACHE_PATH", os.path.join(".cache", "completions.sqlite"))
+
+
+def cache_key(provider: str, model: str, max_tokens: int, temperature: Optional[float],
+              messages: List[Dict]) -> str:
+    payload = json.dumps([provider, model, max_tokens, temperature, messages],
+                         ensure_ascii=False, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class CompletionCache:
+    """Cache odpowiedzi w SQLite z TTL i eksmisją LRU według rozmiaru"""
+
+    def __init__(self, path: str = DEFAULT_CACHE_PATH, max_bytes: int = 50 * 1024 * 1024,
+                 ttl_seconds: Optional[float] = 7 * 24 * 3600):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS completions ("
+            " key TEXT PRIMARY KEY, value TEXT NOT NULL, size INTEGER NOT NULL,"
+            " created REAL NOT NULL, accessed REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS completions_accessed ON completions (accessed)")
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.evictions = 0
+
+    def get(self, key: str) -> Optional[str]:
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute("SELECT value, created FROM completions WHERE key = ?", (key,)).fetchone()
+            if row is not None and self.ttl_seconds is not None and now - row[1] > self.ttl_seconds:
+                self._conn.execute("DELETE FROM completions WHERE key = ?", (key,))
+                row = None
+            if row is None:
+                self.misses += 1
+                return None
+            self._conn.execute("UPDATE completions SET accessed = ? WHERE key = ?", (now, key))
+            self.hits += 1
+            return row[0]
+
+    def put(self, key: str, value: str):
+        now = time.time()
+        size = len(value.encode("utf-8"))
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO completions (key, value, size, created, accessed) VALUES (?, ?, ?, ?, ?)",
+                (key, value, size, now, now),
+            )
+            self.writes += 1
+            self._evict(now)
+
+    def _evict(self, now: float):
+        """Usuwa wpisy przeterminowane, a potem najdawniej używane ponad limit rozmiaru"""
+        if self.ttl_seconds is not None:
+            cursor = self._conn.execute("DELETE FROM completions WHERE created < ?", (now - self.ttl_seconds,))
+            self.evictions += max(cursor.rowcount, 0)
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM completions").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        for key, size in self._conn.execute("SELECT key, size FROM completions ORDER BY accessed").fetchall():
+            self._conn.execute("DELETE FROM completions WHERE key = ?", (key,))
+            self.evictions += 1
+            total -= size
+            if total <= self.max_bytes:
+                break
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM completions")
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            entries, total = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM completions").fetchone()
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "writes": self.writes,
+                "evictions": self.evictions,
+                "entries": entries,
+                "bytes": total,
+            }
+
+
+_caches: Dict[str, CompletionCache] = {}
+_registry_lock = threading.Lock()
+
+
+def get_cache(path: str = DEFAULT_CACHE_PATH) -> CompletionCache:
+    """Współdzielony cache dla danej ścieżki (przeżywa reruny Streamlit)"""
+    with _registry_lock:
+        cache = _caches.get(path)
+        if cache is None:
+            cache = CompletionCache(path)
+            _caches[path] = cache
+        return cache
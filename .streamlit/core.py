@@ -0,0 +1,62 @@
+"""Rdzeń generatora bez interfejsu - jeden punkt importu dla skryptów i workerów.
+
+    from core import ArticleWriter, CLINICS
+
+Nazwy są ładowane leniwie (PEP 562): `import core` nie wczytuje niczego poza
+tym modułem, a dopiero pierwsze użycie nazwy importuje jej moduł. Streamlit
+nie jest importowany nigdy - to zależność wyłącznie `app.py`.
+"""
+import importlib
+from typing import List
+
+_EXPORTS = {
+    "CLINICS": "clinics",
+    "clinic_info": "clinics",
+    "API_KEY_ENV": "providers",
+    "BASE_URLS": "providers",
+    "MODELS": "providers",
+    "PROVIDER_NAMES": "providers",
+    "TEMPERATURES": "providers",
+    "ArticleWriter": "writer",
+    "ENGINES": "writer",
+    "GenerationError": "writer",
+    "check_response": "writer",
+    "PoolConfig": "http_pool",
+    "ProviderError": "errors",
+    "ConfigurationError": "errors",
+    "ArticleDraft": "drafts",
+    "CompletionCache": "completion_cache",
+    "get_cache": "completion_cache",
+    "ResearchConfig": "research",
+    "Researcher": "research",
+    "get_router": "failover",
+    "ArticleLibrary": "library",
+    "get_library": "library",
+    "DuplicateIndex": "dedup",
+    "get_dedup_index": "dedup",
+    "ArticleJob": "jobs",
+    "get_job_queue": "jobs",
+    "BatchArticleBuilder": "batch_api",
+    "JobStore": "job_store",
+    "open_job_store": "job_store",
+    "FleetWorker": "worker",
+    "Route": "routing",
+    "RoutingPolicy": "routing",
+    "preset_policy": "routing",
+    "route_report": "routing",
+}
+
+__all__ = sorted(_EXPORTS)
+
+
+def __getattr__(name: str):
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module), name)
+    globals()[name] = value  # kolejne odwołania bez __getattr__
+    return value
+
+
+def __dir__() -> List[str]:
+    return __all__
@@ -0,0 +1,204 @@
+"""Wykrywanie prawie identycznych sekcji w całym dorobku generatora (MinHash + LSH).
+
+Ten sam model z tym samym szablonem promptu potrafi napisać niemal ten sam
+akapit dla różnych artykułów o podobnym temacie. Każda sekcja jest dzielona na
+shingle (5 kolejnych słów), z których powstaje sygnatura MinHash (128 funkcji
+skrótu) - jej zgodność przybliża podobieństwo Jaccarda zbiorów shingli.
+Sygnatura dzielona jest na 32 pasma po 4 wartości; sekcje ze wspólnym kubełkiem
+w którymkolwiek paśmie są kandydatami, a dopiero ich sygnatury są porównywane.
+Wyszukiwanie to 32 odczyty z indeksu SQLite - jego koszt zależy od liczby
+kandydatów, a nie od wielkości korpusu.
+"""
+import hashlib
+import os
+import random
+import re
+import sqlite3
+import struct
+import threading
+import time
+import unicodedata
+from array import array
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+DEFAULT_DEDUP_PATH = os.environ.get("DEDUP_INDEX_PATH", os.path.join("data", "minhash.sqlite"))
+
+SHINGLE_WORDS = 5
+NUM_PERM = 128
+BANDS = 32
+ROWS = NUM_PERM // BANDS
+# Szacowane podobieństwo Jaccarda, od którego sekcję uznajemy za powtórzenie.
+# Przy 32 pasmach po 4 wiersze para o podobieństwie 0,5 trafia do kandydatów z p. ~0,87.
+DUPLICATE_THRESHOLD = 0.5
+MIN_SHINGLES = 8  # krótsze teksty (jedno-dwa zdania) nie są sprawdzane
+EXCERPT_CHARS = 200
+
+_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+_rng = random.Random(20240601)  # stałe ziarno - sygnatury muszą być zgodne między uruchomieniami
+_PERMUTATIONS = [(_rng.randrange(1, _PRIME), _rng.randrange(0, _PRIME)) for _ in range(NUM_PERM)]
+
+
+def normalize(text: str) -> List[str]:
+    """Słowa bez znaczników Markdown, interpunkcji, wielkości liter i znaków diakrytycznych"""
+    text = unicodedata.normalize("NFKD", text.lower().replace("ł", "l"))
+    text = "".join(char for char in text if not unicodedata.combining(char))
+    return re.findall(r"\w+", text)
+
+
+def shingles(text: str, size: int = SHINGLE_WORDS) -> set:
+    words = normalize(text)
+    return {
+        int.from_bytes(hashlib.blake2b(" ".join(words[i:i + size]).encode("utf-8"), digest_size=4).digest(), "big")
+        for i in range(max(0, len(words) - size + 1))
+    }
+
+
+def minhash(shingle_set: set) -> List[int]:
+    """Sygnatura MinHash: minimum każdej z NUM_PERM funkcji (a·x + b) mod p po shinglach"""
+    return [min(((a * x + b) % _PRIME) & _MAX_HASH for x in shingle_set) for a, b in _PERMUTATIONS]
+
+
+def similarity(left: List[int], right: List[int]) -> float:
+    """Szacowane podobieństwo Jaccarda dwóch sygnatur"""
+    return sum(1 for x, y in zip(left, right) if x == y) / len(left)
+
+
+def band_keys(signature: List[int]) -> List[int]:
+    """Kubełek każdego pasma jako 63-bitowa liczba (mieści się w INTEGER SQLite), różny dla każdego pasma"""
+    keys = []
+    for band in range(BANDS):
+        values = struct.pack(f">{ROWS}I", *signature[band * ROWS:(band + 1) * ROWS])
+        digest = hashlib.blake2b(values, digest_size=8, person=band.to_bytes(2, "big")).digest()
+        keys.append(int.from_bytes(digest, "big") >> 1)
+    return keys
+
+
+@dataclass
+class DuplicateMatch:
+    """Wcześniej napisana sekcja podobna do sprawdzanej"""
+    section_id: int
+    article_key: str
+    title: str
+    heading: str
+    excerpt: str
+    similarity: float
+
+
+@dataclass
+class DuplicateFlag:
+    """Sekcja bieżącego artykułu zgłoszona jako powtórzenie"""
+    index: int
+    heading: str
+    match: DuplicateMatch
+    regenerated: bool = False
+    similarity_after: Optional[float] = None  # po przepisaniu (0.0 - brak podobnej sekcji)
+
+
+class DuplicateIndex:
+    """Indeks LSH sekcji w SQLite (bezpieczny dla wątków)"""
+
+    def __init__(self, path: str = DEFAULT_DEDUP_PATH, threshold: float = DUPLICATE_THRESHOLD):
+        self.path = path
+        self.threshold = threshold
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS sections ("
+            " id INTEGER PRIMARY KEY, article_key TEXT NOT NULL, title TEXT NOT NULL, heading TEXT NOT NULL,"
+            " excerpt TEXT NOT NULL, signature BLOB NOT NULL, created REAL NOT NULL,"
+            " UNIQUE (article_key, heading))"
+        )
+        # Numer pasma jest wliczony w skrót kubełka, więc wystarcza jedna kolumna klucza;
+        # wyszukiwanie kandydatów to BANDS odczytów z klucza głównego
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS buckets ("
+            " bucket INTEGER NOT NULL, section_id INTEGER NOT NULL,"
+            " PRIMARY KEY (bucket, section_id)) WITHOUT ROWID"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS buckets_section ON buckets (section_id)")
+        self.lookups = 0
+        self.flagged = 0
+
+    def signature(self, text: str) -> Optional[List[int]]:
+        """Sygnatura tekstu albo None, jeśli jest za krótki do porównania"""
+        shingle_set = shingles(text)
+        if len(shingle_set) < MIN_SHINGLES:
+            return None
+        return minhash(shingle_set)
+
+    def find(self, text: str, exclude_article: str = "", signature: Optional[List[int]] = None) -> List[DuplicateMatch]:
+        """Sekcje podobne do `text` (od najbardziej podobnej), z pominięciem artykułu `exclude_article`"""
+        signature = signature or self.signature(text)
+        if signature is None:
+            return []
+        keys = band_keys(signature)
+        with self._lock:
+            self.lookups += 1
+            rows = self._conn.execute(
+                "SELECT DISTINCT s.id, s.article_key, s.title, s.heading, s.excerpt, s.signature"
+                " FROM buckets b JOIN sections s ON s.id = b.section_id"
+                f" WHERE b.bucket IN ({', '.join('?' for _ in keys)}) AND s.article_key != ?",
+                keys + [exclude_article],
+            ).fetchall()
+        matches = []
+        for section_id, article_key, title, heading, excerpt, blob in rows:
+            score = similarity(signature, array("I", blob).tolist())
+            if score >= self.threshold:
+                matches.append(DuplicateMatch(section_id, article_key, title, heading, excerpt, round(score, 3)))
+        if matches:
+            with self._lock:
+                self.flagged += 1
+        return sorted(matches, key=lambda match: match.similarity, reverse=True)
+
+    def add(self, text: str, article_key: str, title: str, heading: str,
+            signature: Optional[List[int]] = None) -> Optional[int]:
+        """Dodaje sekcję (albo zastępuje poprzednią wersję tej samej sekcji artykułu)"""
+        signature = signature or self.signature(text)
+        if signature is None:
+            return None
+        blob = array("I", signature).tobytes()
+        excerpt = " ".join(text.split())[:EXCERPT_CHARS]
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                old = self._conn.execute("SELECT id FROM sections WHERE article_key = ? AND heading = ?",
+                                         (article_key, heading)).fetchone()
+                if old is not None:
+                    self._conn.execute("DELETE FROM buckets WHERE section_id = ?", (old[0],))
+                    self._conn.execute("DELETE FROM sections WHERE id = ?", (old[0],))
+                section_id = self._conn.execute(
+                    "INSERT INTO sections (article_key, title, heading, excerpt, signature, created)"
+                    " VALUES (?, ?, ?, ?, ?, ?)", (article_key, title, heading, excerpt, blob, time.time())
+                ).lastrowid
+                self._conn.executemany("INSERT OR IGNORE INTO buckets (bucket, section_id) VALUES (?, ?)",
+                                       [(key, section_id) for key in band_keys(signature)])
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return section_id
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            sections = self._conn.execute("SELECT COUNT(*) FROM sections").fetchone()[0]
+            return {"sections": sections, "lookups": self.lookups, "flagged": self.flagged}
+
+
+_indexes: Dict[str, DuplicateIndex] = {}
+_registry_lock = threading.Lock()
+
+
+def get_dedup_index(path: str = DEFAULT_DEDUP_PATH) -> DuplicateIndex:
+    """Współdzielony indeks dla danej ścieżki (przeżywa reruny Streamlit)"""
+    with _registry_lock:
+        index = _indexes.get(path)
+        if index is None:
+            index = DuplicateIndex(path)
+            _indexes[path] = index
+        return index
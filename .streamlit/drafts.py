@@ -0,0 +1,136 @@
+"""Zapis wygenerowanego artykułu sekcja po sekcji - podstawa regeneracji przyrostowej.
+
+Każda sekcja pamięta swój śródtytuł, odcisk wejścia promptu, treść oraz to,
+czy niesie wzmiankę o klinice. Po edycji konspektu `plan_sections` porównuje
+nowy konspekt ze starym i wskazuje, które sekcje trzeba napisać od nowa, a
+które można przenieść bez wywołania API.
+
+Odcisk obejmuje tylko to, co decyduje o treści sekcji: tytuł artykułu, temat,
+klinikę, kontekst, śródtytuł i obowiązek wzmianki o klinice. Pozostałe części
+promptu (sąsiednie śródtytuły, koniec poprzedniej sekcji) celowo go nie
+zmieniają - inaczej zmiana jednego śródtytułu unieważniłaby cały artykuł.
+"""
+import hashlib
+import json
+import re
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+
+def fingerprint(*parts) -> str:
+    data = json.dumps(parts, ensure_ascii=False)
+    return hashlib.sha256(data.encode("utf-8")).hexdigest()[:16]
+
+
+@dataclass
+class SectionRecord:
+    heading: str
+    fingerprint: str
+    text: str
+    mentions_clinic: bool
+
+
+@dataclass
+class SectionPlan:
+    """Decyzja dla jednej sekcji nowego konspektu"""
+    index: int
+    heading: str
+    fingerprint: str
+    mentions_clinic: bool
+    reuse: Optional[SectionRecord] = None  # None - sekcja do napisania
+    reason: str = ""
+
+
+@dataclass
+class ArticleDraft:
+    title: str
+    topic: str
+    clinic: str
+    context: str
+    intro: str = ""
+    intro_fingerprint: str = ""
+    sections: List[SectionRecord] = field(default_factory=list)
+
+    @property
+    def outline(self) -> List[str]:
+        return [section.heading for section in self.sections]
+
+    def intro_key(self) -> str:
+        return fingerprint("wstęp", self.title, self.topic, self.clinic, self.context)
+
+    def section_key(self, heading: str, mentions_clinic: bool) -> str:
+        return fingerprint("sekcja", self.title, self.topic, self.clinic, self.context, heading, mentions_clinic)
+
+    def render(self) -> str:
+        article = f"# {self.title}\n\n{self.intro}\n\n"
+        for section in self.sections:
+            article += f"## {section.heading}\n\n{section.text}\n\n"
+        return article
+
+    def update_from_markdown(self, article: str) -> bool:
+        """Przejmuje ręczne poprawki tekstu, jeśli śródtytuły się nie zmieniły.
+
+        Odciski sekcji zostają, więc poprawione sekcje dalej są przenoszone przy
+        regeneracji. Zwraca False (szkic bez zmian), gdy układ artykułu jest inny.
+        """
+        parts = re.split(r"^## (.+)$", article, flags=re.MULTILINE)
+        headings, texts = parts[1::2], [text.strip() for text in parts[2::2]]
+        if [heading.strip() for heading in headings] != self.outline:
+            return False
+        self.intro = re.sub(r"^# .*$", "", parts[0], count=1, flags=re.MULTILINE).strip()
+        for section, text in zip(self.sections, texts):
+            section.text = text
+        return True
+
+    def to_dict(self) -> Dict:
+        return {
+            "title": self.title, "topic": self.topic, "clinic": self.clinic, "context": self.context,
+            "intro": self.intro, "intro_fingerprint": self.intro_fingerprint,
+            "sections": [vars(section) for section in self.sections],
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "ArticleDraft":
+        sections = [SectionRecord(**section) for section in data.get("sections", [])]
+        return cls(data["title"], data["topic"], data["clinic"], data.get("context", ""),
+                   data.get("intro", ""), data.get("intro_fingerprint", ""), sections)
+
+
+def plan_sections(draft: ArticleDraft, outline: List[str], previous: Optional[ArticleDraft],
+                  mention_rule) -> List[SectionPlan]:
+    """Porównuje nowy konspekt `draft`/`outline` z poprzednią wersją artykułu.
+
+    Sekcja jest przenoszona, jeśli poprzednia wersja ma sekcję o identycznym
+    odcisku (także po zmianie kolejności). Pozostałe są oznaczane do napisania:
+    nowe, zmienione albo takie, którym zmieniła się rola wzmianki o klinice.
+    `mention_rule(index, count)` decyduje, które sekcje wspominają klinikę.
+    """
+    available: Dict[str, List[SectionRecord]] = {}
+    old_headings = set()
+    same_article = previous is not None and previous.intro_key() == draft.intro_key()
+    if previous is not None:
+        old_headings = {section.heading for section in previous.sections}
+        for section in previous.sections:
+            available.setdefault(section.fingerprint, []).append(section)
+
+    plans = []
+    for i, heading in enumerate(outline):
+        mentions = mention_rule(i, len(outline))
+        key = draft.section_key(heading, mentions)
+        candidates = available.get(key)
+        if candidates:
+            plans.append(SectionPlan(i, heading, key, mentions, reuse=candidates.pop(0), reason="bez zmian"))
+        elif not same_article:
+            plans.append(SectionPlan(i, heading, key, mentions, reason="nowy artykuł"))
+        elif heading in old_headings:
+            plans.append(SectionPlan(i, heading, key, mentions, reason="zmiana wzmianki o klinice"))
+        else:
+            plans.append(SectionPlan(i, heading, key, mentions, reason="nowa lub zmieniona"))
+    return plans
+
+
+def reusable_intro(draft: ArticleDraft, previous: Optional[ArticleDraft]) -> Optional[str]:
+    """Wstęp poprzedniej wersji, jeśli tytuł, temat, klinika i kontekst się nie zmieniły"""
+    if previous is not None and previous.intro and previous.intro_fingerprint == draft.intro_key():
+        return previous.intro
+    return None
@@ -0,0 +1,90 @@
+"""Typowane błędy wywołań API dostawców"""
+import time
+from typing import Mapping, Optional
+
+
+class ProviderError(Exception):
+    """Błąd wywołania API dostawcy"""
+    retryable = False
+
+    def __init__(self, message: str, provider: str = "", status: Optional[int] = None,
+                 retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.provider = provider
+        self.status = status
+        self.retry_after = retry_after
+
+    def __str__(self):
+        prefix = f"{self.provider}: " if self.provider else ""
+        status = f" (HTTP {self.status})" if self.status else ""
+        return f"{prefix}{super().__str__()}{status}"
+
+
+class ConfigurationError(ProviderError):
+    """Brak klucza API albo nieznany dostawca"""
+
+
+class AuthenticationError(ProviderError):
+    """Odrzucony klucz API (401/403)"""
+
+
+class BadRequestError(ProviderError):
+    """Zapytanie odrzucone przez API (pozostałe 4xx)"""
+
+
+class RateLimitError(ProviderError):
+    """Przekroczony limit zapytań lub tokenów (429)"""
+    retryable = True
+
+
+class OverloadedError(ProviderError):
+    """Dostawca przeciążony (529/503)"""
+    retryable = True
+
+
+class ServerError(ProviderError):
+    """Błąd serwera dostawcy (5xx)"""
+    retryable = True
+
+
+class ProviderTimeoutError(ProviderError):
+    """Przekroczony czas połączenia lub odpowiedzi"""
+    retryable = True
+
+
+class EmptyResponseError(ProviderError):
+    """Odpowiedź bez treści"""
+
+
+def parse_retry_after(headers: Mapping[str, str]) -> Optional[float]:
+    """Liczba sekund z nagłówka retry-after (sekundy albo data HTTP)"""
+    value = headers.get("retry-after")
+    if not value:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    from email.utils import parsedate_to_datetime  # rzadki przypadek - data HTTP zamiast sekund
+
+    try:
+        return max(parsedate_to_datetime(value).timestamp() - time.time(), 0.0)
+    except (TypeError, ValueError):
+        return None
+
+
+def error_for_status(provider: str, status: int, headers: Mapping[str, str], body: str) -> ProviderError:
+    """Typowany błąd dla odpowiedzi HTTP o danym kodzie"""
+    message = body.strip()[:300] or "brak treści odpowiedzi"
+    retry_after = parse_retry_after(headers)
+    if status == 429:
+        cls = RateLimitError
+    elif status in (503, 529):
+        cls = OverloadedError
+    elif status >= 500:
+        cls = ServerError
+    elif status in (401, 403):
+        cls = AuthenticationError
+    else:
+        cls = BadRequestError
+    return cls(message, provider, status, retry_after)
@@ -0,0 +1,218 @@
+"""Zapytania zabezpieczające (hedging) i przełączanie między dostawcami.
+
+Wywołanie trafia najpierw do głównego dostawcy. Jeśli nie odpowie w czasie
+wyznaczonym z jego p95 opóźnień, to samo zapytanie wysyłane jest do kolejnego
+dostawcy i wygrywa szybsza odpowiedź. Dostawcy, którzy kilka razy z rzędu
+zawiedli, są na pewien czas wyłączani przez circuit breaker.
+
+Orkiestracja działa na asyncio, a same wywołania HTTP idą przez istniejące
+(synchroniczne) pule połączeń w osobnej puli wątków. Przegranego zapytania nie
+da się przerwać - kończy się w tle, a jego wynik jest pomijany.
+"""
+import asyncio
+import contextvars
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Tuple
+
+from errors import ProviderError
+
+# Osobna pula: asyncio.run() czeka na domyślny executor, co zniweczyłoby hedging
+_executor = ThreadPoolExecutor(max_workers=32, thread_name_prefix="hedge")
+
+
+class LatencyTracker:
+    """Ostatnie czasy odpowiedzi dostawcy i wyznaczany z nich termin na hedging"""
+
+    def __init__(self, window: int = 100, min_samples: int = 10,
+                 default_deadline: float = 20.0, min_deadline: float = 2.0, percentile: float = 0.95):
+        self._samples = deque(maxlen=window)
+        self._lock = threading.Lock()
+        self.min_samples = min_samples
+        self.default_deadline = default_deadline
+        self.min_deadline = min_deadline
+        self.percentile = percentile
+
+    def record(self, seconds: float):
+        with self._lock:
+            self._samples.append(seconds)
+
+    def quantile(self) -> Optional[float]:
+        with self._lock:
+            samples = sorted(self._samples)
+        if not samples:
+            return None
+        return samples[min(int(len(samples) * self.percentile), len(samples) - 1)]
+
+    def deadline(self) -> float:
+        with self._lock:
+            enough = len(self._samples) >= self.min_samples
+        if not enough:
+            return self.default_deadline
+        return max(self.min_deadline, self.quantile())
+
+
+class CircuitBreaker:
+    """Wyłącza dostawcę po `failure_threshold` kolejnych błędach na `cooldown` sekund"""
+
+    def __init__(self, failure_threshold: int = 3, cooldown: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._opened_at: Optional[float] = None
+        self._trial_running = False
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._state(time.monotonic())
+
+    def _state(self, now: float) -> str:
+        if self._opened_at is None:
+            return "closed"
+        return "open" if now - self._opened_at < self.cooldown else "half-open"
+
+    def allow(self) -> bool:
+        """Czy można wysłać zapytanie; w stanie half-open przepuszcza jedno próbne"""
+        with self._lock:
+            state = self._state(time.monotonic())
+            if state == "closed":
+                return True
+            if state == "half-open" and not self._trial_running:
+                self._trial_running = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._trial_running = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            self._trial_running = False
+            if self._failures >= self.failure_threshold or self._opened_at is not None:
+                self._opened_at = time.monotonic()
+
+    def release(self):
+        """Zwalnia próbę half-open bez oceny dostawcy (błąd zapytania, a nie awaria dostawcy)"""
+        with self._lock:
+            self._trial_running = False
+
+
+class HedgedRouter:
+    """Wysyła zapytanie do głównego dostawcy i w razie zwłoki lub awarii do kolejnych"""
+
+    def __init__(self, fallbacks: List[str]):
+        self.fallbacks = list(fallbacks)
+        self._lock = threading.Lock()
+        self.latency: Dict[str, LatencyTracker] = {}
+        self.breakers: Dict[str, CircuitBreaker] = {}
+        self.hedged = 0
+        self.wins: Dict[str, int] = {}
+
+    def _tracker(self, provider: str) -> LatencyTracker:
+        with self._lock:
+            return self.latency.setdefault(provider, LatencyTracker())
+
+    def _breaker(self, provider: str) -> CircuitBreaker:
+        with self._lock:
+            return self.breakers.setdefault(provider, CircuitBreaker())
+
+    def call(self, call_provider: Callable[[str], str], primary: str) -> Tuple[str, str]:
+        """Synchroniczna fasada - zwraca (dostawca, odpowiedź)"""
+        return asyncio.run(self.acall(call_provider, primary))
+
+    async def acall(self, call_provider: Callable[[str], str], primary: str) -> Tuple[str, str]:
+        candidates = list(dict.fromkeys([primary] + self.fallbacks))
+        loop = asyncio.get_running_loop()
+        running: Dict[asyncio.Future, str] = {}
+        last_error: Optional[Exception] = None
+
+        def launch_next() -> bool:
+            while candidates:
+                provider = candidates.pop(0)
+                if self._breaker(provider).allow():
+                    # Kopia kontekstu, żeby pomiary z wątku trafiły do rekordu telemetrii wywołania
+                    context = contextvars.copy_context()
+                    future = loop.run_in_executor(_executor, context.run, self._attempt, call_provider, provider)
+                    running[future] = provider
+                    return True
+            return False
+
+        if not launch_next():
+            raise ProviderError("Wszyscy dostawcy chwilowo wyłączeni (circuit breaker)", primary)
+
+        while running:
+            # Termin na hedging liczony z p95 dostawcy, który wystartował ostatni
+            newest = list(running.values())[-1]
+            timeout = self._tracker(newest).deadline() if candidates else None
+            done, _ = await asyncio.wait(list(running), timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+
+            if not done:
+                if launch_next():
+                    with self._lock:
+                        self.hedged += 1
+                continue
+
+            for future in done:
+                provider = running.pop(future)
+                error = future.exception()
+                if error is None:
+                    with self._lock:
+                        self.wins[provider] = self.wins.get(provider, 0) + 1
+                    return provider, future.result()
+                last_error = error
+                launch_next()  # błąd - od razu próbujemy kolejnego dostawcy
+
+        raise last_error or ProviderError("Brak dostępnego dostawcy", primary)
+
+    def _attempt(self, call_provider: Callable[[str], str], provider: str) -> str:
+        start = time.perf_counter()
+        try:
+            result = call_provider(provider)
+        except Exception as e:
+            # Awaria dostawcy (timeout, 429, 5xx/529) liczy się do wyłącznika; błąd samego
+            # zapytania (400, 401, pusta odpowiedź) nie świadczy o jego dostępności
+            if getattr(e, "retryable", True):
+                self._breaker(provider).record_failure()
+            else:
+                self._breaker(provider).release()
+            raise
+        self._tracker(provider).record(time.perf_counter() - start)
+        self._breaker(provider).record_success()
+        return result
+
+    def stats(self) -> Dict[str, Dict]:
+        with self._lock:
+            providers = set(self.latency) | set(self.breakers)
+            hedged, wins = self.hedged, dict(self.wins)
+        return {
+            provider: {
+                "state": self._breaker(provider).state,
+                "p95": self._tracker(provider).quantile(),
+                "wins": wins.get(provider, 0),
+                "hedged": hedged,
+            }
+            for provider in sorted(providers)
+        }
+
+
+_routers: Dict[Tuple[str, ...], HedgedRouter] = {}
+_registry_lock = threading.Lock()
+
+
+def get_router(fallbacks: List[str]) -> HedgedRouter:
+    """Współdzielony router dla danej listy zapasowych dostawców (statystyki przeżywają reruny)"""
+    key = tuple(fallbacks)
+    with _registry_lock:
+        router = _routers.get(key)
+        if router is None:
+            router = HedgedRouter(fallbacks)
+            _routers[key] = router
+        return router
@@ -0,0 +1,156 @@
+"""Współdzielone pule połączeń HTTP (keep-alive) do dostawców API.
+
+Moduł trzyma jedną sesję `requests` na dostawcę. Ponieważ Streamlit przy
+każdym rerunie wykonuje ponownie tylko główny skrypt, a zaimportowane moduły
+zostają w `sys.modules`, pule (i otwarte połączenia TLS) przeżywają reruny.
+"""
+import threading
+import time
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Dict, Optional, Tuple
+
+if TYPE_CHECKING:
+    import requests
+
+# Czas nawiązywania połączeń (TCP + TLS) w bieżącym wątku - zerowany przed każdym żądaniem
+_connect_time = threading.local()
+_pool_classes: Dict[str, type] = {}
+
+
+class _TimedConnectMixin:
+    def connect(self):
+        start = time.perf_counter()
+        try:
+            return super().connect()
+        finally:
+            _connect_time.total = getattr(_connect_time, "total", 0.0) + time.perf_counter() - start
+
+
+def _timed_pool_classes() -> Dict[str, type]:
+    """Pule urllib3 mierzące czas połączeń - tworzone przy pierwszej puli, razem z importem `requests`.
+
+    Sam import modułu jest tani, więc procesy bez wywołań HTTP (np. praca
+    wyłącznie z cache) nie płacą za ładowanie requests/urllib3.
+    """
+    if not _pool_classes:
+        from urllib3.connection import HTTPConnection, HTTPSConnection
+        from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+        class TimedHTTPConnection(_TimedConnectMixin, HTTPConnection):
+            pass
+
+        class TimedHTTPSConnection(_TimedConnectMixin, HTTPSConnection):
+            pass
+
+        class TimedHTTPConnectionPool(HTTPConnectionPool):
+            ConnectionCls = TimedHTTPConnection
+
+        class TimedHTTPSConnectionPool(HTTPSConnectionPool):
+            ConnectionCls = TimedHTTPSConnection
+
+        _pool_classes.update(http=TimedHTTPConnectionPool, https=TimedHTTPSConnectionPool)
+    return _pool_classes
+
+
+@dataclass(frozen=True)
+class PoolConfig:
+    """Ustawienia puli połączeń dla jednego dostawcy"""
+    pool_size: int = 10
+    connect_timeout: float = 5.0
+    read_timeout: float = 120.0
+
+    @property
+    def timeout(self) -> Tuple[float, float]:
+        return (self.connect_timeout, self.read_timeout)
+
+
+class ProviderPool:
+    """Sesja HTTP z pulą połączeń i licznikami dla jednego dostawcy"""
+
+    def __init__(self, provider: str, config: PoolConfig):
+        self.provider = provider
+        self.config = config
+        import requests
+        from requests.adapters import HTTPAdapter
+
+        self.session = requests.Session()
+        # pool_block=True: przy wyczerpaniu puli wątki czekają zamiast otwierać nadmiarowe połączenia
+        self._adapter = HTTPAdapter(pool_connections=1, pool_maxsize=config.pool_size, pool_block=True)
+        self._adapter.poolmanager.pool_classes_by_scheme = dict(_timed_pool_classes())
+        self.session.mount("https://", self._adapter)
+        self.session.mount("http://", self._adapter)
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.errors = 0
+        self.total_time = 0.0
+
+    def post(self, url: str, **kwargs) -> "requests.Response":
+        """POST przez pulę; bez jawnego `timeout` używa limitów z konfiguracji.
+
+        Odpowiedź ma dodatkowy atrybut `connect_time` - czas otwierania nowego
+        połączenia w sekundach (0 dla połączenia wziętego z puli).
+        """
+        return self.request("POST", url, **kwargs)
+
+    def get(self, url: str, **kwargs) -> "requests.Response":
+        return self.request("GET", url, **kwargs)
+
+    def request(self, method: str, url: str, **kwargs) -> "requests.Response":
+        import requests
+
+        kwargs.setdefault("timeout", self.config.timeout)
+        start = time.perf_counter()
+        failed = False
+        _connect_time.total = 0.0
+        try:
+            response = self.session.request(method, url, **kwargs)
+            response.connect_time = _connect_time.total
+            return response
+        except requests.RequestException:
+            failed = True
+            raise
+        finally:
+            with self._lock:
+                self.requests += 1
+                self.errors += int(failed)
+                self.total_time += time.perf_counter() - start
+
+    def stats(self) -> Dict[str, float]:
+        """Liczniki żądań i połączeń (połączenia liczone z pul urllib3)"""
+        connections = 0
+        pools = self._adapter.poolmanager.pools
+        for key in list(pools.keys()):
+            pool = pools.get(key)
+            if pool is not None:
+                connections += pool.num_connections
+        with self._lock:
+            requests_count = self.requests
+            return {
+                "requests": requests_count,
+                "errors": self.errors,
+                "connections": connections,
+                "reused": max(requests_count - connections, 0),
+                "avg_time": self.total_time / requests_count if requests_count else 0.0,
+            }
+
+
+_pools: Dict[str, ProviderPool] = {}
+_registry_lock = threading.Lock()
+
+
+def get_pool(provider: str, config: Optional[PoolConfig] = None) -> ProviderPool:
+    """Zwraca współdzieloną pulę dostawcy; zmiana konfiguracji tworzy nową pulę"""
+    with _registry_lock:
+        pool = _pools.get(provider)
+        if pool is None or (config is not None and pool.config != config):
+            # Starej sesji nie zamykamy - mogą z niej jeszcze korzystać inne wątki
+            pool = ProviderPool(provider, config or PoolConfig())
+            _pools[provider] = pool
+        return pool
+
+
+def pool_stats() -> Dict[str, Dict[str, float]]:
+    """Statystyki wszystkich utworzonych pul"""
+    with _registry_lock:
+        pools = dict(_pools)
+    return {provider: pool.stats() for provider, pool in pools.items()}
@@ -0,0 +1,492 @@
+"""Wspólny magazyn zadań dla floty workerów - SQLite albo lokalny serwis HTTP nad nim.
+
+Worker bierze zadanie w dzierżawę (lease) na `visibility` sekund i przedłuża
+ją heartbeatem. Dzierżawa, której nikt nie przedłużył (worker padł, stracił
+sieć), wygasa i zadanie wraca do puli - semantyka "co najmniej raz". Każda
+napisana sekcja od razu trafia do magazynu, a zapis jest idempotentny (klucz:
+zadanie, pozycja, odcisk promptu): worker, który przejmie zadanie, pisze tylko
+brakujące sekcje, a powtórzony zapis zwraca wersję zapisaną wcześniej.
+Zapisy wymagają aktualnego tokenu dzierżawy - worker, któremu zadanie odebrano,
+dostaje LeaseLost zamiast nadpisać cudzą pracę.
+
+Jedna baza SQLite wystarcza workerom na jednej maszynie; dla kilku maszyn
+`JobStoreServer` udostępnia ją przez HTTP, a `RemoteJobStore` ma ten sam
+interfejs co `JobStore`. Czas dzierżaw liczy zawsze proces z bazą, więc zegary
+workerów nie muszą być zsynchronizowane. Serwis przyjmuje tylko zapytania ze
+wspólnym tokenem (`JOB_STORE_TOKEN`) w nagłówku `X-Job-Store-Token`.
+"""
+import hmac
+import json
+import os
+import sqlite3
+import threading
+import time
+from dataclasses import asdict, dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional
+
+from http_pool import PoolConfig, get_pool
+
+DEFAULT_JOB_STORE_PATH = os.environ.get("JOB_STORE_PATH", os.path.join("data", "jobs.sqlite"))
+TOKEN_ENV = "JOB_STORE_TOKEN"  # wspólny sekret serwisu i workerów
+TOKEN_HEADER = "X-Job-Store-Token"
+VISIBILITY_TIMEOUT = 120.0  # sekundy dzierżawy bez heartbeatu
+MAX_ATTEMPTS = 3  # po tylu dzierżawach (także wygasłych) zadanie jest oznaczane jako nieudane
+
+QUEUED, LEASED, DONE, FAILED = "queued", "leased", "done", "failed"
+INTRO_POSITION = -1  # pozycja wstępu w tabeli sekcji
+
+_SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS fleet_jobs ("
+    " id TEXT PRIMARY KEY, topic TEXT NOT NULL, clinic TEXT NOT NULL, context TEXT NOT NULL DEFAULT '',"
+    " title TEXT NOT NULL DEFAULT '', outline TEXT NOT NULL DEFAULT '[]', engine TEXT NOT NULL DEFAULT 'pipeline',"
+    " status TEXT NOT NULL, attempts INTEGER NOT NULL DEFAULT 0, max_attempts INTEGER NOT NULL,"
+    " worker TEXT, lease TEXT, leased_until REAL, error TEXT NOT NULL DEFAULT '', article TEXT,"
+    " usage TEXT NOT NULL DEFAULT '{}', created REAL NOT NULL, started REAL, finished REAL)",
+    "CREATE INDEX IF NOT EXISTS fleet_jobs_ready ON fleet_jobs (status, leased_until, created)",
+    "CREATE TABLE IF NOT EXISTS fleet_sections ("
+    " job_id TEXT NOT NULL, position INTEGER NOT NULL, fingerprint TEXT NOT NULL, heading TEXT NOT NULL,"
+    " text TEXT NOT NULL, worker TEXT, written REAL NOT NULL,"
+    " PRIMARY KEY (job_id, position, fingerprint)) WITHOUT ROWID",
+    "CREATE TABLE IF NOT EXISTS fleet_workers ("
+    " worker TEXT PRIMARY KEY, provider TEXT NOT NULL, slots INTEGER NOT NULL, seen REAL NOT NULL)",
+)
+
+_JOB_COLUMNS = ("id, topic, clinic, context, title, outline, engine, status, attempts, max_attempts,"
+                " worker, lease, leased_until, error, usage, created, started, finished")
+
+
+class LeaseLost(RuntimeError):
+    """Dzierżawa wygasła i zadanie przejął inny worker (albo zostało już zakończone)"""
+
+
+class JobStoreError(RuntimeError):
+    """Magazyn zadań jest niedostępny (serwis nie odpowiada, błąd HTTP)"""
+
+
+@dataclass
+class FleetJob:
+    """Zadanie w magazynie; `lease` jest ustawiony tylko w zadaniach zwróconych przez lease()"""
+    id: str
+    topic: str
+    clinic: str
+    context: str = ""
+    title: str = ""
+    outline: List[str] = field(default_factory=list)
+    engine: str = "pipeline"
+    status: str = QUEUED
+    attempts: int = 0
+    max_attempts: int = MAX_ATTEMPTS
+    worker: Optional[str] = None
+    lease: Optional[str] = None
+    leased_until: Optional[float] = None
+    error: str = ""
+    usage: Dict = field(default_factory=dict)
+    created: float = 0.0
+    started: Optional[float] = None
+    finished: Optional[float] = None
+
+
+@dataclass
+class StoredSection:
+    position: int  # INTRO_POSITION dla wstępu
+    heading: str
+    fingerprint: str
+    text: str
+
+
+def _job(row) -> FleetJob:
+    values = list(row)
+    values[5] = json.loads(values[5])
+    values[14] = json.loads(values[14])
+    return FleetJob(*values)
+
+
+class JobStore:
+    """Magazyn zadań w SQLite (bezpieczny dla wątków i procesów na jednej maszynie)"""
+
+    def __init__(self, path: str = DEFAULT_JOB_STORE_PATH):
+        self.path = path
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._lock = threading.Lock()
+        # timeout: inne procesy mogą trzymać blokadę zapisu - czekamy zamiast zgłaszać "database is locked"
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=30.0)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        for statement in _SCHEMA:
+            self._conn.execute(statement)
+
+    def _write(self, fn):
+        """Wykonuje `fn(conn)` w transakcji BEGIN IMMEDIATE (jedna transakcja zapisu naraz, także między procesami)"""
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                result = fn(self._conn)
+                self._conn.execute("COMMIT")
+                return result
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def _held(self, conn, job_id: str, lease: str):
+        """Sprawdza, czy `lease` jest aktualną dzierżawą zadania.
+
+        Wygasła dzierżawa, której nikt jeszcze nie przejął, dalej jest ważna -
+        zapisy są idempotentne, więc spóźniony heartbeat nie marnuje pracy.
+        """
+        row = conn.execute("SELECT status, lease FROM fleet_jobs WHERE id = ?", (job_id,)).fetchone()
+        if row is None or row[0] != LEASED or row[1] != lease:
+            raise LeaseLost(f"zadanie {job_id}: dzierżawa nieaktualna")
+
+    def submit(self, topic: str, clinic: str, context: str = "", title: str = "",
+               outline: Optional[List[str]] = None, engine: str = "pipeline", job_id: str = "",
+               max_attempts: int = MAX_ATTEMPTS) -> str:
+        """Dodaje zadanie; ponowne dodanie tego samego `job_id` niczego nie zmienia"""
+        job_id = job_id or os.urandom(8).hex()
+        self._write(lambda conn: conn.execute(
+            f"INSERT OR IGNORE INTO fleet_jobs (id, topic, clinic, context, title, outline, engine, status,"
+            f" max_attempts, created) VALUES (?, ?, ?, ?, ?, ?, ?, '{QUEUED}', ?, ?)",
+            (job_id, topic, clinic, context, title, json.dumps(outline or [], ensure_ascii=False), engine,
+             max_attempts, time.time())
+        ))
+        return job_id
+
+    def lease(self, worker: str, limit: int = 1, visibility: float = VISIBILITY_TIMEOUT) -> List[FleetJob]:
+        """Bierze do `limit` zadań: oczekujące albo z wygasłą dzierżawą (najstarsze najpierw)"""
+        if limit <= 0:
+            return []
+
+        def take(conn) -> List[FleetJob]:
+            now = time.time()
+            rows = conn.execute(
+                f"SELECT id, attempts, max_attempts FROM fleet_jobs"
+                f" WHERE status = '{QUEUED}' OR (status = '{LEASED}' AND leased_until < ?)"
+                f" ORDER BY created LIMIT ?", (now, limit)
+            ).fetchall()
+            leased = []
+            for job_id, attempts, max_attempts in rows:
+                if attempts >= max_attempts:
+                    # Zadanie, które kolejni workerzy porzucają (np. zabija proces), nie krąży w nieskończoność
+                    conn.execute(f"UPDATE fleet_jobs SET status = '{FAILED}', lease = NULL, finished = ?,"
+                                 f" error = 'przekroczono liczbę prób (dzierżawa wygasła)' WHERE id = ?",
+                                 (now, job_id))
+                    continue
+                conn.execute(
+                    f"UPDATE fleet_jobs SET status = '{LEASED}', attempts = attempts + 1, worker = ?, lease = ?,"
+                    f" leased_until = ?, started = COALESCE(started, ?) WHERE id = ?",
+                    (worker, os.urandom(8).hex(), now + visibility, now, job_id)
+                )
+                leased.append(_job(conn.execute(f"SELECT {_JOB_COLUMNS} FROM fleet_jobs WHERE id = ?",
+                                                (job_id,)).fetchone()))
+            return leased
+
+        return self._write(take)
+
+    def heartbeat(self, job_id: str, lease: str, visibility: float = VISIBILITY_TIMEOUT) -> float:
+        """Przedłuża dzierżawę; zwraca nowy termin (czas uniksowy magazynu)"""
+        def extend(conn) -> float:
+            self._held(conn, job_id, lease)
+            until = time.time() + visibility
+            conn.execute("UPDATE fleet_jobs SET leased_until = ? WHERE id = ?", (until, job_id))
+            return until
+
+        return self._write(extend)
+
+    def set_outline(self, job_id: str, lease: str, title: str, outline: List[str]):
+        """Zapisuje konspekt napisany przez workera (zadanie dodane bez konspektu)"""
+        def update(conn):
+            self._held(conn, job_id, lease)
+            conn.execute("UPDATE fleet_jobs SET title = ?, outline = ? WHERE id = ?",
+                         (title, json.dumps(outline, ensure_ascii=False), job_id))
+
+        self._write(update)
+
+    def put_section(self, job_id: str, lease: str, position: int, heading: str, fingerprint: str,
+                    text: str) -> str:
+        """Zapisuje wstęp (INTRO_POSITION) albo sekcję; zwraca wersję, która obowiązuje.
+
+        Jeśli sekcja o tej pozycji i odcisku już jest (powtórzony zapis,
+        wcześniejszy worker), zostaje pierwsza wersja i to ją zwracamy.
+        """
+        def put(conn) -> str:
+            self._held(conn, job_id, lease)
+            worker = conn.execute("SELECT worker FROM fleet_jobs WHERE id = ?", (job_id,)).fetchone()[0]
+            conn.execute(
+                "INSERT OR IGNORE INTO fleet_sections (job_id, position, fingerprint, heading, text, worker, written)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?)", (job_id, position, fingerprint, heading, text, worker, time.time())
+            )
+            return conn.execute("SELECT text FROM fleet_sections WHERE job_id = ? AND position = ? AND fingerprint = ?",
+                                (job_id, position, fingerprint)).fetchone()[0]
+
+        return self._write(put)
+
+    def sections(self, job_id: str) -> List[StoredSection]:
+        """Zapisane fragmenty zadania (także z poprzednich dzierżaw)"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT position, heading, fingerprint, text FROM fleet_sections WHERE job_id = ?"
+                " ORDER BY position, written", (job_id,)
+            ).fetchall()
+        return [StoredSection(*row) for row in rows]
+
+    def complete(self, job_id: str, lease: str, article: str, usage: Optional[Dict] = None) -> bool:
+        """Kończy zadanie; powtórzone zakończenie tą samą dzierżawą zwraca True bez zmian"""
+        def finish(conn) -> bool:
+            row = conn.execute("SELECT status, lease FROM fleet_jobs WHERE id = ?", (job_id,)).fetchone()
+            if row is not None and row[0] == DONE and row[1] == lease:
+                return True
+            self._held(conn, job_id, lease)
+            conn.execute(f"UPDATE fleet_jobs SET status = '{DONE}', article = ?, usage = ?, error = '',"
+                         f" finished = ? WHERE id = ?", (article, json.dumps(usage or {}), time.time(), job_id))
+            return True
+
+        return self._write(finish)
+
+    def fail(self, job_id: str, lease: str, error: str, retryable: bool = True) -> str:
+        """Zgłasza błąd zadania; zwraca nowy stan (queued - do ponowienia, failed - koniec prób)"""
+        def update(conn) -> str:
+            self._held(conn, job_id, lease)
+            attempts, max_attempts = conn.execute("SELECT attempts, max_attempts FROM fleet_jobs WHERE id = ?",
+                                                  (job_id,)).fetchone()
+            status = QUEUED if retryable and attempts < max_attempts else FAILED
+            conn.execute("UPDATE fleet_jobs SET status = ?, lease = NULL, leased_until = NULL, error = ?,"
+                         " finished = ? WHERE id = ?",
+                         (status, error, time.time() if status == FAILED else None, job_id))
+            return status
+
+        return self._write(update)
+
+    def release(self, job_id: str, lease: str):
+        """Oddaje zadanie bez zużycia próby (np. worker jest wyłączany)"""
+        def update(conn):
+            self._held(conn, job_id, lease)
+            conn.execute(f"UPDATE fleet_jobs SET status = '{QUEUED}', lease = NULL, leased_until = NULL,"
+                         f" attempts = MAX(attempts - 1, 0) WHERE id = ?", (job_id,))
+
+        self._write(update)
+
+    def get(self, job_id: str) -> Optional[FleetJob]:
+        with self._lock:
+            row = self._conn.execute(f"SELECT {_JOB_COLUMNS} FROM fleet_jobs WHERE id = ?", (job_id,)).fetchone()
+        return _job(row) if row is not None else None
+
+    def article(self, job_id: str) -> Optional[str]:
+        with self._lock:
+            row = self._conn.execute("SELECT article FROM fleet_jobs WHERE id = ?", (job_id,)).fetchone()
+        return row[0] if row is not None else None
+
+    def jobs(self, status: Optional[str] = None, limit: int = 100) -> List[FleetJob]:
+        """Zadania (bez treści artykułów), od najnowszego"""
+        where, params = ("WHERE status = ?", (status,)) if status else ("", ())
+        with self._lock:
+            rows = self._conn.execute(f"SELECT {_JOB_COLUMNS} FROM fleet_jobs {where} ORDER BY created DESC LIMIT ?",
+                                      params + (limit,)).fetchall()
+        return [_job(row) for row in rows]
+
+    def register_worker(self, worker: str, provider: str, slots: int):
+        """Zgłasza, że worker działa (wywoływane z heartbeatem)"""
+        self._write(lambda conn: conn.execute(
+            "INSERT INTO fleet_workers (worker, provider, slots, seen) VALUES (?, ?, ?, ?)"
+            " ON CONFLICT (worker) DO UPDATE SET provider = excluded.provider, slots = excluded.slots,"
+            " seen = excluded.seen", (worker, provider, slots, time.time())
+        ))
+
+    def unregister_worker(self, worker: str):
+        self._write(lambda conn: conn.execute("DELETE FROM fleet_workers WHERE worker = ?", (worker,)))
+
+    def active_workers(self, provider: str, within: float = VISIBILITY_TIMEOUT) -> int:
+        """Liczba workerów danego dostawcy, które zgłosiły się w ciągu `within` sekund"""
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM fleet_workers WHERE provider = ? AND seen >= ?",
+                                      (provider, time.time() - within)).fetchone()[0]
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            counts = dict(self._conn.execute("SELECT status, COUNT(*) FROM fleet_jobs GROUP BY status").fetchall())
+            workers = self._conn.execute("SELECT COUNT(*) FROM fleet_workers WHERE seen >= ?",
+                                         (time.time() - VISIBILITY_TIMEOUT,)).fetchone()[0]
+        stats = {status: counts.get(status, 0) for status in (QUEUED, LEASED, DONE, FAILED)}
+        stats["workers"] = workers
+        return stats
+
+
+# Metody JobStore dostępne przez serwis HTTP
+RPC_METHODS = ("submit", "lease", "heartbeat", "set_outline", "put_section", "sections", "complete", "fail",
+               "release", "get", "article", "jobs", "register_worker", "unregister_worker", "active_workers",
+               "stats")
+
+
+def _encode(value):
+    if isinstance(value, list):
+        return [_encode(item) for item in value]
+    if isinstance(value, (FleetJob, StoredSection)):
+        return asdict(value)
+    return value
+
+
+class RemoteJobStore:
+    """Klient serwisu `JobStoreServer` - ten sam interfejs co JobStore"""
+
+    def __init__(self, base_url: str, pool_config: PoolConfig = PoolConfig(pool_size=4, read_timeout=60.0),
+                 token: str = ""):
+        self.base_url = base_url.rstrip("/")
+        self.pool_config = pool_config
+        self.token = token
+
+    def _call(self, method: str, **kwargs):
+        import requests
+
+        try:
+            response = get_pool("jobs:" + self.base_url, self.pool_config).post(
+                f"{self.base_url}/rpc/{method}", json=kwargs,
+                headers={TOKEN_HEADER: self.token} if self.token else None)
+        except requests.RequestException as e:
+            raise JobStoreError(f"magazyn zadań niedostępny: {e}") from e
+        if response.status_code == 401:
+            raise JobStoreError(f"magazyn zadań odrzucił token - ustaw tę samą zmienną {TOKEN_ENV} co na serwerze")
+        if response.status_code == 409:
+            raise LeaseLost(response.json().get("error", "dzierżawa nieaktualna"))
+        if response.status_code >= 500:
+            raise JobStoreError(f"magazyn zadań: błąd serwisu (HTTP {response.status_code}): "
+                                f"{response.text[:200]}")
+        if response.status_code >= 400:
+            raise JobStoreError(f"magazyn zadań: HTTP {response.status_code}: {response.text[:200]}")
+        return response.json()["result"]
+
+    def submit(self, topic: str, clinic: str, context: str = "", title: str = "",
+               outline: Optional[List[str]] = None, engine: str = "pipeline", job_id: str = "",
+               max_attempts: int = MAX_ATTEMPTS) -> str:
+        return self._call("submit", topic=topic, clinic=clinic, context=context, title=title, outline=outline,
+                          engine=engine, job_id=job_id, max_attempts=max_attempts)
+
+    def lease(self, worker: str, limit: int = 1, visibility: float = VISIBILITY_TIMEOUT) -> List[FleetJob]:
+        return [FleetJob(**job) for job in self._call("lease", worker=worker, limit=limit, visibility=visibility)]
+
+    def heartbeat(self, job_id: str, lease: str, visibility: float = VISIBILITY_TIMEOUT) -> float:
+        return self._call("heartbeat", job_id=job_id, lease=lease, visibility=visibility)
+
+    def set_outline(self, job_id: str, lease: str, title: str, outline: List[str]):
+        self._call("set_outline", job_id=job_id, lease=lease, title=title, outline=outline)
+
+    def put_section(self, job_id: str, lease: str, position: int, heading: str, fingerprint: str,
+                    text: str) -> str:
+        return self._call("put_section", job_id=job_id, lease=lease, position=position, heading=heading,
+                          fingerprint=fingerprint, text=text)
+
+    def sections(self, job_id: str) -> List[StoredSection]:
+        return [StoredSection(**section) for section in self._call("sections", job_id=job_id)]
+
+    def complete(self, job_id: str, lease: str, article: str, usage: Optional[Dict] = None) -> bool:
+        return self._call("complete", job_id=job_id, lease=lease, article=article, usage=usage)
+
+    def fail(self, job_id: str, lease: str, error: str, retryable: bool = True) -> str:
+        return self._call("fail", job_id=job_id, lease=lease, error=error, retryable=retryable)
+
+    def release(self, job_id: str, lease: str):
+        self._call("release", job_id=job_id, lease=lease)
+
+    def get(self, job_id: str) -> Optional[FleetJob]:
+        job = self._call("get", job_id=job_id)
+        return FleetJob(**job) if job is not None else None
+
+    def article(self, job_id: str) -> Optional[str]:
+        return self._call("article", job_id=job_id)
+
+    def jobs(self, status: Optional[str] = None, limit: int = 100) -> List[FleetJob]:
+        return [FleetJob(**job) for job in self._call("jobs", status=status, limit=limit)]
+
+    def register_worker(self, worker: str, provider: str, slots: int):
+        self._call("register_worker", worker=worker, provider=provider, slots=slots)
+
+    def unregister_worker(self, worker: str):
+        self._call("unregister_worker", worker=worker)
+
+    def active_workers(self, provider: str, within: float = VISIBILITY_TIMEOUT) -> int:
+        return self._call("active_workers", provider=provider, within=within)
+
+    def stats(self) -> Dict[str, int]:
+        return self._call("stats")
+
+
+class JobStoreServer:
+    """Serwis HTTP nad JobStore dla workerów na wielu maszynach (POST /rpc/<metoda>, argumenty w JSON).
+
+    Z niepustym `token` zapytania bez zgodnego nagłówka `X-Job-Store-Token` dostają 401.
+    """
+
+    def __init__(self, store: JobStore, host: str = "127.0.0.1", port: int = 0, token: str = ""):
+        self.store = store
+        self.token = token
+        self.httpd = ThreadingHTTPServer((host, port), self._make_handler())
+        self.httpd.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "JobStoreServer":
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def _make_handler(self):
+        store, token = self.store, self.token
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, format, *args):
+                pass
+
+            def _reply(self, status: int, payload: Dict):
+                body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_POST(self):
+                method = self.path.rstrip("/").rsplit("/", 1)[-1]
+                if not self.path.startswith("/rpc/") or method not in RPC_METHODS:
+                    self._reply(404, {"error": f"nieznana metoda: {self.path}"})
+                    return
+                if token and not hmac.compare_digest(self.headers.get(TOKEN_HEADER, "").encode(),
+                                                   token.encode()):
+                    self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                    self._reply(401, {"error": "brak lub zły token magazynu zadań"})
+                    return
+                try:
+                    kwargs = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+                    self._reply(200, {"result": _encode(getattr(store, method)(**kwargs))})
+                except LeaseLost as e:
+                    self._reply(409, {"error": str(e)})
+                except (TypeError, ValueError) as e:
+                    self._reply(400, {"error": str(e)})
+                except Exception as e:
+                    # Np. "database is locked" przy wielu jednoczesnych zapisach - klient dostaje odpowiedź,
+                    # a nie zerwane połączenie
+                    self._reply(500, {"error": f"{type(e).__name__}: {e}"})
+
+        return Handler
+
+
+def open_job_store(location: str = DEFAULT_JOB_STORE_PATH, token: Optional[str] = None):
+    """Magazyn z adresu: http(s)://... - serwis (token domyślnie z JOB_STORE_TOKEN), w przeciwnym razie
+    ścieżka do bazy SQLite"""
+    if location.startswith(("http://", "https://")):
+        return RemoteJobStore(location, token=os.environ.get(TOKEN_ENV, "") if token is None else token)
+    return JobStore(location)
@@ -0,0 +1,288 @@
+"""Kolejka zadań generowania artykułów działająca w tle, poza skryptem Streamlit.
+
+Rerun skryptu, odświeżenie przeglądarki czy zerwane połączenie websocket nie
+przerywają generowania: zadanie wykonuje się w puli wątków modułu, a rejestr
+zadań (tak jak pule połączeń w `http_pool`) przeżywa reruny. UI tylko odpytuje
+stan zadania i wyświetla gotowe fragmenty artykułu.
+"""
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+from budget import trim_to_sentence
+from dedup import DuplicateFlag
+from drafts import ArticleDraft, SectionRecord
+from errors import ProviderError
+from library import ArticleLibrary, step_timings
+from structured import ArticlePart
+from writer import ArticleWriter, GenerationError, check_response
+
+QUEUED, RUNNING, DONE, ERROR, CANCELLED = "queued", "running", "done", "error", "cancelled"
+ACTIVE = (QUEUED, RUNNING)
+
+
+class JobCancelled(Exception):
+    """Użytkownik anulował zadanie"""
+
+
+@dataclass
+class ArticleJob:
+    """Stan jednego artykułu generowanego w tle (odczytywany przez UI między rerunami)"""
+    session_id: str
+    topic: str
+    clinic: str
+    context: str
+    title: str
+    outline: List[str]
+    stream: bool = True
+    parallel_sections: bool = False
+    smooth_seams: bool = False
+    engine: str = "pipeline"  # "structured" - wstęp i sekcje jednym wywołaniem (JSON)
+    previous: Optional[ArticleDraft] = None  # poprzednia wersja - niezmienione sekcje są przenoszone
+    id: str = field(default_factory=lambda: os.urandom(6).hex())
+    status: str = QUEUED
+    stage: str = "W kolejce"
+    intro: str = ""
+    sections: List[Optional[str]] = field(default_factory=list)
+    streaming: str = ""  # tekst kroku, który właśnie jest strumieniowany
+    article: str = ""
+    draft: Optional[ArticleDraft] = None
+    rewritten: int = 0  # liczba wstępów i sekcji napisanych od nowa (reszta przeniesiona)
+    usage: Dict = field(default_factory=dict)
+    error: str = ""
+    created: float = field(default_factory=time.time)
+    started: Optional[float] = None
+    finished: Optional[float] = None
+    cancel_requested: bool = False
+    writer: Optional[ArticleWriter] = None
+    library_id: Optional[int] = None  # identyfikator w bibliotece artykułów po zapisie
+    duplicates: List[DuplicateFlag] = field(default_factory=list)  # sekcje podobne do wcześniejszych artykułów
+
+    def __post_init__(self):
+        if not self.sections:
+            self.sections = [None] * len(self.outline)
+
+    @property
+    def progress(self) -> float:
+        steps = len(self.outline) + 1
+        done = int(bool(self.intro)) + sum(1 for s in self.sections if s is not None)
+        return 1.0 if self.status == DONE else done / steps
+
+    @property
+    def active(self) -> bool:
+        return self.status in ACTIVE
+
+    def partial_article(self) -> str:
+        """Artykuł złożony z gotowych fragmentów i tekstu, który właśnie powstaje"""
+        text = f"# {self.title}\n\n"
+        if not self.intro:
+            return text + self.streaming
+        text += self.intro + "\n\n"
+        for section_title, content in zip(self.outline, self.sections):
+            if content is not None:
+                text += f"## {section_title}\n\n{content}\n\n"
+            elif self.streaming and not self.parallel_sections:
+                return text + f"## {section_title}\n\n{self.streaming}"
+        return text
+
+
+class JobQueue:
+    """Pula wątków wykonująca zadania i rejestr ich stanów"""
+
+    def __init__(self, max_workers: int = 4, keep_finished: int = 50):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="article")
+        self._lock = threading.Lock()
+        self._jobs: Dict[str, ArticleJob] = {}
+        self.keep_finished = keep_finished
+        self.library: Optional[ArticleLibrary] = None
+
+    def set_library(self, library: Optional[ArticleLibrary]):
+        """Gotowe artykuły będą zapisywane w bibliotece (None wyłącza zapis)"""
+        self.library = library
+
+    def submit(self, job: ArticleJob, writer: ArticleWriter) -> ArticleJob:
+        """Uruchamia zadanie na kopii konfiguracji `writer` (zadania nie dzielą śladu ani licznika tokenów)"""
+        job.writer = writer.spawn()
+        job.writer.trace = writer.trace.fork(keep_steps=("konspekt",))
+        with self._lock:
+            self._jobs[job.id] = job
+            self._prune()
+        self._executor.submit(self._run, job)
+        return job
+
+    def get(self, job_id: str) -> Optional[ArticleJob]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def jobs_for(self, session_id: str) -> List[ArticleJob]:
+        """Zadania sesji, od najnowszego"""
+        with self._lock:
+            jobs = [job for job in self._jobs.values() if job.session_id == session_id]
+        return sorted(jobs, key=lambda job: job.created, reverse=True)
+
+    def cancel(self, job_id: str):
+        """Zadanie kończy się przy najbliższym kroku lub fragmencie strumienia"""
+        job = self.get(job_id)
+        if job is not None and job.active:
+            job.cancel_requested = True
+
+    def remove(self, job_id: str):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is not None and not job.active:
+                del self._jobs[job_id]
+
+    def _prune(self):
+        finished = sorted((job for job in self._jobs.values() if not job.active), key=lambda job: job.created)
+        for job in finished[:max(0, len(finished) - self.keep_finished)]:
+            del self._jobs[job.id]
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            jobs = list(self._jobs.values())
+        return {status: sum(1 for job in jobs if job.status == status)
+                for status in (QUEUED, RUNNING, DONE, ERROR, CANCELLED)}
+
+    def _run(self, job: ArticleJob):
+        if job.cancel_requested:
+            job.status, job.stage, job.finished = CANCELLED, "Anulowano", time.time()
+            return
+        job.status, job.started = RUNNING, time.time()
+        try:
+            self._generate(job)
+            self._save(job)
+            job.status, job.stage = DONE, "✅ Artykuł gotowy!"
+        except JobCancelled:
+            job.status, job.stage = CANCELLED, "Anulowano"
+        except (ProviderError, GenerationError) as e:
+            job.status, job.stage, job.error = ERROR, "❌ Generowanie przerwane", str(e)
+        except Exception as e:  # zadanie w tle nie może zginąć bez śladu
+            job.status, job.stage, job.error = ERROR, "❌ Nieoczekiwany błąd", repr(e)
+        finally:
+            job.streaming = ""
+            job.usage = job.writer.usage.summary()
+            job.duplicates = list(job.writer.duplicates)
+            job.finished = time.time()
+
+    def _save(self, job: ArticleJob):
+        if self.library is None or job.draft is None:
+            return
+        writer = job.writer
+        job.library_id = self.library.add(
+            job.title, job.topic, job.clinic, job.outline, job.article, writer.model_provider, job.engine,
+            job.context, writer.usage.summary(), step_timings(writer.trace.snapshot()),
+            round(time.time() - job.started, 2), job.draft.to_dict()
+        )
+
+    def _check_cancel(self, job: ArticleJob):
+        if job.cancel_requested:
+            raise JobCancelled()
+
+    def _stream(self, job: ArticleJob, chunks) -> str:
+        """Zbiera strumień do podglądu; zwraca tekst obcięty do ostatniego pełnego zdania"""
+        job.streaming = ""
+        for chunk in chunks:
+            self._check_cancel(job)
+            job.streaming += chunk
+        text, job.streaming = trim_to_sentence(job.streaming), ""
+        return text
+
+    def _generate_structured(self, job: ArticleJob):
+        """Wstęp i brakujące sekcje jednym wywołaniem; sekcje pojawiają się w miarę domykania JSON-a"""
+        def on_part(part: ArticlePart):
+            self._check_cancel(job)
+            if part.kind == "intro":
+                job.intro = part.text
+            elif part.kind == "section":
+                job.sections[part.index] = part.text
+
+        pending = sum(1 for section in job.sections if section is None)
+        job.stage = f"🧩 Piszę {pending} sekcji jednym wywołaniem..."
+        draft = job.writer.write_article_structured(job.title, job.topic, job.clinic, job.outline, job.context,
+                                                    job.previous, stream=job.stream, on_part=on_part)
+        job.intro = draft.intro
+        job.sections = [section.text for section in draft.sections]
+        job.rewritten += pending
+        job.draft = draft
+        job.article = draft.render()
+
+    def _generate(self, job: ArticleJob):
+        writer = job.writer
+        writer.usage.reset()
+        title, outline = job.title, job.outline
+        draft, plans = writer.plan_revision(title, job.topic, job.clinic, outline, job.context, job.previous)
+        for plan in plans:
+            if plan.reuse:
+                job.sections[plan.index] = plan.reuse.text
+        if job.engine == "structured":
+            if not draft.intro:
+                job.rewritten += 1
+            return self._generate_structured(job)
+
+        if draft.intro:
+            job.intro = draft.intro
+        else:
+            job.stage = "📝 Piszę wstęp..."
+            if job.stream:
+                intro = self._stream(job, writer.stream_introduction(title, job.topic, outline, job.context,
+                                                                     job.clinic))
+            else:
+                intro = writer.write_introduction(title, job.topic, outline, job.context, job.clinic)
+            job.intro = draft.intro = check_response(intro, "wstęp")
+            job.rewritten += 1
+        full_article = f"# {title}\n\n{job.intro}\n\n"
+
+        if job.parallel_sections:
+            pending = sum(1 for section in job.sections if section is None)
+            job.stage = f"✏️ Piszę {pending} sekcji równolegle..."
+
+            def on_section_done(i: int, content: str):
+                job.sections[i] = content
+                self._check_cancel(job)
+
+            sections = writer.write_sections_parallel(title, job.topic, job.clinic, outline, job.context,
+                                                      smooth_seams=job.smooth_seams,
+                                                      on_section_done=on_section_done,
+                                                      sections=job.sections)
+            job.sections = list(sections)
+            job.rewritten += pending
+        else:
+            for i, section_title in enumerate(outline):
+                self._check_cancel(job)
+                if job.sections[i] is None:
+                    job.stage = f"✏️ Piszę sekcję {i+1}/{len(outline)}: {section_title[:30]}..."
+                    if job.stream:
+                        content = self._stream(job, writer.stream_section(section_title, i, title, job.topic,
+                                                                          job.clinic, outline, full_article,
+                                                                          job.context))
+                        job.sections[i] = content
+                        content = writer.screen_section(section_title, i, title, job.topic, job.clinic,
+                                                        outline, content, job.context)
+                    else:
+                        content = writer.write_section(section_title, i, title, job.topic, job.clinic,
+                                                       outline, full_article, job.context)
+                    job.sections[i] = content
+                    job.rewritten += 1
+                full_article += f"## {section_title}\n\n{job.sections[i]}\n\n"
+
+        for plan, content in zip(plans, job.sections):
+            check_response(content, f"sekcja {plan.index + 1}")
+            draft.sections.append(SectionRecord(plan.heading, plan.fingerprint, content, plan.mentions_clinic))
+        job.draft = draft
+        job.article = draft.render()
+
+
+_queue: Optional[JobQueue] = None
+_registry_lock = threading.Lock()
+
+
+def get_job_queue() -> JobQueue:
+    """Współdzielona kolejka zadań (jedna na proces, przeżywa reruny i odświeżenia strony)"""
+    global _queue
+    with _registry_lock:
+        if _queue is None:
+            _queue = JobQueue()
+        return _queue
@@ -0,0 +1,199 @@
+"""Trwała biblioteka wygenerowanych artykułów (SQLite + indeks pełnotekstowy FTS5).
+
+Metadane (temat, klinika, konspekt, dostawca, tokeny, czasy) leżą w tabeli
+`articles`, a treść w osobnej tabeli `article_bodies` - przeglądanie i
+wyszukiwanie czytają tylko metadane, treść jest pobierana dopiero przy otwarciu
+artykułu. Indeks `articles_fts` nie przechowuje kopii tekstu (contentless),
+ignoruje polskie znaki diakrytyczne ("skora" znajduje "skóra") i dopasowuje
+prefiksy słów, więc wyszukiwanie działa też dla odmienionych form.
+"""
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+DEFAULT_LIBRARY_PATH = os.environ.get("ARTICLE_LIBRARY_PATH", os.path.join("data", "articles.sqlite"))
+PAGE_SIZE = 20
+
+_SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS articles ("
+    " id INTEGER PRIMARY KEY, created REAL NOT NULL, title TEXT NOT NULL, topic TEXT NOT NULL,"
+    " clinic TEXT NOT NULL, context TEXT NOT NULL DEFAULT '', outline TEXT NOT NULL,"
+    " provider TEXT NOT NULL, engine TEXT NOT NULL DEFAULT '', words INTEGER NOT NULL,"
+    " usage TEXT NOT NULL DEFAULT '{}', timings TEXT NOT NULL DEFAULT '{}', seconds REAL)",
+    "CREATE TABLE IF NOT EXISTS article_bodies ("
+    " article_id INTEGER PRIMARY KEY REFERENCES articles (id) ON DELETE CASCADE,"
+    " body TEXT NOT NULL, draft TEXT)",
+    "CREATE INDEX IF NOT EXISTS articles_created ON articles (created DESC, id DESC)",
+    "CREATE INDEX IF NOT EXISTS articles_clinic_created ON articles (clinic, created DESC, id DESC)",
+    "CREATE VIRTUAL TABLE IF NOT EXISTS articles_fts USING fts5("
+    " title, topic, outline, body, content='', tokenize='unicode61 remove_diacritics 2')",
+)
+
+_COLUMNS = "a.id, a.created, a.title, a.topic, a.clinic, a.outline, a.provider, a.engine, a.words, a.usage, a.seconds"
+
+
+@dataclass
+class LibraryEntry:
+    """Metadane artykułu w bibliotece (bez treści)"""
+    id: int
+    created: float
+    title: str
+    topic: str
+    clinic: str
+    outline: List[str]
+    provider: str
+    engine: str
+    words: int
+    usage: Dict[str, int] = field(default_factory=dict)
+    seconds: Optional[float] = None
+
+
+@dataclass
+class LibraryPage:
+    entries: List[LibraryEntry]
+    page: int
+    has_more: bool
+
+
+def step_timings(records) -> Dict[str, float]:
+    """Czas kroków artykułu w sekundach z rekordów `telemetry.Trace` (ponowienia sumowane)"""
+    timings: Dict[str, float] = {}
+    for record in records:
+        timings[record.step] = round(timings.get(record.step, 0.0) + record.latency, 2)
+    return timings
+
+
+def match_query(text: str) -> str:
+    """Zapytanie użytkownika jako wyrażenie FTS5: każde słowo jako prefiks, wszystkie wymagane"""
+    return " ".join(f'"{word}"*' for word in re.findall(r"\w+", text.lower()))
+
+
+class ArticleLibrary:
+    """Zapis, przeglądanie i wyszukiwanie artykułów (bezpieczne dla wątków)"""
+
+    def __init__(self, path: str = DEFAULT_LIBRARY_PATH):
+        self.path = path
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("PRAGMA foreign_keys=ON")
+        for statement in _SCHEMA:
+            self._conn.execute(statement)
+
+    def add(self, title: str, topic: str, clinic: str, outline: List[str], body: str, provider: str,
+            engine: str = "", context: str = "", usage: Optional[Dict[str, int]] = None,
+            timings: Optional[Dict[str, float]] = None, seconds: Optional[float] = None,
+            draft: Optional[Dict] = None) -> int:
+        """Zapisuje artykuł razem z wpisem w indeksie; zwraca jego identyfikator"""
+        outline_json = json.dumps(outline, ensure_ascii=False)
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                cursor = self._conn.execute(
+                    "INSERT INTO articles (created, title, topic, clinic, context, outline, provider, engine,"
+                    " words, usage, timings, seconds) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (time.time(), title, topic, clinic, context, outline_json, provider, engine,
+                     len(body.split()), json.dumps(usage or {}), json.dumps(timings or {}, ensure_ascii=False),
+                     seconds),
+                )
+                article_id = cursor.lastrowid
+                self._conn.execute("INSERT INTO article_bodies (article_id, body, draft) VALUES (?, ?, ?)",
+                                   (article_id, body, json.dumps(draft, ensure_ascii=False) if draft else None))
+                self._conn.execute("INSERT INTO articles_fts (rowid, title, topic, outline, body)"
+                                   " VALUES (?, ?, ?, ?, ?)", (article_id, title, topic, " ".join(outline), body))
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return article_id
+
+    def _filter(self, query: str, clinic: str) -> Tuple[str, str, List]:
+        """Źródło, warunek WHERE i parametry dla wyszukiwania i filtra kliniki"""
+        conditions, params = [], []
+        source = "articles a"
+        match = match_query(query)
+        if match:
+            source = "articles_fts f JOIN articles a ON a.id = f.rowid"
+            conditions.append("articles_fts MATCH ?")
+            params.append(match)
+        if clinic:
+            conditions.append("a.clinic = ?")
+            params.append(clinic)
+        return source, f" WHERE {' AND '.join(conditions)}" if conditions else "", params
+
+    def page(self, query: str = "", clinic: str = "", page: int = 0, page_size: int = PAGE_SIZE) -> LibraryPage:
+        """Strona wyników: najnowsze artykuły albo - dla `query` - najlepiej dopasowane"""
+        source, where, params = self._filter(query, clinic)
+        order = "f.rank" if match_query(query) else "a.created DESC, a.id DESC"
+        sql = f"SELECT {_COLUMNS} FROM {source}{where} ORDER BY {order} LIMIT ? OFFSET ?"
+        with self._lock:
+            rows = self._conn.execute(sql, params + [page_size + 1, page * page_size]).fetchall()
+        entries = [self._entry(row) for row in rows[:page_size]]
+        return LibraryPage(entries, page, len(rows) > page_size)
+
+    def count(self, query: str = "", clinic: str = "") -> int:
+        source, where, params = self._filter(query, clinic)
+        with self._lock:
+            return self._conn.execute(f"SELECT COUNT(*) FROM {source}{where}", params).fetchone()[0]
+
+    def get(self, article_id: int) -> Optional[Tuple[LibraryEntry, str, Optional[Dict]]]:
+        """Metadane, treść i szkic (do regeneracji przyrostowej) jednego artykułu"""
+        with self._lock:
+            row = self._conn.execute(f"SELECT {_COLUMNS}, b.body, b.draft FROM articles a"
+                                     f" JOIN article_bodies b ON b.article_id = a.id WHERE a.id = ?",
+                                     (article_id,)).fetchone()
+        if row is None:
+            return None
+        return self._entry(row[:11]), row[11], json.loads(row[12]) if row[12] else None
+
+    def delete(self, article_id: int) -> bool:
+        with self._lock:
+            row = self._conn.execute("SELECT a.title, a.topic, a.outline, b.body FROM articles a"
+                                     " JOIN article_bodies b ON b.article_id = a.id WHERE a.id = ?",
+                                     (article_id,)).fetchone()
+            if row is None:
+                return False
+            title, topic, outline, body = row
+            self._conn.execute("BEGIN")
+            try:
+                # Indeks bez kopii treści usuwa się, podając dokładnie zaindeksowane wartości
+                self._conn.execute("INSERT INTO articles_fts (articles_fts, rowid, title, topic, outline, body)"
+                                   " VALUES ('delete', ?, ?, ?, ?, ?)",
+                                   (article_id, title, topic, " ".join(json.loads(outline)), body))
+                self._conn.execute("DELETE FROM articles WHERE id = ?", (article_id,))
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return True
+
+    def clinics(self) -> List[str]:
+        with self._lock:
+            return [row[0] for row in self._conn.execute("SELECT DISTINCT clinic FROM articles ORDER BY clinic")]
+
+    def _entry(self, row) -> LibraryEntry:
+        article_id, created, title, topic, clinic, outline, provider, engine, words, usage, seconds = row
+        return LibraryEntry(article_id, created, title, topic, clinic, json.loads(outline), provider, engine,
+                            words, json.loads(usage or "{}"), seconds)
+
+
+_libraries: Dict[str, ArticleLibrary] = {}
+_registry_lock = threading.Lock()
+
+
+def get_library(path: str = DEFAULT_LIBRARY_PATH) -> ArticleLibrary:
+    """Współdzielona biblioteka dla danej ścieżki (przeżywa reruny Streamlit)"""
+    with _registry_lock:
+        library = _libraries.get(path)
+        if library is None:
+            library = ArticleLibrary(path)
+            _libraries[path] = library
+        return library
@@ -0,0 +1,532 @@
+"""Lokalny serwer udający API Anthropic i API zgodne z OpenAI - do benchmarków i testów.
+
+Obsługuje `POST /v1/messages` (Anthropic) oraz `POST /v1/chat/completions`
+(OpenAI/DeepSeek), w tym strumieniowanie SSE i odpowiedzi w JSON (wymuszone
+narzędzie w Anthropic, `response_format` w OpenAI), a także Batch API obu
+dostawców (`/v1/messages/batches`, `/v1/files` + `/v1/batches`). Na potrzeby
+researchu udaje też wyszukiwarkę (`GET /customsearch/v1`, format Google Custom Search JSON API)
+i strony źródłowe (`GET /strony/<n>`). Opóźnienia losowane są z rozkładu
+log-normalnego, a część odpowiedzi może kończyć się błędem 429, 529 lub
+zawieszeniem połączenia (timeout po stronie klienta). Małe modele (haiku, mini)
+mogą odpowiadać szybciej (`--fast-model-speedup`), a rewizje szkiców z routingu
+modeli - część szkiców zatwierdzać bez zmian (`--review-approve-rate`).
+
+Uruchomienie samodzielne:
+    python .streamlit/mock_llm_server.py --port 8900 --median-latency 1.5 --rate-limit-rate 0.05
+"""
+import argparse
+import email.policy
+import json
+import math
+import random
+import threading
+import time
+from dataclasses import dataclass
+from email.parser import BytesParser
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, quote, urlparse
+
+# Słowo, którym rewizja zatwierdza szkic (prompts.DRAFT_APPROVED)
+REVIEW_MARKER = "ZATWIERDZONE"
+
+WORDS = (
+    "skóra stres sen nawyki pielęgnacja organizm kortyzol regeneracja dieta nawodnienie zabieg "
+    "dermatolog codzienność efekt badania naukowcy objawy równowaga rutyna krem witaminy ruch "
+    "odporność sezon wiosna jesień kolagen zmarszczki trądzik podrażnienie bariera hydrolipidowa"
+).split()
+
+
+@dataclass
+class MockConfig:
+    median_latency: float = 1.0     # mediana czasu do pierwszego tokenu (s)
+    latency_sigma: float = 0.5      # rozrzut rozkładu log-normalnego
+    tokens_per_second: float = 80.0
+    rate_limit_rate: float = 0.0    # odsetek odpowiedzi 429
+    overload_rate: float = 0.0      # odsetek odpowiedzi 529
+    timeout_rate: float = 0.0       # odsetek zawieszonych odpowiedzi
+    hang_seconds: float = 30.0
+    retry_after: float = 1.0
+    seed: Optional[int] = None
+    batch_seconds: float = 2.0      # czas przetwarzania paczki w Batch API
+    batch_error_rate: float = 0.0   # odsetek zapytań paczki zakończonych błędem
+    fast_model_speedup: float = 1.0  # ile razy szybciej odpowiadają małe modele (haiku, mini)
+    review_approve_rate: float = 0.0  # odsetek rewizji szkicu zatwierdzanych bez zmian
+
+
+def _sentence(rng: random.Random, words: int) -> str:
+    text = " ".join(rng.choice(WORDS) for _ in range(words))
+    return text[0].upper() + text[1:] + "."
+
+
+def _completion_text(prompt: str, max_tokens: int, rng: random.Random) -> str:
+    """Tekst odpowiedzi dopasowany do rodzaju promptu (konspekt albo treść)"""
+    if "TYTUŁ:" in prompt:
+        sections = "\n".join(f"{i}. {_sentence(rng, 6)[:-1]}" for i in range(1, rng.randint(4, 5) + 1))
+        return f"TYTUŁ: {_sentence(rng, 7)[:-1]}\n\nŚRÓDTYTUŁY:\n{sections}"
+    # ok. 1,6 tokenu na polskie słowo; odpowiedź zajmuje 40-70% limitu
+    words = max(10, int(max_tokens * rng.uniform(0.4, 0.7) / 1.6))
+    paragraphs = []
+    while words > 0:
+        size = min(words, rng.randint(40, 80))
+        paragraphs.append(" ".join(_sentence(rng, 10) for _ in range(max(1, size // 10))))
+        words -= size
+    return "\n\n".join(paragraphs)
+
+
+def _article_json(max_tokens: int, rng: random.Random) -> Dict:
+    """Artykuł w formacie schematu `structured.ARTICLE_SCHEMA`, długość zależna od limitu"""
+    words = max(60, int(max_tokens * rng.uniform(0.4, 0.7) / 1.6))
+    count = rng.randint(4, 5)
+    intro = " ".join(_sentence(rng, 10) for _ in range(max(1, words // 100)))
+    sections = []
+    for _ in range(count):
+        size = max(10, (words - len(intro.split())) // count)
+        paragraphs = [" ".join(_sentence(rng, 10) for _ in range(max(1, size // 20))) for _ in range(2)]
+        sections.append({"heading": _sentence(rng, 4)[:-1], "text": "\n\n".join(paragraphs)})
+    return {"title": _sentence(rng, 7)[:-1], "intro": intro, "sections": sections}
+
+
+def _chunks(text: str, size: int = 4) -> List[str]:
+    words = text.split(" ")
+    return [" ".join(words[i:i + size]) + (" " if i + size < len(words) else "")
+            for i in range(0, len(words), size)]
+
+
+def _search_results(base_url: str, query: str, count: int) -> Dict:
+    items = []
+    for n in range(1, count + 1):
+        items.append({
+            "title": f"{query} - poradnik, część {n}",
+            "link": f"{base_url}/strony/{n}?q={quote(query)}",
+            "snippet": f"{query}: co warto wiedzieć. " + _sentence(random.Random(f"{query}{n}"), 12),
+        })
+    return {"kind": "customsearch#search", "items": items}
+
+
+def _source_page(query: str, n: int) -> str:
+    """Strona HTML z nawigacją, skryptami i treścią artykułu - do testów ekstrakcji"""
+    rng = random.Random(f"{query}/{n}")
+    query_words = [word for word in query.split() if len(word) > 3] or WORDS[:3]
+    paragraphs = []
+    for _ in range(rng.randint(4, 8)):
+        sentences = [_sentence(rng, rng.randint(8, 14)) for _ in range(rng.randint(3, 6))]
+        sentences.insert(rng.randint(0, len(sentences)), f"{rng.choice(query_words).capitalize()} "
+                         f"ma znaczenie dla tematu: {rng.choice(WORDS)} i {rng.choice(WORDS)}.")
+        paragraphs.append(f"<p>{' '.join(sentences)}</p>")
+    return f"""<!doctype html><html lang="pl"><head><meta charset="utf-8">
+<title>{query} - część {n}</title><script>var tracking = "nie indeksować";</script></head>
+<body><header><nav><a href="/">Strona główna</a> <a href="/zdrowie">Zdrowie</a></nav></header>
+<main><article><h1>{query} - część {n}</h1>{''.join(paragraphs)}</article></main>
+<aside>Polecane: {_sentence(rng, 10)}</aside><footer>© Serwis testowy</footer></body></html>"""
+
+
+def _prompt_text(body: Dict) -> str:
+    parts = []
+    for block in body.get("system") or []:
+        parts.append(block.get("text", "") if isinstance(block, dict) else str(block))
+    for message in body.get("messages", []):
+        content = message.get("content", "")
+        if isinstance(content, list):
+            parts.extend(block.get("text", "") for block in content if isinstance(block, dict))
+        else:
+            parts.append(str(content))
+    return "\n".join(parts)
+
+
+def _is_fast_model(model: str) -> bool:
+    return "haiku" in model or "mini" in model
+
+
+def _generate(flavor: str, body: Dict, rng: random.Random,
+              approve_rate: float = 0.0) -> Tuple[str, Optional[Dict], Optional[str], int, int]:
+    """Tekst odpowiedzi, artykuł (dla odpowiedzi w JSON), wymuszone narzędzie i tokeny wejścia/wyjścia"""
+    prompt = _prompt_text(body)
+    max_tokens = int(body.get("max_tokens", 800))
+    tool = (body.get("tool_choice") or {}).get("name") if flavor == "anthropic" else None
+    article = None
+    last = (body.get("messages") or [{}])[-1].get("content", "")
+    if isinstance(last, str) and REVIEW_MARKER in last and rng.random() < approve_rate:
+        text = REVIEW_MARKER  # rewizja szkicu (routing.py) zatwierdza go bez zmian
+    elif tool is not None or "response_format" in body:
+        article = _article_json(max_tokens, rng)
+        text = json.dumps(article, ensure_ascii=False)
+    else:
+        text = _completion_text(prompt, max_tokens, rng)
+    return text, article, tool, len(prompt) // 3, int(len(text.split()) * 1.6)
+
+
+def _message_payload(flavor: str, body: Dict, text: str, article: Optional[Dict], tool: Optional[str],
+                     input_tokens: int, output_tokens: int) -> Dict:
+    """Odpowiedź bez strumieniowania w formacie Anthropic Messages albo OpenAI Chat Completions"""
+    if flavor == "anthropic":
+        if tool:
+            content = [{"type": "tool_use", "id": "toolu_mock", "name": tool, "input": article}]
+        else:
+            content = [{"type": "text", "text": text}]
+        return {
+            "type": "message", "role": "assistant", "model": body.get("model", ""),
+            "content": content,
+            "usage": {"input_tokens": input_tokens, "output_tokens": output_tokens,
+                      "cache_read_input_tokens": 0, "cache_creation_input_tokens": 0},
+        }
+    return {
+        "object": "chat.completion", "model": body.get("model", ""),
+        "choices": [{"index": 0, "message": {"role": "assistant", "content": text},
+                     "finish_reason": "stop"}],
+        "usage": {"prompt_tokens": input_tokens, "completion_tokens": output_tokens,
+                  "total_tokens": input_tokens + output_tokens},
+    }
+
+
+class MockLLMServer:
+    """Serwer w wątku tła; `base_url` wskazuje adres do podania w ArticleWriter.base_urls"""
+
+    def __init__(self, config: MockConfig = MockConfig(), host: str = "127.0.0.1", port: int = 0):
+        self.config = config
+        self._rng = random.Random(config.seed)
+        self._rng_lock = threading.Lock()
+        self.requests = 0
+        self._batch_lock = threading.Lock()
+        self._batches: Dict[str, Dict] = {}
+        self._files: Dict[str, List[Dict]] = {}
+        self.batch_polls = 0
+        handler = self._make_handler()
+        self.httpd = ThreadingHTTPServer((host, port), handler)
+        self.httpd.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "MockLLMServer":
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def _draw(self) -> Tuple[str, float, random.Random]:
+        """Losuje wynik zapytania ('ok', '429', '529', 'hang') i opóźnienie"""
+        config = self.config
+        with self._rng_lock:
+            self.requests += 1
+            roll = self._rng.random()
+            latency = config.median_latency * math.exp(self._rng.gauss(0, config.latency_sigma))
+            rng = random.Random(self._rng.random())
+        if roll < config.rate_limit_rate:
+            return "429", latency, rng
+        roll -= config.rate_limit_rate
+        if roll < config.overload_rate:
+            return "529", latency, rng
+        roll -= config.overload_rate
+        if roll < config.timeout_rate:
+            return "hang", latency, rng
+        return "ok", latency, rng
+
+    def tokens_per_second(self, model: str) -> float:
+        speedup = self.config.fast_model_speedup if _is_fast_model(model) else 1.0
+        return self.config.tokens_per_second * speedup
+
+    def upload_file(self, content_type: str, data: bytes) -> Dict:
+        """Plik JSONL z zapytaniami paczki OpenAI (multipart/form-data, pole `file`)"""
+        message = BytesParser(policy=email.policy.default).parsebytes(
+            f"Content-Type: {content_type}\r\n\r\n".encode("latin-1") + data)
+        content = b""
+        for part in message.iter_parts():
+            if part.get_param("name", header="content-disposition") == "file":
+                content = part.get_payload(decode=True)
+        lines = [json.loads(line) for line in content.decode("utf-8").splitlines() if line.strip()]
+        with self._batch_lock:
+            file_id = f"file-{len(self._files) + 1}"
+            self._files[file_id] = lines
+        return {"id": file_id, "object": "file", "purpose": "batch", "bytes": len(content)}
+
+    def read_file(self, file_id: str) -> Optional[List[Dict]]:
+        with self._batch_lock:
+            return self._files.get(file_id)
+
+    def create_batch(self, flavor: str, requests: List[Dict]) -> Dict:
+        """Paczka jest "przetwarzana" przez `batch_seconds`; odpowiedzi powstają od razu"""
+        succeeded, failed = [], []
+        for request in requests:
+            body = request.get("params") if flavor == "anthropic" else request.get("body")
+            with self._rng_lock:
+                self.requests += 1
+                roll = self._rng.random()
+                rng = random.Random(self._rng.random())
+            if roll < self.config.batch_error_rate:
+                failed.append(request["custom_id"])
+                continue
+            text, article, tool, input_tokens, output_tokens = _generate(flavor, body or {}, rng)
+            payload = _message_payload(flavor, body or {}, text, article, tool, input_tokens, output_tokens)
+            succeeded.append((request["custom_id"], payload))
+        with self._batch_lock:
+            number = len(self._batches) + 1
+            batch_id = f"msgbatch_{number:04d}" if flavor == "anthropic" else f"batch_{number:04d}"
+            self._batches[batch_id] = {"flavor": flavor, "created": time.time(), "total": len(requests),
+                                       "succeeded": succeeded, "failed": failed}
+        return self._batch_status(batch_id)
+
+    def batch_status(self, batch_id: str) -> Optional[Dict]:
+        with self._batch_lock:
+            self.batch_polls += 1
+            if batch_id not in self._batches:
+                return None
+        return self._batch_status(batch_id)
+
+    def _batch_status(self, batch_id: str) -> Dict:
+        batch = self._batches[batch_id]
+        ended = time.time() - batch["created"] >= self.config.batch_seconds
+        succeeded, failed = len(batch["succeeded"]), len(batch["failed"])
+        if batch["flavor"] == "anthropic":
+            return {
+                "id": batch_id, "type": "message_batch",
+                "processing_status": "ended" if ended else "in_progress",
+                "request_counts": {"processing": 0 if ended else batch["total"],
+                                   "succeeded": succeeded if ended else 0, "errored": failed if ended else 0,
+                                   "canceled": 0, "expired": 0},
+                "results_url": f"{self.base_url}/v1/messages/batches/{batch_id}/results" if ended else None,
+            }
+        output_id = error_id = None
+        if ended:
+            with self._batch_lock:
+                output_id, error_id = f"{batch_id}-output", f"{batch_id}-errors" if failed else None
+                self._files[output_id] = [
+                    {"id": f"req_{i}", "custom_id": custom_id,
+                     "response": {"status_code": 200, "request_id": f"req_{i}", "body": payload}, "error": None}
+                    for i, (custom_id, payload) in enumerate(batch["succeeded"])
+                ]
+                if error_id:
+                    self._files[error_id] = [
+                        {"id": f"err_{i}", "custom_id": custom_id,
+                         "response": {"status_code": 500, "body": {"error": {"message": "server error"}}},
+                         "error": None}
+                        for i, custom_id in enumerate(batch["failed"])
+                    ]
+        return {
+            "id": batch_id, "object": "batch", "endpoint": "/v1/chat/completions",
+            "status": "completed" if ended else "in_progress",
+            "request_counts": {"total": batch["total"], "completed": succeeded if ended else 0,
+                               "failed": failed if ended else 0},
+            "output_file_id": output_id, "error_file_id": error_id,
+        }
+
+    def batch_results(self, batch_id: str) -> Optional[List[Dict]]:
+        """Wyniki paczki Anthropic (dostępne po zakończeniu przetwarzania)"""
+        with self._batch_lock:
+            batch = self._batches.get(batch_id)
+        if batch is None or time.time() - batch["created"] < self.config.batch_seconds:
+            return None
+        lines = [{"custom_id": custom_id, "result": {"type": "succeeded", "message": payload}}
+                 for custom_id, payload in batch["succeeded"]]
+        lines += [{"custom_id": custom_id, "result": {"type": "errored", "error": {
+            "type": "error", "error": {"type": "api_error", "message": "server error"}}}}
+            for custom_id in batch["failed"]]
+        return lines
+
+    def _make_handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, format, *args):
+                pass
+
+            def handle_one_request(self):
+                try:
+                    super().handle_one_request()
+                except (BrokenPipeError, ConnectionResetError):
+                    self.close_connection = True
+
+            def do_GET(self):
+                url = urlparse(self.path)
+                if url.path.startswith(("/v1/messages/batches/", "/v1/batches/", "/v1/files/")):
+                    return self._batch_get(url.path.rstrip("/"))
+                query = parse_qs(url.query).get("q", [""])[0]
+                outcome, latency, _ = server._draw()
+                if outcome == "hang":
+                    time.sleep(server.config.hang_seconds)
+                    self.close_connection = True
+                    return
+                time.sleep(latency)
+                if outcome != "ok":
+                    return self._json(int(outcome), {"error": {"message": "unavailable"}})
+                if url.path.rstrip("/") == "/customsearch/v1":
+                    count = min(int(parse_qs(url.query).get("num", ["6"])[0]), 10)
+                    return self._json(200, _search_results(server.base_url, query, count))
+                if url.path.startswith("/strony/"):
+                    data = _source_page(query, int(url.path.rsplit("/", 1)[-1] or 0)).encode("utf-8")
+                    self.send_response(200)
+                    self.send_header("Content-Type", "text/html")
+                    self.send_header("Content-Length", str(len(data)))
+                    self.end_headers()
+                    self.wfile.write(data)
+                    return
+                self._json(404, {"error": {"message": "not found"}})
+
+            def do_POST(self):
+                path = self.path.rstrip("/")
+                if path == "/v1/files":
+                    return self._json(200, server.upload_file(self.headers.get("Content-Type", ""), self._body()))
+                body = json.loads(self._body() or b"{}")
+                if path == "/v1/messages/batches":
+                    return self._json(200, server.create_batch("anthropic", body.get("requests", [])))
+                if path == "/v1/batches":
+                    lines = server.read_file(body.get("input_file_id", ""))
+                    if lines is None:
+                        return self._json(404, {"error": {"message": "no such file"}})
+                    return self._json(200, server.create_batch("openai", lines))
+                if self.path.rstrip("/") == "/v1/messages":
+                    flavor = "anthropic"
+                elif self.path.rstrip("/") == "/v1/chat/completions":
+                    flavor = "openai"
+                else:
+                    return self._json(404, {"error": {"message": "not found"}})
+
+                outcome, latency, rng = server._draw()
+                config = server.config
+                if outcome == "hang":
+                    # Klient zdąży zerwać połączenie po swoim timeoucie - nic już nie wysyłamy
+                    time.sleep(config.hang_seconds)
+                    self.close_connection = True
+                    return
+                if _is_fast_model(body.get("model", "")):
+                    latency /= config.fast_model_speedup
+                time.sleep(latency)
+                if outcome == "429":
+                    return self._json(429, {"error": {"type": "rate_limit_error", "message": "rate limited"}},
+                                      {"retry-after": str(config.retry_after)})
+                if outcome == "529":
+                    return self._json(529, {"error": {"type": "overloaded_error", "message": "overloaded"}})
+
+                text, article, tool, input_tokens, output_tokens = _generate(flavor, body, rng,
+                                                                             config.review_approve_rate)
+                if body.get("stream"):
+                    self._stream(flavor, text, input_tokens, output_tokens, body.get("model", ""), tool)
+                else:
+                    time.sleep(output_tokens / server.tokens_per_second(body.get("model", "")))
+                    self._json(200, _message_payload(flavor, body, text, article, tool,
+                                                     input_tokens, output_tokens))
+
+            def _batch_get(self, path: str):
+                """Stan paczki, wyniki Anthropic (JSONL) albo zawartość pliku OpenAI"""
+                parts = path.split("/")
+                if path.startswith("/v1/files/") and parts[-1] == "content":
+                    lines = server.read_file(parts[-2])
+                    return self._jsonl(lines) if lines is not None else self._json(404, {})
+                batch_id = parts[4] if path.startswith("/v1/messages/batches/") else parts[3]
+                if parts[-1] == "results":
+                    lines = server.batch_results(batch_id)
+                    return self._jsonl(lines) if lines is not None else self._json(404, {})
+                status = server.batch_status(batch_id)
+                return self._json(200, status) if status is not None else self._json(404, {})
+
+            def _body(self) -> bytes:
+                return self.rfile.read(int(self.headers.get("Content-Length", 0)))
+
+            def _jsonl(self, lines: List[Dict]):
+                data = "".join(json.dumps(line, ensure_ascii=False) + "\n" for line in lines).encode("utf-8")
+                self._headers(200, "application/x-jsonl")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def _headers(self, status: int, content_type: str, extra: Optional[Dict[str, str]] = None):
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                # Wysokie limity - limiter klienta dopasowuje się do nich z nagłówków
+                for kind in ("requests", "tokens"):
+                    self.send_header(f"anthropic-ratelimit-{kind}-limit", "1000000")
+                    self.send_header(f"x-ratelimit-limit-{kind}", "1000000")
+                for name, value in (extra or {}).items():
+                    self.send_header(name, value)
+
+            def _json(self, status: int, payload: Dict, extra: Optional[Dict[str, str]] = None):
+                data = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+                self._headers(status, "application/json", extra)
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def _event(self, payload: Dict, event: Optional[str] = None):
+                prefix = f"event: {event}\n" if event else ""
+                data = f"{prefix}data: {json.dumps(payload, ensure_ascii=False)}\n\n".encode("utf-8")
+                self.wfile.write(f"{len(data):x}\r\n".encode("ascii") + data + b"\r\n")
+                self.wfile.flush()
+
+            def _stream(self, flavor: str, text: str, input_tokens: int, output_tokens: int, model: str,
+                        tool: Optional[str] = None):
+                self._headers(200, "text/event-stream")
+                self.send_header("Transfer-Encoding", "chunked")
+                self.end_headers()
+                chunks = _chunks(text)
+                delay = output_tokens / server.tokens_per_second(model) / max(len(chunks), 1)
+                if flavor == "anthropic":
+                    self._event({"type": "message_start", "message": {
+                        "model": model, "usage": {"input_tokens": input_tokens, "output_tokens": 1}}},
+                        "message_start")
+                    for chunk in chunks:
+                        time.sleep(delay)
+                        if tool:
+                            delta = {"type": "input_json_delta", "partial_json": chunk}
+                        else:
+                            delta = {"type": "text_delta", "text": chunk}
+                        self._event({"type": "content_block_delta", "index": 0, "delta": delta},
+                                    "content_block_delta")
+                    self._event({"type": "message_delta", "usage": {"output_tokens": output_tokens}},
+                                "message_delta")
+                    self._event({"type": "message_stop"}, "message_stop")
+                else:
+                    for chunk in chunks:
+                        time.sleep(delay)
+                        self._event({"choices": [{"index": 0, "delta": {"content": chunk}}]})
+                    self._event({"choices": [], "usage": {"prompt_tokens": input_tokens,
+                                                          "completion_tokens": output_tokens}})
+                    data = b"data: [DONE]\n\n"
+                    self.wfile.write(f"{len(data):x}\r\n".encode("ascii") + data + b"\r\n")
+                self.wfile.write(b"0\r\n\r\n")
+                self.wfile.flush()
+
+        return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Lokalny serwer udający API LLM")
+    parser.add_argument("--port", type=int, default=8900)
+    parser.add_argument("--median-latency", type=float, default=1.0)
+    parser.add_argument("--latency-sigma", type=float, default=0.5)
+    parser.add_argument("--tokens-per-second", type=float, default=80.0)
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0)
+    parser.add_argument("--overload-rate", type=float, default=0.0)
+    parser.add_argument("--timeout-rate", type=float, default=0.0)
+    parser.add_argument("--batch-seconds", type=float, default=2.0)
+    parser.add_argument("--batch-error-rate", type=float, default=0.0)
+    parser.add_argument("--fast-model-speedup", type=float, default=1.0)
+    parser.add_argument("--review-approve-rate", type=float, default=0.0)
+    args = parser.parse_args()
+    config = MockConfig(args.median_latency, args.latency_sigma, args.tokens_per_second,
+                        args.rate_limit_rate, args.overload_rate, args.timeout_rate,
+                        batch_seconds=args.batch_seconds, batch_error_rate=args.batch_error_rate,
+                        fast_model_speedup=args.fast_model_speedup, review_approve_rate=args.review_approve_rate)
+    server = MockLLMServer(config, port=args.port)
+    print(f"Serwer testowy LLM: {server.base_url}")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
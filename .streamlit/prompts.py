@@ -0,0 +1,226 @@
+"""Szablony promptów generatora - czyste funkcje zwracające tekst polecenia.
+
+Bez wywołań API i bez stanu: `ArticleWriter` dokłada do nich fragmenty
+researchu i limity z budżetu słów, a Batch API buduje z nich te same zapytania.
+Zmiana tekstu zmienia klucze cache odpowiedzi.
+"""
+import json
+from typing import List, Tuple
+
+from budget import ARTICLE_WORD_LIMIT, ARTICLE_WORD_TARGET, INTRO_WORDS
+from clinics import clinic_info
+
+# Szacunkowa liczba słów tytułu i śródtytułów, gdy konspektu jeszcze nie ma
+HEADING_WORDS = 40
+
+INTRODUCTION_PROMPT = """Napisz krótki, chwytliwy wstęp do tego artykułu.
+
+Wymagania:
+1. MAKSYMALNIE 2-3 zdania (około 50-80 słów)
+2. Zaczynamy od ciekawego hooka - faktu, pytania retorycznego lub zaskakującej informacji
+3. Ma płynnie wprowadzać w temat artykułu
+
+Napisz tylko wstęp, bez żadnych dodatkowych komentarzy."""
+
+# Odpowiedź rewizji, gdy szkic szybkiego modelu nie wymaga zmian
+DRAFT_APPROVED = "ZATWIERDZONE"
+
+
+def should_mention_clinic(section_index: int, section_count: int) -> bool:
+    """Czy sekcja ma zawierać wzmiankę o klinice (środkowa i ostatnia sekcja)"""
+    return section_index == section_count // 2 or section_index == section_count - 1
+
+
+def outline_prompt(topic: str, clinic: str, context: str = "", research: str = "") -> str:
+    """Polecenie tytułu i konspektu (odpowiedź w formacie TYTUŁ / ŚRÓDTYTUŁY)"""
+    context_section = f"\nDodatkowy kontekst: {context}" if context else ""
+    return f"""Stwórz tytuł i zwięzły konspekt artykułu na temat: "{topic}"{context_section}{research}
+
+WAŻNE: Artykuł ma być krótki - maksymalnie 800 słów, więc konspekt musi być zwięzły!
+
+Wymagania:
+1. Artykuł ma być merytoryczny, ale przystępny i lifestyleowy
+2. Musi zawierać subtelną wzmiankę o klinice: {clinic_info(clinic)['nazwa']}
+3. Konspekt powinien składać się z 4-5 głównych punktów (śródtytułów) - NIE WIĘCEJ!
+4. Każdy punkt powinien być konkretny i interesujący
+5. Nie używaj słów "kluczowy", "innowacyjny", "nowoczesny"
+6. Tytuł ma być chwytliwy i intrygujący
+7. Naturalny zapis jak w zdaniu.
+
+Zwróć w formacie:
+TYTUŁ: [tutaj tytuł artykułu]
+
+ŚRÓDTYTUŁY:
+1. Tytuł pierwszego punktu
+2. Tytuł drugiego punktu
+etc.
+
+Pamiętaj - to ma być artykuł lifestyleowy, nie medyczny podręcznik!"""
+
+
+def article_brief(title: str, topic: str, clinic: str, outline: List[str], context: str = "") -> str:
+    """Wspólna, niezmienna część promptów wstępu i sekcji.
+
+    Trafia do wiadomości systemowej jako stały prefiks, który dostawcy mogą
+    cache'ować między wywołaniami (cache_control w Claude, automatyczne
+    cache'owanie prefiksu w API zgodnych z OpenAI).
+    """
+    context_section = f"\nKontekst artykułu: {context}" if context else ""
+    clinic_section = ""
+    if clinic:
+        info = clinic_info(clinic)
+        clinic_section = f"""
+Klinika partnerska: {info['nazwa']} - {info.get('opis', '')}
+Specjalizacje kliniki: {', '.join(info.get('specjalizacje', []))}
+Wzmiankę o klinice umieszczaj tylko tam, gdzie polecenie wyraźnie o to prosi.
+"""
+
+    return f"""Piszesz artykuł o tytule: "{title}"
+Temat główny: {topic}{context_section}
+
+Konspekt artykułu:
+{chr(10).join([f"- {point}" for point in outline])}
+{clinic_section}
+Wymagania stylistyczne dla całego artykułu:
+1. Merytoryczna, ale przystępna treść, która jest ciekawa dla czytelnika
+2. Naturalny, płynny, lifestyleowy język
+3. Bez zwracania się bezpośrednio do czytelnika (bez "Ci", "Twój", "Ciebie")
+4. Bez metafor i sztucznych sformułowań AI
+5. Nie używaj słów "kluczowy", "innowacyjny", "nowoczesny"
+6. Możesz użyć wypunktowań, jeżeli to zasadne"""
+
+
+def outline_context(outline: List[str], section_index: int) -> str:
+    """Kontekst z konspektu dla sekcji pisanej równolegle z pozostałymi"""
+    lines = ["(Sekcje powstają równolegle - opieraj się na konspekcie.)"]
+    if section_index > 0:
+        lines.append(f'Poprzednia sekcja: "{outline[section_index - 1]}" - nie powielaj jej zakresu.')
+    if section_index < len(outline) - 1:
+        lines.append(f'Następna sekcja: "{outline[section_index + 1]}" - zostaw jej temat na później.')
+    return "\n".join(lines)
+
+
+def section_prompt(section_title: str, section_index: int, clinic: str, outline: List[str],
+                   written_content: str, research: str = "", words: int = 200) -> str:
+    """Część polecenia sekcji zależna od sekcji (po wspólnym prefiksie `article_brief`)"""
+    previous_sections = outline[:section_index]
+    current_section = outline[section_index]
+    remaining_sections = outline[section_index + 1:]
+
+    clinic_instruction = ""
+    if should_mention_clinic(section_index, len(outline)):
+        clinic_instruction = f"""
+WAŻNE: W tej sekcji umieść subtelną wzmiankę o {clinic_info(clinic)['nazwa']}.
+Wzmianka powinna być naturalna i pasować do kontekstu.
+"""
+
+    return f"""Napisz treść sekcji "{section_title}".
+
+Informacje o strukturze:
+- Już napisane sekcje: {previous_sections if previous_sections else 'tylko wstęp'}
+- Obecna sekcja: {current_section}
+- Pozostałe sekcje: {remaining_sections if remaining_sections else 'to ostatnia sekcja'}
+
+Fragment tego, co już napisano (koniec):
+{written_content[-400:] if len(written_content) > 400 else written_content}
+
+{clinic_instruction}{research}
+
+WAŻNE OGRANICZENIA:
+- Ta sekcja powinna mieć około {words} słów (2-3 krótkie akapity) - nie więcej
+- NIE powtarzaj informacji z wcześniejszych sekcji
+- Bądź konkretny i podawaj praktyczne informacje
+- Pamiętaj o kontekście - co już było, co będzie
+
+Napisz tylko treść sekcji, bez tytułu i dodatkowych komentarzy."""
+
+
+def duplicate_note(excerpt: str) -> str:
+    """Dopisek do polecenia sekcji, która powtórzyła inny artykuł"""
+    return f"""
+
+UWAGA: Poprzednia wersja tej sekcji niemal powtarzała inny, już opublikowany artykuł:
+"{excerpt}..."
+Napisz sekcję od nowa - inne przykłady, inna kolejność myśli i własne sformułowania."""
+
+
+def seam_prompt(previous_paragraph: str, paragraph: str, section_title: str) -> str:
+    """Polecenie przepisania pierwszego akapitu sekcji pod koniec poprzedniej"""
+    return f"""Poniżej koniec jednej sekcji artykułu i pierwszy akapit kolejnej sekcji "{section_title}".
+
+Koniec poprzedniej sekcji:
+{previous_paragraph}
+
+Pierwszy akapit kolejnej sekcji:
+{paragraph}
+
+Przepisz TYLKO pierwszy akapit kolejnej sekcji tak, aby płynnie nawiązywał do poprzedniej i nie powtarzał jej treści.
+Zachowaj jego sens, długość i styl. Bez zwracania się do czytelnika. Zwróć wyłącznie przepisany akapit."""
+
+
+def sentence_rewrite_prompt(items: List[Tuple[str, str]]) -> str:
+    """Polecenie poprawy ponumerowanych zdań (zdanie, polecenie) - odpowiedź linia po linii"""
+    numbered = "\n".join(f"{i}. [{instruction}] {sentence}" for i, (sentence, instruction) in enumerate(items, 1))
+    return f"""Popraw poniższe zdania z artykułu lifestyleowego. Przy każdym w nawiasie kwadratowym jest polecenie.
+
+{numbered}
+
+Zachowaj sens, długość i styl każdego zdania. Pisz bezosobowo, bez słów "kluczowy", "innowacyjny", "nowoczesny".
+Zwróć wyłącznie poprawione zdania, każde w osobnej linii, z tym samym numerem i bez nawiasów z poleceniem."""
+
+
+def draft_review_prompt() -> str:
+    """Polecenie rewizji szkicu (po poleceniu kroku i szkicu jako odpowiedzi asystenta)"""
+    return f"""Powyższy tekst to szkic napisany przez szybszy model. Sprawdź, czy spełnia wszystkie wymagania z polecenia:
+długość, merytoryka, styl, brak zakazanych słów i zwrotów do czytelnika, wzmianka o klinice tylko tam, gdzie polecenie o nią prosi.
+
+Jeśli szkic spełnia wymagania, odpowiedz wyłącznie słowem {DRAFT_APPROVED}.
+W przeciwnym razie zwróć całą poprawioną treść, bez tytułu i dodatkowych komentarzy."""
+
+
+def structured_prompt(topic: str, clinic: str, context: str = "", research: str = "") -> str:
+    """Polecenie całego artykułu w jednym wywołaniu: tytuł, wstęp i sekcje jako JSON"""
+    info = clinic_info(clinic)
+    clinic_name = info['nazwa']
+    context_section = f"\nDodatkowy kontekst: {context}" if context else ""
+    section_words = (ARTICLE_WORD_TARGET - INTRO_WORDS - HEADING_WORDS) // 5
+
+    return f"""Napisz kompletny artykuł na temat: "{topic}"{context_section}{research}
+
+Klinika partnerska: {clinic_name} - {info.get('opis', '')}
+Specjalizacje kliniki: {', '.join(info.get('specjalizacje', []))}
+
+WAŻNE: Cały artykuł (razem z tytułem i śródtytułami) ma mieć maksymalnie {ARTICLE_WORD_LIMIT} słów!
+
+Wymagania:
+1. Tytuł ma być chwytliwy i intrygujący
+2. Wstęp: 2-3 zdania (około {INTRO_WORDS} słów), zaczyna się hookiem - faktem, pytaniem retorycznym lub zaskakującą informacją
+3. 4-5 sekcji, każda około {section_words} słów (2-3 krótkie akapity); śródtytuły konkretne, naturalny zapis jak w zdaniu
+4. Subtelna, naturalna wzmianka o {clinic_name} tylko w środkowej i w ostatniej sekcji
+5. Merytoryczna, ale przystępna i lifestyleowa treść - to nie medyczny podręcznik
+6. Bez zwracania się bezpośrednio do czytelnika (bez "Ci", "Twój", "Ciebie")
+7. Bez metafor i sztucznych sformułowań AI; nie używaj słów "kluczowy", "innowacyjny", "nowoczesny"
+8. Sekcje nie powtarzają swoich informacji; możesz użyć wypunktowań, jeżeli to zasadne
+
+Zwróć wyłącznie JSON w formacie:
+{{"title": "...", "intro": "...", "sections": [{{"heading": "...", "text": "..."}}]}}
+Treść sekcji w Markdown, bez śródtytułu."""
+
+
+def structured_revision_prompt(title: str, intro: str, sections: List[str], research: str = "") -> str:
+    """Polecenie wstępu i brakujących sekcji gotowego konspektu (JSON, po prefiksie `article_brief`)"""
+    return f"""Napisz poniższe części artykułu w jednej odpowiedzi.
+
+{intro}
+
+Sekcje do napisania (dokładnie te śródtytuły, w tej kolejności):
+{chr(10).join(sections)}
+{research}
+WAŻNE OGRANICZENIA:
+- Trzymaj się podanej długości każdej sekcji (2-3 krótkie akapity)
+- Wzmiankę o klinice umieść tylko w sekcjach, przy których jest to zaznaczone
+- Sekcje nie powtarzają swoich informacji
+
+Zwróć wyłącznie JSON w formacie:
+{{"title": {json.dumps(title, ensure_ascii=False)}, "intro": "...", "sections": [{{"heading": "...", "text": "..."}}]}}
+Treść sekcji w Markdown, bez śródtytułu."""
@@ -0,0 +1,58 @@
+"""Dostawcy modeli: nazwy, modele, adresy API i zmienne z kluczami.
+
+Czyste dane bez zależności - wspólne dla aplikacji, batch.py i benchmarku.
+"""
+
+# Modele i temperatury używane dla poszczególnych dostawców
+MODELS = {
+    "claude": "claude-sonnet-4-20250514",
+    "openai": "gpt-4o",
+    "deepseek": "deepseek-chat"
+}
+
+# Adresy API - do podmiany np. na lokalny serwer testowy (benchmark.py)
+BASE_URLS = {
+    "claude": "https://api.anthropic.com",
+    "openai": "https://api.openai.com",
+    "deepseek": "https://api.deepseek.com"
+}
+
+TEMPERATURES = {
+    "claude": None,
+    "openai": 0.7,
+    "deepseek": 0.7
+}
+
+# Nazwy wyświetlane w interfejsie
+PROVIDER_NAMES = {
+    "claude": "Claude Sonnet 4",
+    "openai": "GPT-4o",
+    "deepseek": "DeepSeek Chat"
+}
+
+# Zmienne środowiskowe (i klucze Streamlit Secrets) z kluczami API
+API_KEY_ENV = {
+    "claude": "ANTHROPIC_API_KEY",
+    "openai": "OPENAI_API_KEY",
+    "deepseek": "DEEPSEEK_API_KEY",
+}
+
+# Dostawcy z Batch API (tryb hurtowy batch.py --batch-api); DeepSeek nie ma odpowiednika
+BATCH_PROVIDERS = ("claude", "openai")
+
+# Szybsze i tańsze modele tych samych dostawców - do szkiców i prostych kroków (routing.py)
+FAST_MODELS = {
+    "claude": "claude-3-5-haiku-20241022",
+    "openai": "gpt-4o-mini",
+    "deepseek": "deepseek-chat"
+}
+
+# Cennik w USD za milion tokenów: wejście, wyjście, odczyt z cache promptu, zapis do cache promptu
+# (stan z cenników dostawców - przy zmianie cen wystarczy poprawić tę tabelę)
+PRICES = {
+    "claude-sonnet-4-20250514": (3.00, 15.00, 0.30, 3.75),
+    "claude-3-5-haiku-20241022": (0.80, 4.00, 0.08, 1.00),
+    "gpt-4o": (2.50, 10.00, 1.25, 2.50),
+    "gpt-4o-mini": (0.15, 0.60, 0.075, 0.15),
+    "deepseek-chat": (0.27, 1.10, 0.07, 0.27),
+}
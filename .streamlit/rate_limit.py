@@ -0,0 +1,213 @@
+"""Adaptacyjny limiter zapytań i harmonogram ponowień dla każdego dostawcy.
+
+Dla każdego dostawcy działają dwa kubełki tokenów: zapytania na minutę i tokeny
+na minutę. Limity i stan są korygowane na podstawie nagłówków rate-limit z
+odpowiedzi, a 429/529 wstrzymują cały ruch do dostawcy na czas `retry-after`.
+Błędy przejściowe są ponawiane z wykładniczym opóźnieniem z losowym rozrzutem.
+"""
+import random
+import re
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Callable, Dict, Mapping, Optional, TypeVar
+
+from errors import ProviderError, RateLimitError
+from telemetry import note
+
+T = TypeVar("T")
+
+
+@dataclass(frozen=True)
+class RateLimits:
+    requests_per_minute: float
+    tokens_per_minute: float
+
+
+@dataclass(frozen=True)
+class RetryPolicy:
+    max_retries: int = 5
+    base_delay: float = 1.0
+    max_delay: float = 60.0
+
+    def delay(self, attempt: int, retry_after: Optional[float] = None) -> float:
+        """Opóźnienie przed ponowieniem: pełny jitter, nie krócej niż retry-after"""
+        backoff = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+        return max(backoff, retry_after) if retry_after is not None else backoff
+
+
+DEFAULT_LIMITS = {
+    "claude": RateLimits(50, 80_000),
+    "openai": RateLimits(500, 30_000),
+    "deepseek": RateLimits(1_000, 1_000_000),
+}
+
+
+class TokenBucket:
+    """Kubełek tokenów uzupełniany w sposób ciągły (pojemność = limit na minutę)"""
+
+    def __init__(self, per_minute: float):
+        self.capacity = float(per_minute)
+        self.level = float(per_minute)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float):
+        self.level = min(self.capacity, self.level + (now - self._updated) * self.capacity / 60.0)
+        self._updated = now
+
+    def acquire(self, amount: float) -> float:
+        """Pobiera `amount` tokenów, czekając na uzupełnienie; zwraca czas oczekiwania"""
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                needed = min(amount, self.capacity)
+                if self.level >= needed:
+                    self.level -= needed
+                    return waited
+                wait = (needed - self.level) * 60.0 / self.capacity
+            time.sleep(wait)
+            waited += wait
+
+    def set_capacity(self, per_minute: float):
+        with self._lock:
+            self._refill(time.monotonic())
+            self.capacity = float(per_minute)
+            self.level = min(self.level, self.capacity)
+
+    def sync(self, remaining: float):
+        """Dopasowuje stan do liczby pozostałych tokenów zgłoszonej przez API"""
+        with self._lock:
+            self._refill(time.monotonic())
+            self.level = min(self.level, float(remaining))
+
+
+def _duration_seconds(value: str) -> Optional[float]:
+    """Czas resetu w formacie OpenAI ("1s", "6m0s", "20ms") albo RFC 3339 (Anthropic)"""
+    parts = re.findall(r"(\d+(?:\.\d+)?)(ms|h|m|s)", value)
+    if parts and "".join(number + unit for number, unit in parts) == value:
+        scale = {"ms": 0.001, "s": 1, "m": 60, "h": 3600}
+        return sum(float(number) * scale[unit] for number, unit in parts)
+    try:
+        reset = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    return max(reset.timestamp() - time.time(), 0.0)
+
+
+def _header(headers: Mapping[str, str], *names: str) -> Optional[str]:
+    for name in names:
+        value = headers.get(name)
+        if value:
+            return value
+    return None
+
+
+class ProviderScheduler:
+    """Limiter i harmonogram ponowień dla jednego dostawcy"""
+
+    def __init__(self, provider: str, limits: RateLimits, retry: RetryPolicy = RetryPolicy()):
+        self.provider = provider
+        self.retry = retry
+        self.requests = TokenBucket(limits.requests_per_minute)
+        self.tokens = TokenBucket(limits.tokens_per_minute)
+        self._lock = threading.Lock()
+        self._blocked_until = 0.0
+        self.calls = 0
+        self.retries = 0
+        self.rate_limited = 0
+        self.waited = 0.0
+
+    def _wait_until_unblocked(self) -> float:
+        waited = 0.0
+        while True:
+            with self._lock:
+                wait = self._blocked_until - time.monotonic()
+            if wait <= 0:
+                return waited
+            time.sleep(wait)
+            waited += wait
+
+    def block_for(self, seconds: float):
+        """Wstrzymuje wszystkie zapytania do dostawcy na `seconds` sekund"""
+        with self._lock:
+            self._blocked_until = max(self._blocked_until, time.monotonic() + seconds)
+
+    def run(self, call: Callable[[], T], estimated_tokens: int) -> T:
+        """Wykonuje `call` w ramach limitów, ponawiając błędy przejściowe"""
+        attempt = 0
+        while True:
+            waited = self._wait_until_unblocked()
+            waited += self.requests.acquire(1)
+            waited += self.tokens.acquire(estimated_tokens)
+            with self._lock:
+                self.calls += 1
+                self.waited += waited
+            note(queue_wait=waited)
+            try:
+                return call()
+            except ProviderError as e:
+                if not e.retryable or attempt >= self.retry.max_retries:
+                    raise
+                delay = self.retry.delay(attempt, e.retry_after)
+                with self._lock:
+                    self.retries += 1
+                    self.rate_limited += int(isinstance(e, RateLimitError))
+                if e.retry_after is not None or isinstance(e, RateLimitError):
+                    # Limit dotyczy całego konta - wstrzymujemy wszystkie wątki, nie tylko ten
+                    self.block_for(delay)
+                else:
+                    time.sleep(delay)
+                attempt += 1
+
+    def observe(self, headers: Mapping[str, str]):
+        """Koryguje limity na podstawie nagłówków rate-limit odpowiedzi"""
+        for kind, bucket in (("requests", self.requests), ("tokens", self.tokens)):
+            limit = _header(headers, f"anthropic-ratelimit-{kind}-limit", f"x-ratelimit-limit-{kind}")
+            remaining = _header(headers, f"anthropic-ratelimit-{kind}-remaining", f"x-ratelimit-remaining-{kind}")
+            reset = _header(headers, f"anthropic-ratelimit-{kind}-reset", f"x-ratelimit-reset-{kind}")
+            try:
+                if limit and float(limit) != bucket.capacity:
+                    bucket.set_capacity(float(limit))
+                if remaining is not None:
+                    bucket.sync(float(remaining))
+                    if float(remaining) <= 0 and reset:
+                        seconds = _duration_seconds(reset)
+                        if seconds:
+                            self.block_for(seconds)
+            except ValueError:
+                continue
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            return {
+                "calls": self.calls,
+                "retries": self.retries,
+                "rate_limited": self.rate_limited,
+                "waited": self.waited,
+                "rpm_limit": self.requests.capacity,
+                "tpm_limit": self.tokens.capacity,
+            }
+
+
+_schedulers: Dict[str, ProviderScheduler] = {}
+_registry_lock = threading.Lock()
+
+
+def get_scheduler(provider: str) -> ProviderScheduler:
+    """Współdzielony harmonogram dostawcy (jeden na proces)"""
+    with _registry_lock:
+        scheduler = _schedulers.get(provider)
+        if scheduler is None:
+            scheduler = ProviderScheduler(provider, DEFAULT_LIMITS.get(provider, RateLimits(60, 100_000)))
+            _schedulers[provider] = scheduler
+        return scheduler
+
+
+def scheduler_stats() -> Dict[str, Dict[str, float]]:
+    with _registry_lock:
+        schedulers = dict(_schedulers)
+    return {provider: scheduler.stats() for provider, scheduler in schedulers.items()}
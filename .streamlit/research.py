@@ -0,0 +1,319 @@
+"""Research przed pisaniem: wyszukiwanie, pobieranie źródeł i lokalny indeks BM25.
+
+Wyniki wyszukiwania (Google Custom Search JSON API lub zgodny z nim serwer
+testowy) i strony źródłowe są pobierane równolegle, z ograniczoną pulą wątków,
+limitami czasu i trwałym cache HTTP na dysku. Z każdej strony wyciągana jest
+główna treść, dzielona na krótkie fragmenty i indeksowana BM25 - dzięki temu
+każda sekcja artykułu dostaje tylko fragmenty związane z jej śródtytułem.
+"""
+import codecs
+import json
+import math
+import os
+import re
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass, field
+from html.parser import HTMLParser
+from typing import Dict, List, Optional, Tuple
+
+from completion_cache import CompletionCache, get_cache
+from http_pool import PoolConfig, get_pool
+
+GOOGLE_SEARCH_ENDPOINT = "https://www.googleapis.com/customsearch/v1"
+# Inny adres (np. `/customsearch/v1` serwera mock_llm_server.py) pozwala testować research bez Google
+SEARCH_ENDPOINT = os.environ.get("SEARCH_ENDPOINT", GOOGLE_SEARCH_ENDPOINT)
+HTTP_CACHE_PATH = os.environ.get("HTTP_CACHE_PATH", os.path.join(".cache", "http.sqlite"))
+USER_AGENT = "Mozilla/5.0 (compatible; sponsored-monster-research/1.0)"
+
+# Najczęstsze polskie słowa funkcyjne - nie niosą informacji o temacie fragmentu
+STOPWORDS = set("""
+a aby ale bez bo by być był była było były co czy dla do gdy gdzie go i ich im jak jako jakie jej jest jeszcze
+już jego kiedy która które który ma mają może można na nad nie nich niż o od oraz po pod przez przy sie się
+są ta tak także te tego tej ten to tu tylko tym u w we więc z za ze że żeby
+""".split())
+
+
+class ResearchError(RuntimeError):
+    """Wyszukiwarka nie zwróciła wyników (błąd sieci, klucza API lub limitu)"""
+
+
+@dataclass(frozen=True)
+class ResearchConfig:
+    api_key: str = ""
+    cse_id: str = ""
+    endpoint: str = SEARCH_ENDPOINT
+    results_per_query: int = 8
+    max_workers: int = 8
+    connect_timeout: float = 5.0
+    read_timeout: float = 15.0
+    max_page_bytes: int = 2 * 1024 * 1024
+    passage_words: int = 90
+
+
+@dataclass
+class Passage:
+    text: str
+    url: str
+    title: str
+
+
+@dataclass
+class Source:
+    url: str
+    title: str
+    snippet: str = ""
+    status: str = "ok"
+    passages: int = 0
+    cached: bool = False
+
+
+def tokenize(text: str) -> List[str]:
+    """Tokeny do BM25: małe litery, bez słów funkcyjnych, przycięte do 6 znaków.
+
+    Przycięcie działa jak prosty stemmer - odmiany polskich słów ("skóry",
+    "skórze", "skórą") w większości mają wspólny początek.
+    """
+    words = re.findall(r"\w+", text.lower(), flags=re.UNICODE)
+    return [word[:6] for word in words if word not in STOPWORDS and len(word) > 1 and not word.isdigit()]
+
+
+class BM25Index:
+    """Indeks Okapi BM25 w pamięci"""
+
+    def __init__(self, passages: List[Passage], k1: float = 1.5, b: float = 0.75):
+        self.passages = passages
+        self.k1 = k1
+        self.b = b
+        self._terms = [Counter(tokenize(passage.text)) for passage in passages]
+        self._lengths = [sum(terms.values()) for terms in self._terms]
+        self._avg_length = sum(self._lengths) / len(self._lengths) if self._lengths else 0.0
+        document_frequency = Counter(term for terms in self._terms for term in terms)
+        count = len(passages)
+        self._idf = {term: math.log(1 + (count - df + 0.5) / (df + 0.5)) for term, df in document_frequency.items()}
+
+    def search(self, query: str, k: int = 3) -> List[Tuple[float, Passage]]:
+        query_terms = set(tokenize(query))
+        scored = []
+        for i, terms in enumerate(self._terms):
+            score = 0.0
+            norm = self.k1 * (1 - self.b + self.b * self._lengths[i] / (self._avg_length or 1))
+            for term in query_terms:
+                frequency = terms.get(term)
+                if frequency:
+                    score += self._idf[term] * frequency * (self.k1 + 1) / (frequency + norm)
+            if score > 0:
+                scored.append((score, self.passages[i]))
+        scored.sort(key=lambda item: item[0], reverse=True)
+        return scored[:k]
+
+
+class _MainTextParser(HTMLParser):
+    """Zbiera tekst akapitów, pomijając skrypty, nawigację, stopki itp."""
+    SKIP = {"script", "style", "noscript", "nav", "header", "footer", "aside", "form", "svg", "button", "iframe"}
+    BLOCKS = {"p", "li", "h1", "h2", "h3", "h4", "blockquote", "td", "dd", "div", "section", "article", "br"}
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.title = ""
+        self._in_title = False
+        self._skip_depth = 0
+        self._main_depth = 0
+        self._current: List[str] = []
+        self.blocks: List[Tuple[bool, str]] = []  # (czy w <article>/<main>, tekst)
+
+    def handle_starttag(self, tag, attrs):
+        if tag in self.SKIP:
+            self._skip_depth += 1
+        elif tag in ("article", "main"):
+            self._main_depth += 1
+        if tag == "title":
+            self._in_title = True
+        if tag in self.BLOCKS:
+            self._flush()
+
+    def handle_endtag(self, tag):
+        if tag in self.BLOCKS or tag in ("article", "main"):
+            self._flush()
+        if tag in self.SKIP and self._skip_depth:
+            self._skip_depth -= 1
+        elif tag in ("article", "main") and self._main_depth:
+            self._main_depth -= 1
+        if tag == "title":
+            self._in_title = False
+
+    def handle_data(self, data):
+        if self._in_title:
+            self.title += data
+        elif not self._skip_depth:
+            self._current.append(data)
+
+    def _flush(self):
+        text = re.sub(r"\s+", " ", "".join(self._current)).strip()
+        self._current = []
+        if text:
+            self.blocks.append((self._main_depth > 0, text))
+
+
+def extract_main_text(html: str) -> Tuple[str, List[str]]:
+    """Tytuł strony i akapity głównej treści.
+
+    Jeśli strona ma <article> lub <main>, bierzemy tylko ich zawartość; krótkie
+    bloki (menu, przyciski, podpisy) są odrzucane.
+    """
+    parser = _MainTextParser()
+    try:
+        parser.feed(html)
+        parser.close()
+    except Exception:
+        pass  # uszkodzony HTML - bierzemy to, co udało się sparsować
+    blocks = parser.blocks
+    if any(in_main for in_main, _ in blocks):
+        blocks = [block for block in blocks if block[0]]
+    paragraphs = [text for _, text in blocks if len(text.split()) >= 8]
+    return parser.title.strip(), paragraphs
+
+
+def split_passages(paragraphs: List[str], words_per_passage: int = 90) -> List[str]:
+    """Łączy akapity w fragmenty po ok. `words_per_passage` słów"""
+    passages, current = [], []
+    for paragraph in paragraphs:
+        words = paragraph.split()
+        while words:
+            room = words_per_passage - len(current)
+            current.extend(words[:room])
+            words = words[room:]
+            if len(current) >= words_per_passage:
+                passages.append(" ".join(current))
+                current = []
+    if len(current) >= 15 or (current and not passages):
+        passages.append(" ".join(current))
+    return passages
+
+
+def _charset(content_type: str, body: bytes) -> str:
+    """Kodowanie z nagłówka, z <meta charset> albo domyślnie UTF-8"""
+    match = re.search(r"charset=[\"']?([\w-]+)", content_type, flags=re.I)
+    if not match:
+        match = re.search(rb"<meta[^>]+charset=[\"']?([\w-]+)", body[:4096], flags=re.I)
+    charset = match.group(1) if match else "utf-8"
+    charset = charset.decode("ascii") if isinstance(charset, bytes) else charset
+    try:
+        return codecs.lookup(charset).name
+    except LookupError:
+        return "utf-8"
+
+
+@dataclass
+class ResearchResult:
+    topic: str
+    sources: List[Source] = field(default_factory=list)
+    index: Optional[BM25Index] = None
+
+    @property
+    def passage_count(self) -> int:
+        return len(self.index.passages) if self.index else 0
+
+    def passages_for(self, query: str, k: int = 3) -> List[Passage]:
+        if self.index is None:
+            return []
+        return [passage for _, passage in self.index.search(query, k)]
+
+    def context_for(self, query: str, k: int = 3) -> str:
+        """Fragmenty źródeł do wstawienia w prompt, z adresami"""
+        passages = self.passages_for(query, k)
+        return "\n\n".join(f"[{i}] {passage.text}\n(źródło: {passage.url})" for i, passage in enumerate(passages, 1))
+
+
+class Researcher:
+    """Wyszukiwanie i pobieranie źródeł z cache HTTP i ograniczoną współbieżnością"""
+
+    def __init__(self, config: ResearchConfig, cache: Optional[CompletionCache] = None):
+        self.config = config
+        self.cache = cache if cache is not None else get_cache(HTTP_CACHE_PATH)
+        self.pool = get_pool("research", PoolConfig(pool_size=config.max_workers,
+                                                    connect_timeout=config.connect_timeout,
+                                                    read_timeout=config.read_timeout))
+
+    def _get(self, url: str, params: Optional[Dict] = None) -> Tuple[Optional[Dict], bool]:
+        """GET z cache na dysku; zwraca ({status, content_type, text}, czy_z_cache)"""
+        import requests
+
+        key = "http:" + requests.Request("GET", url, params=params).prepare().url
+        cached = self.cache.get(key)
+        if cached is not None:
+            return json.loads(cached), True
+        response = self.pool.get(url, params=params, headers={"User-Agent": USER_AGENT}, stream=True)
+        with response:
+            body = response.raw.read(self.config.max_page_bytes, decode_content=True)
+            encoding = _charset(response.headers.get("Content-Type", ""), body)
+            entry = {
+                "status": response.status_code,
+                "content_type": response.headers.get("Content-Type", ""),
+                "text": body.decode(encoding, errors="replace"),
+            }
+        if response.status_code == 200:
+            self.cache.put(key, json.dumps(entry, ensure_ascii=False))
+        return entry, False
+
+    def search(self, query: str) -> List[Source]:
+        import requests
+
+        params = {"q": query, "num": min(self.config.results_per_query, 10), "hl": "pl", "lr": "lang_pl"}
+        if self.config.api_key:
+            params["key"] = self.config.api_key
+        if self.config.cse_id:
+            params["cx"] = self.config.cse_id
+        try:
+            entry, _ = self._get(self.config.endpoint, params)
+        except requests.RequestException as e:
+            raise ResearchError(f"Wyszukiwanie nie powiodło się: {e}") from e
+        if entry["status"] != 200:
+            raise ResearchError(f"Wyszukiwanie nie powiodło się (HTTP {entry['status']})")
+        try:
+            items = json.loads(entry["text"]).get("items", [])
+        except ValueError as e:
+            raise ResearchError("Wyszukiwarka zwróciła niepoprawny JSON") from e
+        return [Source(item["link"], item.get("title", ""), item.get("snippet", "")) for item in items
+                if item.get("link")]
+
+    def _fetch(self, source: Source) -> List[Passage]:
+        import requests
+
+        try:
+            entry, source.cached = self._get(source.url)
+        except requests.RequestException as e:
+            source.status = f"błąd: {type(e).__name__}"
+            return []
+        if entry["status"] != 200:
+            source.status = f"HTTP {entry['status']}"
+            return []
+        if "html" not in entry["content_type"] and "text" not in entry["content_type"]:
+            source.status = "pominięto (nie HTML)"
+            return []
+        page_title, paragraphs = extract_main_text(entry["text"])
+        source.title = source.title or page_title
+        texts = split_passages(paragraphs, self.config.passage_words)
+        source.passages = len(texts)
+        return [Passage(text, source.url, source.title) for text in texts]
+
+    def run(self, topic: str, extra_queries: Tuple[str, ...] = ()) -> ResearchResult:
+        """Wyszukuje źródła dla tematu (i dodatkowych zapytań), pobiera je i buduje indeks"""
+        queries = [topic] + [query for query in extra_queries if query]
+        sources: Dict[str, Source] = {}
+        with ThreadPoolExecutor(max_workers=self.config.max_workers, thread_name_prefix="research") as executor:
+            for found in executor.map(self.search, queries):
+                for source in found:
+                    sources.setdefault(source.url, source)
+
+            passages: List[Passage] = []
+            futures = {executor.submit(self._fetch, source): source for source in sources.values()}
+            for future in as_completed(futures):
+                passages.extend(future.result())
+
+        # Fragmenty z wyników wyszukiwania też są materiałem - przydają się, gdy strona się nie pobrała
+        for source in sources.values():
+            if source.snippet and not source.passages:
+                passages.append(Passage(source.snippet, source.url, source.title))
+        passages.sort(key=lambda passage: passage.url)  # kolejność niezależna od czasu pobierania
+        return ResearchResult(topic, list(sources.values()), BM25Index(passages))
@@ -0,0 +1,180 @@
+"""Routing modeli: dostawca i model dla każdego kroku artykułu, koszt i czas tras.
+
+Polityka przypisuje trasom (konspekt, wstęp, zwykła sekcja, sekcja ze wzmianką
+o klinice, poprawki stylu i przejść) dostawcę i model. Trasy bez wpisu idą do
+modelu głównego writera. W trasach spekulacyjnych szybki model pisze szkic,
+a silny model (trasa `rewizja`) tylko go zatwierdza albo poprawia - zatwierdzenie
+to kilka tokenów wyjścia zamiast całej sekcji.
+
+Każde wywołanie zapisuje swoją trasę w `CallRecord.route`; `route_report` zestawia
+z nich liczbę wywołań, czasy, tokeny i koszt w USD dla każdej trasy.
+"""
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from prompts import DRAFT_APPROVED, should_mention_clinic
+from providers import FAST_MODELS, MODELS, PRICES
+from telemetry import CallRecord, percentile
+
+ROUTE_OUTLINE = "konspekt"
+ROUTE_INTRO = "wstęp"
+ROUTE_SECTION = "sekcja"
+ROUTE_CLINIC_SECTION = "sekcja-klinika"
+ROUTE_REWRITE = "poprawki"
+ROUTE_REVIEW = "rewizja"
+ROUTE_ARTICLE = "artykuł"  # silnik structured - cały artykuł jednym wywołaniem
+
+ROUTES = (ROUTE_OUTLINE, ROUTE_INTRO, ROUTE_SECTION, ROUTE_CLINIC_SECTION, ROUTE_REWRITE, ROUTE_REVIEW,
+          ROUTE_ARTICLE)
+# Trasy, które mogą być pisane szkicem i rewizją (odpowiedź to gotowy tekst)
+SPECULATIVE_ROUTES = (ROUTE_INTRO, ROUTE_SECTION, ROUTE_CLINIC_SECTION)
+
+# Gotowe polityki (nazwa → opis w interfejsie)
+ROUTING_PRESETS = {
+    "single": "Jeden model",
+    "economy": "Oszczędny",
+    "speculative": "Szkic i rewizja",
+}
+
+
+@dataclass(frozen=True)
+class Route:
+    provider: str
+    model: str = ""  # pusty - domyślny model dostawcy (MODELS)
+
+    @property
+    def resolved_model(self) -> str:
+        return self.model or MODELS[self.provider]
+
+
+@dataclass
+class RoutingPolicy:
+    routes: Dict[str, Route] = field(default_factory=dict)
+    speculative: Tuple[str, ...] = ()  # trasy pisane szkicem i sprawdzane trasą ROUTE_REVIEW
+
+    def route(self, kind: str) -> Optional[Route]:
+        return self.routes.get(kind)
+
+    def is_speculative(self, kind: str) -> bool:
+        return kind in self.speculative
+
+    def providers(self) -> Set[str]:
+        """Dostawcy użyci w trasach - każdy potrzebuje klucza API"""
+        return {route.provider for route in self.routes.values()}
+
+
+def section_route(section_index: int, section_count: int) -> str:
+    """Trasa sekcji: ze wzmianką o klinice (wybraną przez should_mention_clinic) albo zwykła"""
+    return ROUTE_CLINIC_SECTION if should_mention_clinic(section_index, section_count) else ROUTE_SECTION
+
+
+def preset_policy(name: str, provider: str) -> Optional[RoutingPolicy]:
+    """Gotowa polityka dla dostawcy `provider` (None dla "single" - wszystko modelem głównym).
+
+    "economy": konspekt, wstęp i zwykłe sekcje pisze szybki model, a sekcje ze wzmianką
+    o klinice i poprawki - model główny. "speculative": jak "economy", ale szkice wstępu
+    i zwykłych sekcji sprawdza i w razie potrzeby poprawia model główny.
+    """
+    if name == "single":
+        return None
+    if name not in ROUTING_PRESETS:
+        raise ValueError(f"Nieznana polityka routingu: {name}")
+    fast, strong = Route(provider, FAST_MODELS[provider]), Route(provider)
+    routes = {
+        ROUTE_OUTLINE: fast,
+        ROUTE_INTRO: fast,
+        ROUTE_SECTION: fast,
+        ROUTE_CLINIC_SECTION: strong,
+        ROUTE_REWRITE: strong,
+        ROUTE_REVIEW: strong,
+    }
+    speculative = (ROUTE_INTRO, ROUTE_SECTION) if name == "speculative" else ()
+    return RoutingPolicy(routes, speculative)
+
+
+def parse_route(spec: str) -> Tuple[str, Route]:
+    """`trasa=dostawca[:model]` (np. `sekcja=openai:gpt-4o-mini`) → (trasa, Route)"""
+    kind, _, target = spec.partition("=")
+    provider, _, model = target.partition(":")
+    kind, provider, model = kind.strip(), provider.strip(), model.strip()
+    if kind not in ROUTES:
+        raise ValueError(f"Nieznana trasa {kind!r} - dostępne: {', '.join(ROUTES)}")
+    if provider not in MODELS:
+        raise ValueError(f"Nieznany dostawca {provider!r} w trasie {kind!r}")
+    return kind, Route(provider, model)
+
+
+def build_policy(preset: str, provider: str, routes: Iterable[str] = (),
+                 speculative: Iterable[str] = ()) -> Optional[RoutingPolicy]:
+    """Polityka z gotowej nazwy i nadpisań z linii poleceń (`--route`, `--speculative`)"""
+    policy = preset_policy(preset, provider)
+    routes, speculative = list(routes), list(speculative)
+    if not routes and not speculative:
+        return policy
+    policy = policy or RoutingPolicy()
+    for spec in routes:
+        kind, route = parse_route(spec)
+        policy.routes[kind] = route
+    for kind in speculative:
+        if kind not in SPECULATIVE_ROUTES:
+            raise ValueError(f"Trasa {kind!r} nie może być spekulacyjna - dostępne: {', '.join(SPECULATIVE_ROUTES)}")
+        if kind not in policy.speculative:
+            policy.speculative += (kind,)
+    return policy
+
+
+def review_approved(response: str) -> bool:
+    """Czy odpowiedź rewizji zatwierdza szkic (a nie jest poprawioną treścią)"""
+    answer = response.strip().strip(".!*\"'").strip()
+    return answer.upper().startswith(DRAFT_APPROVED) and len(answer) <= len(DRAFT_APPROVED) + 20
+
+
+def served_by(record: CallRecord) -> Tuple[str, str]:
+    """Dostawca i model, które faktycznie odpowiedziały (przy hedgingu - zapasowy dostawca)"""
+    provider = record.answered_by or record.provider
+    if provider == record.provider:
+        return provider, record.model
+    return provider, MODELS.get(provider, record.model)
+
+
+def call_cost(record: CallRecord) -> float:
+    """Koszt wywołania w USD według `PRICES` (0 dla trafień w lokalny cache i nieznanych modeli)"""
+    prices = PRICES.get(served_by(record)[1])
+    if prices is None or record.cached:
+        return 0.0
+    input_price, output_price, cache_read_price, cache_write_price = prices
+    uncached = max(0, record.input_tokens - record.cache_read_tokens - record.cache_write_tokens)
+    return (uncached * input_price + record.output_tokens * output_price
+            + record.cache_read_tokens * cache_read_price + record.cache_write_tokens * cache_write_price) / 1e6
+
+
+def trace_cost(records: Iterable[CallRecord]) -> float:
+    return sum(call_cost(record) for record in records)
+
+
+def route_report(records: Iterable[CallRecord]) -> List[Dict]:
+    """Wiersze do tabeli (UI, benchmark): wywołania, czasy, tokeny i koszt każdej trasy i modelu"""
+    groups: Dict[Tuple[str, str, str], List[CallRecord]] = {}
+    for record in records:
+        groups.setdefault((record.route or "-", *served_by(record)), []).append(record)
+
+    rows = []
+    for (route, provider, model), group in sorted(groups.items()):
+        latencies = [r.latency for r in group if r.status == "ok" and not r.cached]
+        reviews = [r.accepted for r in group if r.accepted is not None]
+        rows.append({
+            "Trasa": route,
+            "Dostawca": provider,
+            "Model": model,
+            "Wywołania": len(group),
+            "Z cache": sum(1 for r in group if r.cached),
+            "Błędy": sum(1 for r in group if r.status != "ok"),
+            "Czas p50 (s)": round(percentile(latencies, 0.50), 2) if latencies else None,
+            "Czas p95 (s)": round(percentile(latencies, 0.95), 2) if latencies else None,
+            "Czas łącznie (s)": round(sum(latencies), 2),
+            "Tokeny wej.": sum(r.input_tokens for r in group),
+            "Tokeny wyj.": sum(r.output_tokens for r in group),
+            "Koszt (USD)": round(trace_cost(group), 5),
+            "Szkice zatwierdzone": f"{sum(reviews)}/{len(reviews)}" if reviews else "",
+        })
+    return rows
@@ -0,0 +1,85 @@
+"""Parsowanie strumieni Server-Sent Events z API dostawców"""
+import json
+from typing import Dict, Iterable, Iterator, Optional, Tuple
+
+from errors import OverloadedError, ProviderError, RateLimitError
+
+
+def iter_sse(lines: Iterable[str]) -> Iterator[Tuple[Optional[str], str]]:
+    """Zwraca pary (event, data) z linii strumienia SSE"""
+    event = None
+    data_lines = []
+    for line in lines:
+        if line is None:
+            continue
+        line = line.rstrip("\r")
+        if not line:
+            if data_lines:
+                yield event, "\n".join(data_lines)
+            event = None
+            data_lines = []
+        elif line.startswith(":"):
+            continue
+        elif line.startswith("event:"):
+            event = line[6:].strip()
+        elif line.startswith("data:"):
+            data_lines.append(line[5:].lstrip())
+    if data_lines:
+        yield event, "\n".join(data_lines)
+
+
+def stream_error(error: Dict, provider: str) -> ProviderError:
+    """Typowany błąd dla zdarzenia błędu przesłanego w strumieniu"""
+    kind = str(error.get("type") or error.get("code") or "")
+    message = error.get("message") or kind or "błąd strumienia"
+    if "rate_limit" in kind:
+        return RateLimitError(message, provider)
+    if "overloaded" in kind:
+        return OverloadedError(message, provider)
+    return ProviderError(message, provider)
+
+
+def claude_text_deltas(lines: Iterable[str], usage: Optional[Dict] = None) -> Iterator[str]:
+    """Fragmenty tekstu ze strumienia Anthropic Messages API.
+
+    Dla wymuszonego narzędzia (tool use) zwraca kolejne fragmenty JSON-a jego
+    argumentów. Jeśli podano `usage`, uzupełnia go polami `usage` z message_start
+    i message_delta.
+    """
+    for event, data in iter_sse(lines):
+        payload = json.loads(data)
+        kind = payload.get("type", event)
+        if usage is not None:
+            if kind == "message_start":
+                usage.update(payload.get("message", {}).get("usage") or {})
+            elif kind == "message_delta":
+                usage.update(payload.get("usage") or {})
+        if kind == "content_block_delta":
+            delta = payload.get("delta", {})
+            if delta.get("type") == "text_delta" and delta.get("text"):
+                yield delta["text"]
+            elif delta.get("type") == "input_json_delta" and delta.get("partial_json"):
+                yield delta["partial_json"]
+        elif kind == "error":
+            raise stream_error(payload.get("error", {}), "claude")
+        elif kind == "message_stop":
+            return
+
+
+def openai_text_deltas(lines: Iterable[str], usage: Optional[Dict] = None) -> Iterator[str]:
+    """Fragmenty tekstu ze strumienia API zgodnego z OpenAI (OpenAI, DeepSeek).
+
+    `usage` wypełniany jest z ostatniego fragmentu (wymaga stream_options.include_usage).
+    """
+    for _, data in iter_sse(lines):
+        if data == "[DONE]":
+            return
+        payload: Dict = json.loads(data)
+        if "error" in payload:
+            raise stream_error(payload["error"], "")
+        if usage is not None and payload.get("usage"):
+            usage.update(payload["usage"])
+        for choice in payload.get("choices", []):
+            content = choice.get("delta", {}).get("content")
+            if content:
+                yield content
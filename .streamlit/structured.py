@@ -0,0 +1,187 @@
+"""Artykuł w jednym wywołaniu - odpowiedź jako JSON zgodny ze schematem.
+
+Zamiast 1 + 1 + N wywołań (konspekt, wstęp, sekcje) model zwraca tytuł, wstęp
+i wszystkie sekcje naraz: przez tool use w Claude, `response_format` ze
+schematem w OpenAI i tryb JSON w DeepSeek. `ArticleStream` czyta JSON
+przyrostowo, więc gotowe sekcje są dostępne, zanim skończy się odpowiedź.
+Wynik sprawdzany jest lokalnie - schemat nie gwarantuje długości ani liczby sekcji.
+"""
+import json
+import re
+from dataclasses import dataclass
+from typing import List, Optional, Tuple
+
+from budget import ARTICLE_WORD_LIMIT, INTRO_WORDS, count_words
+
+ARTICLE_TOOL = "zapisz_artykul"
+
+ARTICLE_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "title": {"type": "string", "description": "Chwytliwy tytuł artykułu"},
+        "intro": {"type": "string", "description": "Wstęp z hookiem, 2-3 zdania"},
+        "sections": {
+            "type": "array",
+            "description": "Sekcje artykułu w kolejności konspektu",
+            "items": {
+                "type": "object",
+                "properties": {
+                    "heading": {"type": "string", "description": "Śródtytuł sekcji"},
+                    "text": {"type": "string", "description": "Treść sekcji w Markdown, bez śródtytułu"},
+                },
+                "required": ["heading", "text"],
+                "additionalProperties": False,
+            },
+        },
+    },
+    "required": ["title", "intro", "sections"],
+    "additionalProperties": False,
+}
+
+MIN_SECTIONS = 4
+MAX_SECTIONS = 5
+# Klucze, cudzysłowy i znaki nowej linii zapisane jako \n - ponad tokeny samej treści
+JSON_OVERHEAD_TOKENS = 100
+
+
+class StructuredOutputError(RuntimeError):
+    """Odpowiedź nie jest poprawnym JSON-em artykułu"""
+
+
+@dataclass
+class ArticlePart:
+    """Gotowy fragment odczytany ze strumienia: tytuł, wstęp albo sekcja"""
+    kind: str  # "title", "intro", "section"
+    text: str
+    heading: str = ""
+    index: int = -1
+
+
+@dataclass
+class StructuredArticle:
+    title: str
+    intro: str
+    sections: List[Tuple[str, str]]  # (śródtytuł, treść)
+
+    @property
+    def outline(self) -> List[str]:
+        return [heading for heading, _ in self.sections]
+
+    def render(self) -> str:
+        article = f"# {self.title}\n\n{self.intro}\n\n"
+        for heading, text in self.sections:
+            article += f"## {heading}\n\n{text}\n\n"
+        return article
+
+
+class ArticleStream:
+    """Przyrostowy odczyt JSON artykułu.
+
+    `feed` przyjmuje kolejne fragmenty odpowiedzi i zwraca części, które właśnie
+    się domknęły: tytuł i wstęp (napisy na najwyższym poziomie) oraz każdy
+    element tablicy `sections`. Wystarcza prosty automat - śledzi tylko
+    głębokość zagnieżdżenia i napisy, resztę składni sprawdza `json.loads`.
+    """
+
+    def __init__(self):
+        self.buffer = ""
+        self._pos = 0
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._string_start = 0
+        self._expect_key = False
+        self._key: Optional[str] = None
+        self._item_start = 0
+        self._sections = 0
+
+    def feed(self, chunk: str) -> List[ArticlePart]:
+        self.buffer += chunk
+        buffer, parts = self.buffer, []
+        for i in range(self._pos, len(buffer)):
+            char = buffer[i]
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif char == "\\":
+                    self._escape = True
+                elif char == '"':
+                    self._in_string = False
+                    if self._depth == 1:
+                        value = json.loads(buffer[self._string_start:i + 1])
+                        if self._expect_key:
+                            self._key = value
+                        elif self._key in ("title", "intro"):
+                            parts.append(ArticlePart(self._key, value))
+                continue
+            if char == '"':
+                self._in_string, self._string_start = True, i
+            elif char in "{[":
+                self._depth += 1
+                if self._depth == 1:
+                    self._expect_key = True
+                elif self._depth == 3 and self._key == "sections":
+                    self._item_start = i
+            elif char in "}]":
+                if self._depth == 3 and self._key == "sections":
+                    part = self._section(buffer[self._item_start:i + 1])
+                    if part is not None:
+                        parts.append(part)
+                self._depth -= 1
+            elif self._depth == 1 and char == ":":
+                self._expect_key = False
+            elif self._depth == 1 and char == ",":
+                self._expect_key = True
+        self._pos = len(buffer)
+        return parts
+
+    def _section(self, data: str) -> Optional[ArticlePart]:
+        try:
+            item = json.loads(data)
+        except ValueError:
+            return None  # uszkodzony element - zgłosi go parse_article
+        if not isinstance(item, dict):
+            return None
+        part = ArticlePart("section", str(item.get("text", "")), str(item.get("heading", "")), self._sections)
+        self._sections += 1
+        return part
+
+
+def parse_article(text: str) -> StructuredArticle:
+    """Cała odpowiedź jako artykuł; zgłasza StructuredOutputError dla złego JSON-a"""
+    text = re.sub(r"^\s*```(?:json)?\s*|\s*```\s*$", "", text)
+    try:
+        data = json.loads(text)
+    except ValueError as e:
+        raise StructuredOutputError(f"niepoprawny JSON ({e})") from e
+    if not isinstance(data, dict) or not isinstance(data.get("sections"), list):
+        raise StructuredOutputError("brak tablicy sections")
+    sections = []
+    for item in data["sections"]:
+        if not isinstance(item, dict):
+            raise StructuredOutputError("element sections nie jest obiektem")
+        heading = re.sub(r"^#+\s*", "", str(item.get("heading", "")).strip())
+        sections.append((heading, str(item.get("text", "")).strip()))
+    return StructuredArticle(str(data.get("title", "")).strip(), str(data.get("intro", "")).strip(), sections)
+
+
+def validate_article(article: StructuredArticle, word_limit: int = ARTICLE_WORD_LIMIT) -> List[str]:
+    """Problemy, których nie wyłapie schemat: liczba sekcji, śródtytuły, puste pola, długość"""
+    problems = []
+    if not article.title:
+        problems.append("brak tytułu")
+    if not article.intro:
+        problems.append("pusty wstęp")
+    elif count_words(article.intro) > 2 * INTRO_WORDS:
+        problems.append(f"za długi wstęp ({count_words(article.intro)} słów)")
+    if not MIN_SECTIONS <= len(article.sections) <= MAX_SECTIONS:
+        problems.append(f"{len(article.sections)} sekcji zamiast {MIN_SECTIONS}-{MAX_SECTIONS}")
+    for i, (heading, text) in enumerate(article.sections, 1):
+        if not heading:
+            problems.append(f"sekcja {i}: brak śródtytułu")
+        if not text:
+            problems.append(f"sekcja {i}: pusta treść")
+    words = count_words(article.render())
+    if words > word_limit:
+        problems.append(f"{words} słów - przekroczony limit {word_limit}")
+    return problems
@@ -0,0 +1,265 @@
+"""Lokalna kontrola stylu i wymagań sponsorskich - bez wywołań API.
+
+Zakazane słowa ("kluczowy", "innowacyjny", "nowoczesny") i zwroty do
+czytelnika są wyszukiwane we wszystkich formach odmiany jednym przebiegiem
+automatu Aho-Corasick po tekście. Dodatkowo sprawdzana jest liczba i miejsce
+wzmianek o klinice. Wynikiem są konkretne zdania do poprawy - do modelu trafiają
+tylko one, a nie cała sekcja.
+"""
+import re
+from collections import deque
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# Zakazane przymiotniki: temat -> (temat przed -i w M. lm. rodz. męskoosobowego, przysłówek)
+BANNED_ADJECTIVES = {
+    "kluczow": ("kluczow", "kluczowo"),
+    "innowacyjn": ("innowacyjn", "innowacyjnie"),
+    "nowoczesn": ("nowocześn", "nowocześnie"),
+}
+ADJECTIVE_ENDINGS = ("y", "a", "e", "ego", "ej", "emu", "ą", "ym", "ych", "ymi")
+
+# Zwracanie się do czytelnika: zaimki 2. osoby i najczęstsze formy czasowników
+DIRECT_ADDRESS = (
+    "ty", "ciebie", "cię", "tobie", "tobą",
+    "twój", "twoja", "twoje", "twojego", "twojej", "twojemu", "twoją", "twoim", "twoich", "twoimi",
+    "twe", "twego", "twej", "twym", "twych",
+    "wy", "was", "wam", "wami", "wasz", "wasza", "wasze", "waszego", "waszej", "waszemu", "waszą",
+    "waszym", "waszych", "waszymi",
+    "możesz", "musisz", "powinieneś", "powinnaś", "chcesz", "wiesz", "zauważysz", "poczujesz",
+    "zadbaj", "sprawdź", "pamiętaj", "wybierz", "spróbuj", "zobacz", "zapytaj",
+)
+# "ci" bywa zaimkiem wskazującym ("ci pacjenci", "ci, którzy") - sprawdzany osobno
+AMBIGUOUS_CI = "ci"
+# Końcówki M. lm. rzeczowników i przymiotników męskoosobowych, które stoją po wskazującym "ci"
+# ("ci pacjenci", "ci starsi", "ci dermatolodzy", "ci lekarze", "ci panowie", "ci nauczyciele", "ci ludzie")
+MASCULINE_PERSONAL_ENDINGS = ("i", "y", "owie", "rze", "acze", "ele", "dzie")
+# Słowa z tymi końcówkami, przed którymi "ci" to celownik - zwrot do czytelnika ("to ci wystarczy")
+DATIVE_CI_FOLLOWERS = {
+    "wystarczy", "zależy", "służy", "przysłuży", "grozi", "szkodzi", "zaszkodzi", "ułatwi", "umożliwi",
+    "pozwoli", "zapewni", "poprawi", "sprawi", "przypomni", "dobrze", "wiele",
+}
+
+GENERIC_NAME_WORDS = {"klinika", "centrum", "medyczne", "szpital", "gabinet"}
+
+
+def banned_forms() -> Dict[str, str]:
+    """Wszystkie formy odmiany zakazanych słów -> forma podstawowa"""
+    forms = {}
+    for stem, (plural_stem, adverb) in BANNED_ADJECTIVES.items():
+        base = stem + "y"
+        for ending in ADJECTIVE_ENDINGS:
+            forms[stem + ending] = base
+        forms[plural_stem + "i"] = base
+        forms[adverb] = base
+        # stopień wyższy i najwyższy: nowocześniejszy, najbardziej kluczowy (przymiotnik łapie się i tak)
+        comparative = plural_stem + "iejsz"
+        for ending in ADJECTIVE_ENDINGS + ("i",):
+            forms[comparative + ending] = base
+            forms["naj" + comparative + ending] = base
+    return forms
+
+
+class AhoCorasick:
+    """Automat Aho-Corasick dopasowujący wiele wzorców w jednym przebiegu po tekście"""
+
+    def __init__(self, patterns: Iterable[str]):
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._output: List[List[str]] = [[]]
+        for pattern in patterns:
+            self._add(pattern)
+        self._build()
+
+    def _add(self, pattern: str):
+        state = 0
+        for char in pattern:
+            next_state = self._goto[state].get(char)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto[state][char] = next_state
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append([])
+            state = next_state
+        self._output[state].append(pattern)
+
+    def _build(self):
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fail = self._fail[state]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                candidate = self._goto[fail].get(char, 0)
+                self._fail[next_state] = candidate if candidate != next_state else 0
+                self._output[next_state] = self._output[next_state] + self._output[self._fail[next_state]]
+
+    def find(self, text: str) -> Iterable[Tuple[int, str]]:
+        """(pozycja początku, wzorzec) dla każdego wystąpienia"""
+        state = 0
+        for i, char in enumerate(text):
+            while state and char not in self._goto[state]:
+                state = self._fail[state]
+            state = self._goto[state].get(char, 0)
+            for pattern in self._output[state]:
+                yield i - len(pattern) + 1, pattern
+
+
+@dataclass
+class Sentence:
+    text: str
+    start: int
+    end: int
+    section: int  # -1 dla wstępu
+
+
+@dataclass
+class StyleIssue:
+    kind: str          # "zakazane słowo", "zwrot do czytelnika", "wzmianka o klinice"
+    message: str
+    sentence: Optional[Sentence] = None
+    instruction: str = ""  # polecenie dla modelu przy przepisywaniu zdania
+
+
+_SENTENCE_END = re.compile(r"(?<=[.!?…])\s+(?=[„\"(A-ZĄĆĘŁŃÓŚŹŻ0-9-])")
+
+
+def split_sentences(article: str) -> List[Sentence]:
+    """Zdania wstępu i sekcji artykułu w Markdown (nagłówki są pomijane)"""
+    sentences = []
+    section = -1
+    offset = 0
+    for line in article.splitlines(keepends=True):
+        stripped = line.strip()
+        if stripped.startswith("## "):
+            section += 1
+        elif stripped and not stripped.startswith("#"):
+            body_start = offset + line.index(stripped[0])
+            position = 0
+            for part in _SENTENCE_END.split(stripped):
+                index = stripped.index(part, position)
+                position = index + len(part)
+                sentences.append(Sentence(part, body_start + index, body_start + position, section))
+        offset += len(line)
+    return sentences
+
+
+def _is_word(text: str, start: int, end: int) -> bool:
+    before = text[start - 1] if start > 0 else " "
+    after = text[end] if end < len(text) else " "
+    return not before.isalnum() and not after.isalnum()
+
+
+def _clinic_tokens(clinic_name: str) -> List[str]:
+    """Charakterystyczne słowa nazwy kliniki ("Ambroziak", "Gunarys") - wystarczą do wykrycia odmian"""
+    words = [word.lower() for word in re.findall(r"\w+", clinic_name)]
+    return [word for word in words if word not in GENERIC_NAME_WORDS] or words
+
+
+def _is_demonstrative_ci(following: str) -> bool:
+    """Czy "ci" przed tekstem `following` to zaimek wskazujący (a nie "ci" = "tobie")"""
+    match = re.match(r"[\s,]*(\w+)", following)
+    if match is None:
+        return False
+    word = match.group(1)
+    if word == "którzy":
+        return True
+    return len(word) > 2 and word.endswith(MASCULINE_PERSONAL_ENDINGS) and word not in DATIVE_CI_FOLLOWERS
+
+class StyleChecker:
+    """Sprawdza artykuł pod kątem zakazanych słów, zwrotów do czytelnika i wzmianek o klinice"""
+
+    def __init__(self):
+        self.forms = banned_forms()
+        self._automaton = AhoCorasick(list(self.forms) + list(DIRECT_ADDRESS) + [AMBIGUOUS_CI])
+        self._clinic_automata: Dict[str, AhoCorasick] = {}
+
+    def _word_hits(self, sentence: str) -> List[Tuple[str, str]]:
+        """(rodzaj, znalezione słowo) dla całych słów w zdaniu"""
+        lowered = sentence.lower()
+        hits = []
+        for start, pattern in self._automaton.find(lowered):
+            end = start + len(pattern)
+            if not _is_word(lowered, start, end):
+                continue
+            if pattern == AMBIGUOUS_CI and (start == 0 or _is_demonstrative_ci(lowered[end:])):
+                continue  # zaimek wskazujący: "Ci pacjenci...", "ci, którzy...", "że ci pacjenci wrócą"
+            kind = "zakazane słowo" if pattern in self.forms else "zwrot do czytelnika"
+            hits.append((kind, sentence[start:end]))
+        return hits
+
+    def clinic_mentions(self, sentence: str, clinic_name: str) -> int:
+        automaton = self._clinic_automata.get(clinic_name)
+        if automaton is None:
+            automaton = self._clinic_automata[clinic_name] = AhoCorasick(_clinic_tokens(clinic_name))
+        lowered = sentence.lower()
+        # Tylko lewa granica słowa - końcówka może być odmieniona ("Ambroziaka", "Gunarysie")
+        return sum(1 for start, _ in automaton.find(lowered) if start == 0 or not lowered[start - 1].isalnum())
+
+    def check(self, article: str, clinic_name: str = "",
+              expected_sections: Optional[List[int]] = None) -> List[StyleIssue]:
+        """Lista problemów; `expected_sections` to indeksy sekcji, które mają wspominać klinikę"""
+        issues = []
+        sentences = split_sentences(article)
+        for sentence in sentences:
+            hits = self._word_hits(sentence.text)
+            if hits:
+                words = ", ".join(sorted({word for _, word in hits}))
+                kinds = {kind for kind, _ in hits}
+                instruction = []
+                if "zakazane słowo" in kinds:
+                    instruction.append(f'usuń słowa: {words} (użyj prostszych określeń)')
+                if "zwrot do czytelnika" in kinds:
+                    instruction.append("pisz bezosobowo, bez zwracania się do czytelnika")
+                issues.append(StyleIssue(" / ".join(sorted(kinds)), f"{words}: {sentence.text[:80]}",
+                                         sentence, "; ".join(instruction)))
+
+        if clinic_name and expected_sections is not None:
+            issues.extend(self._check_clinic(sentences, clinic_name, set(expected_sections)))
+        return issues
+
+    def _check_clinic(self, sentences: List[Sentence], clinic_name: str, expected: set) -> List[StyleIssue]:
+        issues = []
+        by_section: Dict[int, List[Sentence]] = {}
+        for sentence in sentences:
+            by_section.setdefault(sentence.section, []).append(sentence)
+
+        for section, section_sentences in sorted(by_section.items()):
+            mentioning = [s for s in section_sentences if self.clinic_mentions(s.text, clinic_name)]
+            label = "wstęp" if section < 0 else f"sekcja {section + 1}"
+            if section in expected and not mentioning and section_sentences:
+                # Wzmiankę dopisujemy do ostatniego zdania sekcji
+                target = section_sentences[-1]
+                issues.append(StyleIssue("wzmianka o klinice", f"{label}: brak wzmianki o klinice", target,
+                                         f"wpleć w zdanie subtelną, naturalną wzmiankę o placówce {clinic_name}"))
+            elif section not in expected:
+                for sentence in mentioning:
+                    issues.append(StyleIssue("wzmianka o klinice", f"{label}: wzmianka poza zaplanowanym miejscem",
+                                             sentence, f"usuń ze zdania nazwę {clinic_name}, zachowaj jego sens"))
+            elif len(mentioning) > 1:
+                for sentence in mentioning[1:]:
+                    issues.append(StyleIssue("wzmianka o klinice", f"{label}: kolejna wzmianka w tej samej sekcji",
+                                             sentence, f"usuń ze zdania nazwę {clinic_name}, zachowaj jego sens"))
+        return issues
+
+
+def apply_rewrites(article: str, rewrites: List[Tuple[Sentence, str]]) -> str:
+    """Podmienia zdania w tekście (od końca, żeby przesunięcia się nie rozjechały)"""
+    for sentence, replacement in sorted(rewrites, key=lambda item: item[0].start, reverse=True):
+        if article[sentence.start:sentence.end] == sentence.text and replacement.strip():
+            article = article[:sentence.start] + replacement.strip() + article[sentence.end:]
+    return article
+
+
+_checker: Optional[StyleChecker] = None
+
+
+def get_checker() -> StyleChecker:
+    """Współdzielony checker - automat budowany raz na proces"""
+    global _checker
+    if _checker is None:
+        _checker = StyleChecker()
+    return _checker
@@ -0,0 +1,184 @@
+"""Pomiar czasu i tokenów dla każdego wywołania API.
+
+Każde wywołanie `call_api`/`stream_api` tworzy `CallRecord` w bieżącym
+`Trace`. Niższe warstwy (limiter, pula połączeń, parsowanie usage) dopisują
+do niego swoje pomiary przez `note()`, bez przekazywania rekordu w argumentach.
+Ślad można wyeksportować jako JSONL albo jako spany w stylu OpenTelemetry.
+"""
+import contextvars
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, field
+from typing import Dict, Iterator, List, Optional, Tuple
+
+# Pola sumowane przy kolejnych notatkach (np. ponowienia, hedging)
+_ADDITIVE = {"queue_wait", "connect", "input_tokens", "output_tokens", "cache_read_tokens", "cache_write_tokens"}
+
+
+@dataclass
+class CallRecord:
+    step: str
+    provider: str
+    model: str
+    start: float
+    queue_wait: float = 0.0
+    connect: float = 0.0
+    ttft: Optional[float] = None
+    latency: float = 0.0
+    input_tokens: int = 0
+    output_tokens: int = 0
+    cache_read_tokens: int = 0
+    cache_write_tokens: int = 0
+    cached: bool = False
+    answered_by: str = ""
+    route: str = ""  # trasa z polityki routingu (routing.py), np. "sekcja" albo "rewizja"
+    accepted: Optional[bool] = None  # rewizja szkicu: czy silny model zatwierdził szkic bez zmian
+    status: str = "ok"
+    error: str = ""
+    span_id: str = field(default_factory=lambda: os.urandom(8).hex())
+
+
+def percentile(values: List[float], q: float) -> Optional[float]:
+    """Percentyl metodą najbliższej rangi (None dla pustej listy)"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, round(q * len(ordered) + 0.5) - 1))]
+
+
+_current: contextvars.ContextVar[Optional[CallRecord]] = contextvars.ContextVar("telemetry_record", default=None)
+
+
+def note(**fields):
+    """Dopisuje pomiary do rekordu bieżącego wywołania (jeśli jakiś trwa)"""
+    record = _current.get()
+    if record is None:
+        return
+    for name, value in fields.items():
+        if value is None:
+            continue
+        if name in _ADDITIVE:
+            setattr(record, name, getattr(record, name) + value)
+        elif name == "ttft":
+            if record.ttft is None:
+                record.ttft = value
+        else:
+            setattr(record, name, value)
+
+
+class Trace:
+    """Rekordy wywołań jednego artykułu (bezpieczne dla wątków)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self, keep_steps: Tuple[str, ...] = ()):
+        """Nowy ślad; rekordy kroków z `keep_steps` (np. konspekt) są przenoszone"""
+        with self._lock:
+            kept = [r for r in getattr(self, "records", []) if r.step in keep_steps]
+            self.trace_id = os.urandom(16).hex()
+            self.root_span_id = os.urandom(8).hex()
+            self.started = min([r.start for r in kept], default=time.time())
+            self.records: List[CallRecord] = kept
+
+    def fork(self, keep_steps: Tuple[str, ...]) -> "Trace":
+        """Nowy ślad z kopią rekordów kroków `keep_steps` (np. konspektu przed generowaniem w tle)"""
+        trace = Trace()
+        trace.records = [record for record in self.snapshot() if record.step in keep_steps]
+        trace.reset(keep_steps)
+        return trace
+
+    @contextmanager
+    def span(self, step: str, provider: str, model: str, route: str = "") -> Iterator[CallRecord]:
+        record = CallRecord(step=step, provider=provider, model=model, start=time.time(), route=route)
+        token = _current.set(record)
+        start = time.perf_counter()
+        try:
+            yield record
+        except Exception as e:
+            record.status = "error"
+            record.error = str(e)
+            raise
+        finally:
+            record.latency = time.perf_counter() - start
+            try:
+                _current.reset(token)
+            except ValueError:
+                pass  # generator zamknięty w innym kontekście
+            with self._lock:
+                self.records.append(record)
+
+    def snapshot(self) -> List[CallRecord]:
+        with self._lock:
+            return list(self.records)
+
+    def last(self, step: str) -> Optional[CallRecord]:
+        """Ostatni zakończony rekord kroku `step` (np. do odczytu tokenów jednej sekcji)"""
+        with self._lock:
+            return next((record for record in reversed(self.records) if record.step == step), None)
+
+    def summary(self) -> List[Dict]:
+        """Wiersze do tabeli w UI, w kolejności startu wywołań"""
+        rows = []
+        for record in sorted(self.snapshot(), key=lambda r: r.start):
+            rows.append({
+                "Krok": record.step,
+                "Dostawca": record.answered_by or record.provider,
+                "Model": record.model,
+                "Kolejka (s)": round(record.queue_wait, 2),
+                "Połączenie (s)": round(record.connect, 3),
+                "TTFT (s)": round(record.ttft, 2) if record.ttft is not None else None,
+                "Całość (s)": round(record.latency, 2),
+                "Tokeny wej.": record.input_tokens,
+                "Tokeny wyj.": record.output_tokens,
+                "Cache": "lokalny" if record.cached else ("prompt" if record.cache_read_tokens else ""),
+                "Status": record.status,
+            })
+        return rows
+
+    def to_jsonl(self, **extra) -> str:
+        lines = [json.dumps({"trace_id": self.trace_id, **extra, **asdict(record)}, ensure_ascii=False)
+                 for record in self.snapshot()]
+        return "\n".join(lines) + ("\n" if lines else "")
+
+    def to_spans(self, name: str = "article") -> List[Dict]:
+        """Spany w formacie zbliżonym do OTLP/JSON (atrybuty wg konwencji gen_ai)"""
+        records = self.snapshot()
+        end = max([r.start + r.latency for r in records], default=self.started)
+        spans = [{
+            "traceId": self.trace_id,
+            "spanId": self.root_span_id,
+            "name": name,
+            "startTimeUnixNano": int(self.started * 1e9),
+            "endTimeUnixNano": int(end * 1e9),
+            "attributes": {"article.calls": len(records)},
+            "status": {"code": "ERROR" if any(r.status != "ok" for r in records) else "OK"},
+        }]
+        for record in records:
+            spans.append({
+                "traceId": self.trace_id,
+                "spanId": record.span_id,
+                "parentSpanId": self.root_span_id,
+                "name": record.step,
+                "startTimeUnixNano": int(record.start * 1e9),
+                "endTimeUnixNano": int((record.start + record.latency) * 1e9),
+                "attributes": {
+                    "gen_ai.system": record.answered_by or record.provider,
+                    "gen_ai.request.model": record.model,
+                    "route": record.route,
+                    "gen_ai.usage.input_tokens": record.input_tokens,
+                    "gen_ai.usage.output_tokens": record.output_tokens,
+                    "gen_ai.usage.cache_read_tokens": record.cache_read_tokens,
+                    "gen_ai.usage.cache_write_tokens": record.cache_write_tokens,
+                    "queue_wait_ms": round(record.queue_wait * 1000, 1),
+                    "connect_ms": round(record.connect * 1000, 1),
+                    "ttft_ms": round(record.ttft * 1000, 1) if record.ttft is not None else None,
+                    "cache.local_hit": record.cached,
+                },
+                "status": {"code": "OK" if record.status == "ok" else "ERROR", "message": record.error},
+            })
+        return spans
@@ -0,0 +1,55 @@
+"""Zliczanie tokenów z pól `usage` odpowiedzi dostawców"""
+import threading
+from typing import Dict, Optional
+
+USAGE_FIELDS = ("input_tokens", "output_tokens", "cache_read_tokens", "cache_write_tokens")
+
+
+def normalize_usage(provider: str, usage: Optional[Dict]) -> Dict[str, int]:
+    """Sprowadza `usage` z Anthropic / OpenAI / DeepSeek do wspólnych pól.
+
+    `input_tokens` obejmuje wszystkie tokeny wejścia, także odczytane z cache.
+    """
+    usage = usage or {}
+    if provider == "claude":
+        cache_read = usage.get("cache_read_input_tokens") or 0
+        cache_write = usage.get("cache_creation_input_tokens") or 0
+        return {
+            "input_tokens": (usage.get("input_tokens") or 0) + cache_read + cache_write,
+            "output_tokens": usage.get("output_tokens") or 0,
+            "cache_read_tokens": cache_read,
+            "cache_write_tokens": cache_write,
+        }
+
+    details = usage.get("prompt_tokens_details") or {}
+    # OpenAI: prompt_tokens_details.cached_tokens, DeepSeek: prompt_cache_hit_tokens
+    cache_read = details.get("cached_tokens") or usage.get("prompt_cache_hit_tokens") or 0
+    return {
+        "input_tokens": usage.get("prompt_tokens") or 0,
+        "output_tokens": usage.get("completion_tokens") or 0,
+        "cache_read_tokens": cache_read,
+        "cache_write_tokens": 0,
+    }
+
+
+class UsageTotals:
+    """Sumy tokenów (bezpieczne dla wątków) - np. dla jednego artykułu"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.calls = 0
+            self.totals = {field: 0 for field in USAGE_FIELDS}
+
+    def add(self, usage: Dict[str, int]):
+        with self._lock:
+            self.calls += 1
+            for field in USAGE_FIELDS:
+                self.totals[field] += usage.get(field, 0)
+
+    def summary(self) -> Dict[str, int]:
+        with self._lock:
+            return {"calls": self.calls, **self.totals}
@@ -0,0 +1,382 @@
+"""Worker floty: bierze zadania ze wspólnego magazynu i pisze artykuły.
+
+Przykład (magazyn na maszynie A, workery na dowolnej liczbie maszyn; wszędzie ta sama
+zmienna JOB_STORE_TOKEN - serwis bez niej nasłuchuje tylko na 127.0.0.1):
+    python .streamlit/worker.py serve --store data/jobs.sqlite --host 0.0.0.0 --port 8950
+    python .streamlit/worker.py submit tematy.csv --store http://A:8950
+    python .streamlit/worker.py run --store http://A:8950 --provider claude --concurrency 8
+    python .streamlit/worker.py status --store http://A:8950
+
+Na jednej maszynie `--store` może wskazywać bezpośrednio plik SQLite.
+Każdy worker pisze jednocześnie najwyżej tyle artykułów, ile mieści się w jego
+części limitu dostawcy (limit konta dzielony przez liczbę aktywnych workerów
+tego dostawcy), i nie więcej niż `--concurrency`. Zadania przerwanego workera
+wracają do puli po wygaśnięciu dzierżawy, a gotowe sekcje nie są pisane ponownie.
+"""
+import argparse
+import os
+import signal
+import socket
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+from batch import job_id, read_topics
+from completion_cache import get_cache
+from drafts import ArticleDraft, SectionRecord
+from errors import ProviderError
+from job_store import (DEFAULT_JOB_STORE_PATH, INTRO_POSITION, TOKEN_ENV, VISIBILITY_TIMEOUT, FleetJob,
+                       JobStore, JobStoreError, JobStoreServer, LeaseLost, open_job_store)
+from library import DEFAULT_LIBRARY_PATH, ArticleLibrary, get_library, step_timings
+from prompts import should_mention_clinic
+from providers import API_KEY_ENV
+from rate_limit import get_scheduler
+from routing import ROUTES, ROUTING_PRESETS, SPECULATIVE_ROUTES, build_policy
+from writer import ENGINES, ArticleWriter, GenerationError, check_response
+
+# Szacunki przed pierwszym zmierzonym wywołaniem
+DEFAULT_CALL_SECONDS = 10.0
+DEFAULT_CALL_TOKENS = 1500
+LOOPBACK_HOSTS = ("127.0.0.1", "localhost", "::1")
+
+
+@dataclass
+class _Held:
+    """Zadanie wzięte przez workera; `lost` ustawia heartbeat, gdy dzierżawę przejął ktoś inny"""
+    job: FleetJob
+    lost: bool = False
+
+
+class FleetWorker:
+    """Pętla workera: dzierżawy, heartbeat i generowanie w puli wątków"""
+
+    def __init__(self, store, writer: ArticleWriter, concurrency: int = 4,
+                 visibility: float = VISIBILITY_TIMEOUT, worker_id: str = "",
+                 library: Optional[ArticleLibrary] = None, poll_interval: float = 1.0):
+        self.store = store
+        self.writer = writer
+        self.concurrency = max(1, concurrency)
+        self.visibility = visibility
+        self.worker_id = worker_id or f"{socket.gethostname()}-{os.getpid()}"
+        self.library = library
+        self.poll_interval = poll_interval
+        self._lock = threading.Lock()
+        self._held: Dict[str, _Held] = {}
+        self._call_seconds = DEFAULT_CALL_SECONDS
+        self._call_tokens = DEFAULT_CALL_TOKENS
+        self.counts = {"done": 0, "retry": 0, "failed": 0, "lost": 0}
+
+    def slots(self) -> int:
+        """Ile artykułów pisać jednocześnie, by zmieścić się w części limitu dostawcy.
+
+        Artykuł ma naraz jedno trwające wywołanie, więc N artykułów to ok.
+        N * 60 / czas_wywołania zapytań na minutę (i odpowiednio tokenów).
+        """
+        provider = self.writer.model_provider
+        scheduler = get_scheduler(provider)
+        try:
+            workers = max(1, self.store.active_workers(provider, self.visibility))
+        except JobStoreError:
+            workers = 1
+        per_minute = 60.0 / self._call_seconds
+        by_requests = scheduler.requests.capacity / workers / per_minute
+        by_tokens = scheduler.tokens.capacity / workers / (per_minute * self._call_tokens)
+        return max(1, min(self.concurrency, int(by_requests), int(by_tokens)))
+
+    def _observe(self, writer: ArticleWriter):
+        """Uaktualnia średni czas i tokeny wywołania (średnia wykładnicza) po zakończonym artykule"""
+        records = [r for r in writer.trace.snapshot() if not r.cached and r.status == "ok"]
+        if not records:
+            return
+        seconds = sum(r.latency for r in records) / len(records)
+        tokens = sum(r.input_tokens + r.output_tokens for r in records) / len(records)
+        with self._lock:
+            self._call_seconds = 0.7 * self._call_seconds + 0.3 * max(seconds, 0.05)
+            self._call_tokens = 0.7 * self._call_tokens + 0.3 * max(tokens, 1.0)
+
+    def run(self, stop: Optional[threading.Event] = None, exit_when_idle: bool = False) -> Dict[str, int]:
+        """Bierze i wykonuje zadania do ustawienia `stop` (albo do pustej kolejki z `exit_when_idle`).
+
+        Po zatrzymaniu nie bierze nowych zadań, ale kończy rozpoczęte.
+        """
+        stop = stop or threading.Event()
+        finished = threading.Event()
+        heartbeat = threading.Thread(target=self._heartbeat_loop, args=(finished,), daemon=True)
+        heartbeat.start()
+        with ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="fleet") as executor:
+            while not stop.is_set():
+                slots = self.slots()
+                with self._lock:
+                    free = slots - len(self._held)
+                try:
+                    jobs = self.store.lease(self.worker_id, free, self.visibility) if free > 0 else []
+                except JobStoreError as e:
+                    print(f"[{self.worker_id}] {e}", file=sys.stderr)
+                    jobs = []
+                for job in jobs:
+                    with self._lock:
+                        self._held[job.id] = _Held(job)
+                    executor.submit(self._process, job)
+                with self._lock:
+                    idle = not self._held
+                if exit_when_idle and idle and not jobs:
+                    break
+                if not jobs:
+                    stop.wait(self.poll_interval)
+        finished.set()
+        heartbeat.join()
+        try:
+            self.store.unregister_worker(self.worker_id)
+        except JobStoreError:
+            pass
+        return dict(self.counts)
+
+    def _heartbeat_loop(self, finished: threading.Event):
+        """Co 1/3 czasu widoczności przedłuża dzierżawy i zgłasza workera w magazynie.
+
+        Działa do zakończenia wszystkich rozpoczętych zadań, także po zatrzymaniu pętli.
+        """
+        while True:
+            try:
+                self.store.register_worker(self.worker_id, self.writer.model_provider, self.slots())
+            except JobStoreError as e:
+                print(f"[{self.worker_id}] {e}", file=sys.stderr)
+            with self._lock:
+                held = list(self._held.values())
+            for entry in held:
+                try:
+                    self.store.heartbeat(entry.job.id, entry.job.lease, self.visibility)
+                except LeaseLost:
+                    entry.lost = True
+                except JobStoreError:
+                    pass  # spróbujemy przy następnym heartbeacie - dzierżawa ma zapas
+            if finished.wait(self.visibility / 3):
+                return
+
+    def _process(self, job: FleetJob):
+        writer = self.writer.spawn()
+        held = self._held[job.id]
+        start = time.time()
+        outcome = "done"
+        try:
+            draft = self._generate(job, writer, held)
+            article = draft.render()
+            self.store.complete(job.id, job.lease, article, writer.usage.summary())
+            if self.library is not None:
+                self.library.add(draft.title, job.topic, job.clinic, draft.outline, article, writer.model_provider,
+                                 job.engine, job.context, writer.usage.summary(),
+                                 step_timings(writer.trace.snapshot()), round(time.time() - start, 2),
+                                 draft.to_dict())
+        except LeaseLost:
+            outcome = "lost"
+        except (ProviderError, GenerationError) as e:
+            outcome = self._fail(job, str(e), getattr(e, "retryable", True))
+        except Exception as e:  # zadanie nie może zginąć bez śladu - wraca do kolejki albo jest oznaczane
+            outcome = self._fail(job, repr(e), True)
+        finally:
+            self._observe(writer)
+            with self._lock:
+                self._held.pop(job.id, None)
+                self.counts[outcome] += 1
+        print(f"[{self.worker_id}] {outcome}: {job.topic} ({time.time() - start:.1f} s)")
+
+    def _fail(self, job: FleetJob, error: str, retryable: bool) -> str:
+        try:
+            status = self.store.fail(job.id, job.lease, error, retryable)
+        except (LeaseLost, JobStoreError):
+            return "lost"  # dzierżawa wygaśnie i zadanie wróci do puli
+        return "retry" if status == "queued" else "failed"
+
+    def _check(self, held: _Held):
+        if held.lost:
+            raise LeaseLost(f"zadanie {held.job.id}: dzierżawę przejął inny worker")
+
+    def _stored_draft(self, job: FleetJob, title: str, outline: List[str]) -> Optional[ArticleDraft]:
+        """Szkic z fragmentów zapisanych przez poprzednie dzierżawy (do przeniesienia bez wywołań API)"""
+        stored = self.store.sections(job.id)
+        if not stored:
+            return None
+        draft = ArticleDraft(title, job.topic, job.clinic, job.context)
+        for section in stored:
+            if section.position == INTRO_POSITION:
+                draft.intro, draft.intro_fingerprint = section.text, section.fingerprint
+            elif section.position < len(outline):
+                mentions = should_mention_clinic(section.position, len(outline))
+                draft.sections.append(SectionRecord(section.heading, section.fingerprint, section.text, mentions))
+        return draft
+
+    def _put(self, job: FleetJob, held: _Held, position: int, heading: str, fingerprint: str, text: str) -> str:
+        self._check(held)
+        return self.store.put_section(job.id, job.lease, position, heading, fingerprint, text)
+
+    def _generate(self, job: FleetJob, writer: ArticleWriter, held: _Held) -> ArticleDraft:
+        title, outline = job.title, job.outline
+        if not outline:
+            result = writer.create_outline(job.topic, job.clinic, job.context)
+            title, outline = check_response(result["title"], "konspekt"), writer.outline
+            if not outline:
+                raise GenerationError("konspekt: brak śródtytułów w odpowiedzi")
+            self._check(held)
+            self.store.set_outline(job.id, job.lease, title, outline)
+
+        previous = self._stored_draft(job, title, outline)
+        if job.engine == "structured":
+            draft = writer.write_article_structured(title, job.topic, job.clinic, outline, job.context, previous)
+            draft.intro = self._put(job, held, INTRO_POSITION, "", draft.intro_fingerprint, draft.intro)
+            for i, section in enumerate(draft.sections):
+                section.text = self._put(job, held, i, section.heading, section.fingerprint, section.text)
+            return draft
+
+        draft, plans = writer.plan_revision(title, job.topic, job.clinic, outline, job.context, previous)
+        if not draft.intro:
+            intro = check_response(writer.write_introduction(title, job.topic, outline, job.context, job.clinic),
+                                   "wstęp")
+            draft.intro = self._put(job, held, INTRO_POSITION, "", draft.intro_fingerprint, intro)
+        full_article = f"# {title}\n\n{draft.intro}\n\n"
+        for plan in plans:
+            text = plan.reuse.text if plan.reuse else None
+            if text is None:
+                self._check(held)
+                text = check_response(writer.write_section(plan.heading, plan.index, title, job.topic, job.clinic,
+                                                           outline, full_article, job.context),
+                                      f"sekcja {plan.index + 1}")
+                text = self._put(job, held, plan.index, plan.heading, plan.fingerprint, text)
+            draft.sections.append(SectionRecord(plan.heading, plan.fingerprint, text, plan.mentions_clinic))
+            full_article += f"## {plan.heading}\n\n{text}\n\n"
+        return draft
+
+
+def _submit(args) -> int:
+    store = open_job_store(args.store)
+    topics = read_topics(args.input)
+    for row in topics:
+        store.submit(row["topic"], row["clinic"], row["context"], engine=args.engine, job_id=job_id(row))
+    print(f"Dodano {len(topics)} zadań (istniejące pominięto): {store.stats()}")
+    return 0
+
+
+def _status(args) -> int:
+    store = open_job_store(args.store)
+    print(store.stats())
+    for job in store.jobs("failed", limit=args.failed):
+        print(f"  failed {job.id}: {job.topic} - {job.error}")
+    return 0
+
+
+def _serve(args) -> int:
+    token = os.environ.get(TOKEN_ENV, "")
+    if not token and args.host not in LOOPBACK_HOSTS:
+        # Serwis zapisuje artykuły i dzierżawy - bez tokenu zmieniać je mógłby każdy w sieci
+        print(f"Serwis na {args.host} wymaga wspólnego tokenu: ustaw zmienną {TOKEN_ENV} (tę samą na workerach)",
+              file=sys.stderr)
+        return 2
+    server = JobStoreServer(JobStore(args.store), args.host, args.port, token)
+    print(f"Magazyn zadań: {server.base_url} (baza {args.store}{', z tokenem' if token else ''})")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        server.stop()
+    return 0
+
+
+def _run(args) -> int:
+    api_key = os.environ.get(API_KEY_ENV[args.provider], "")
+    if not api_key:
+        print(f"Brak klucza API: ustaw zmienną {API_KEY_ENV[args.provider]}", file=sys.stderr)
+        return 2
+    try:
+        routing = build_policy(args.routing, args.provider, args.route, args.speculative)
+    except ValueError as e:
+        print(e, file=sys.stderr)
+        return 2
+    routing_keys = {p: os.environ.get(API_KEY_ENV[p], "") for p in (routing.providers() if routing else ())
+                    if p != args.provider}
+    missing = [API_KEY_ENV[p] for p, key in routing_keys.items() if not key]
+    if missing:
+        print(f"Brak klucza API dla trasy: ustaw zmienną {', '.join(missing)}", file=sys.stderr)
+        return 2
+
+    writer = ArticleWriter()
+    writer.set_config(api_key, args.provider)
+    writer.set_cache(get_cache() if args.cache else None)
+    writer.set_routing(routing, routing_keys)
+    worker = FleetWorker(open_job_store(args.store), writer, args.concurrency, args.visibility, args.worker_id,
+                         None if args.no_library else get_library(args.library))
+
+    stop = threading.Event()
+    # SIGTERM/Ctrl-C: koniec brania zadań, rozpoczęte są dokańczane; drugi sygnał przerywa od razu.
+    # os._exit, bo wyjątek nie przerwałby czekania na wątki puli (dzierżawy wygasną, a zapisane
+    # sekcje przejmie inny worker)
+    def on_signal(signum, frame):
+        if stop.is_set():
+            print(f"[{worker.worker_id}] przerywam - rozpoczęte zadania przejmą inne workery", file=sys.stderr)
+            sys.stderr.flush()
+            os._exit(130)
+        print(f"[{worker.worker_id}] kończę rozpoczęte zadania...", file=sys.stderr)
+        stop.set()
+    signal.signal(signal.SIGINT, on_signal)
+    signal.signal(signal.SIGTERM, on_signal)
+
+    print(f"[{worker.worker_id}] start: {args.provider}, do {worker.concurrency} artykułów naraz")
+    counts = worker.run(stop, exit_when_idle=args.exit_when_idle)
+    print(f"[{worker.worker_id}] gotowe: {counts['done']}, do ponowienia: {counts['retry']},"
+          f" nieudane: {counts['failed']}, przejęte: {counts['lost']}")
+    return 0
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description="Flota workerów generujących artykuły ze wspólnej kolejki")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run = commands.add_parser("run", help="bierz zadania z magazynu i pisz artykuły")
+    run.add_argument("--store", default=DEFAULT_JOB_STORE_PATH, help="plik SQLite albo adres serwisu (http://...)")
+    run.add_argument("--provider", choices=sorted(API_KEY_ENV), default="claude")
+    run.add_argument("--concurrency", type=int, default=4,
+                     help="najwięcej artykułów naraz (mniej, jeśli nie pozwala limit dostawcy)")
+    run.add_argument("--visibility", type=float, default=VISIBILITY_TIMEOUT,
+                     help="czas dzierżawy w sekundach - po nim zadanie bez heartbeatu wraca do puli")
+    run.add_argument("--worker-id", default="", help="nazwa workera (domyślnie host-pid)")
+    run.add_argument("--cache", action="store_true", help="używaj trwałego cache odpowiedzi")
+    run.add_argument("--library", default=DEFAULT_LIBRARY_PATH, help="lokalna biblioteka artykułów (SQLite)")
+    run.add_argument("--no-library", action="store_true", help="nie zapisuj artykułów w lokalnej bibliotece")
+    run.add_argument("--exit-when-idle", action="store_true", help="zakończ, gdy kolejka jest pusta")
+    run.add_argument("--routing", choices=list(ROUTING_PRESETS), default="single",
+                     help="polityka routingu modeli (jak w batch.py)")
+    run.add_argument("--route", action="append", default=[], metavar="TRASA=DOSTAWCA[:MODEL]",
+                     help=f"nadpisanie trasy ({', '.join(ROUTES)})")
+    run.add_argument("--speculative", action="append", choices=SPECULATIVE_ROUTES, default=[],
+                     help="trasa pisana szkicem i rewidowana trasą 'rewizja'")
+    run.set_defaults(handler=_run)
+
+    submit = commands.add_parser("submit", help="dodaj tematy z pliku CSV/JSONL do kolejki")
+    submit.add_argument("input", help="plik CSV lub JSONL z kolumnami topic, clinic, context")
+    submit.add_argument("--store", default=DEFAULT_JOB_STORE_PATH)
+    submit.add_argument("--engine", choices=ENGINES, default="pipeline")
+    submit.set_defaults(handler=_submit)
+
+    status = commands.add_parser("status", help="liczba zadań w każdym stanie i aktywnych workerów")
+    status.add_argument("--store", default=DEFAULT_JOB_STORE_PATH)
+    status.add_argument("--failed", type=int, default=10, help="ile nieudanych zadań wypisać")
+    status.set_defaults(handler=_status)
+
+    serve = commands.add_parser("serve", help="udostępnij magazyn SQLite workerom na innych maszynach")
+    serve.add_argument("--store", default=DEFAULT_JOB_STORE_PATH, help="plik bazy SQLite")
+    serve.add_argument("--host", default="127.0.0.1")
+    serve.add_argument("--port", type=int, default=8950)
+    serve.set_defaults(handler=_serve)
+
+    args = parser.parse_args(argv)
+
+    try:
+        from dotenv import load_dotenv
+        load_dotenv()
+    except ImportError:
+        pass
+    return args.handler(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
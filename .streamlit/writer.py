@@ -0,0 +1,999 @@
+"""Generator artykułów sponsorowanych - logika niezależna od interfejsu Streamlit.
+
+Teksty promptów są w `prompts.py`, kliniki w `clinics.py`, a dostawcy w
+`providers.py`. Moduły potrzebne tylko w części ścieżek (requests, hedging na
+asyncio, research) są importowane dopiero przy pierwszym użyciu.
+"""
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import TYPE_CHECKING, Callable, Dict, Iterator, List, Optional, Tuple
+import re
+
+from budget import ARTICLE_WORD_TARGET, TokenRatio, WordBudget, count_words, get_ratio, trim_to_sentence
+from clinics import clinic_info
+from completion_cache import CompletionCache, cache_key
+from dedup import DuplicateFlag, DuplicateIndex
+from drafts import ArticleDraft, SectionPlan, SectionRecord, fingerprint, plan_sections, reusable_intro
+from errors import (ConfigurationError, EmptyResponseError, ProviderError, ProviderTimeoutError,
+                    error_for_status)
+from http_pool import PoolConfig, get_pool
+from prompts import (INTRODUCTION_PROMPT, article_brief, draft_review_prompt, duplicate_note, outline_context,
+                     outline_prompt, seam_prompt, section_prompt, sentence_rewrite_prompt, should_mention_clinic,
+                     structured_prompt, structured_revision_prompt)
+from providers import BASE_URLS, MODELS, TEMPERATURES
+from rate_limit import get_scheduler
+from routing import (ROUTE_ARTICLE, ROUTE_INTRO, ROUTE_OUTLINE, ROUTE_REVIEW, ROUTE_REWRITE, RoutingPolicy,
+                     review_approved, section_route, served_by)
+from streaming import claude_text_deltas, openai_text_deltas
+from structured import (ARTICLE_SCHEMA, ARTICLE_TOOL, JSON_OVERHEAD_TOKENS, ArticlePart, ArticleStream,
+                        StructuredArticle, StructuredOutputError, parse_article, validate_article)
+from style_check import Sentence, StyleIssue, apply_rewrites, get_checker
+from telemetry import CallRecord, Trace, note
+from usage import UsageTotals, normalize_usage
+
+if TYPE_CHECKING:  # hedging (asyncio), research i requests ładowane dopiero, gdy są potrzebne
+    import requests
+    from failover import HedgedRouter
+    from research import ResearchResult
+
+# Silniki generowania: konspekt + wstęp + sekcja po sekcji albo cały artykuł jednym wywołaniem (JSON)
+ENGINES = ("pipeline", "structured")
+
+
+class GenerationError(RuntimeError):
+    """Krok generowania nie dał użytecznej treści"""
+
+
+def check_response(text: str, step: str) -> str:
+    """Zwraca tekst odpowiedzi albo zgłasza GenerationError dla pustej odpowiedzi"""
+    if not text or not text.strip():
+        raise GenerationError(f"{step}: pusta odpowiedź")
+    return text
+
+
+def parse_outline(response: str) -> Tuple[str, List[str]]:
+    """Tytuł i śródtytuły z odpowiedzi konspektu (format TYTUŁ / ŚRÓDTYTUŁY)"""
+    title = ""
+    outline = []
+    for line in response.split('\n'):
+        line = line.strip()
+        if line.startswith("TYTUŁ:"):
+            title = line.replace("TYTUŁ:", "").strip()
+        elif re.match(r'^\d+[.)]', line):
+            # Krótkie śródtytuły ("Dieta", "Sen") też są poprawne - odrzucamy tylko puste
+            clean_line = re.sub(r'^\d+[.)]\s*', '', line).strip('*# ').strip()
+            if clean_line:
+                outline.append(clean_line)
+    return title, outline
+
+
+def estimate_tokens(messages: List[Dict], max_tokens: int) -> int:
+    """Zgrubne oszacowanie zużycia tokenów na potrzeby limitera (wejście + maksymalne wyjście)"""
+    chars = sum(len(str(message.get("content", ""))) for message in messages)
+    return chars // 3 + max_tokens
+
+
+class ArticleWriter:
+    def __init__(self):
+        self.api_key = None
+        self.model_provider = "claude"
+        self.outline = []
+        self.title = ""
+        self.article_content = ""
+        self.pool_config = PoolConfig()
+        self.cache: Optional[CompletionCache] = None
+        self.use_cache = True
+        self.usage = UsageTotals()
+        self.trace = Trace()
+        self.api_keys: Dict[str, str] = {}
+        self.base_urls = dict(BASE_URLS)
+        self.router: Optional["HedgedRouter"] = None
+        self.research: Optional["ResearchResult"] = None
+        self.budget: Optional[WordBudget] = None
+        self.dedup: Optional[DuplicateIndex] = None
+        self.dedup_regenerate = False
+        self.duplicates: List[DuplicateFlag] = []
+        self.routing: Optional[RoutingPolicy] = None
+        
+    def set_config(self, api_key: str, model_provider: str, pool_config: Optional[PoolConfig] = None):
+        self.api_key = api_key
+        self.model_provider = model_provider
+        if pool_config is not None:
+            self.pool_config = pool_config
+    
+    def set_fallbacks(self, api_keys: Dict[str, str], router: Optional["HedgedRouter"]):
+        """Klucze zapasowych dostawców i router hedgingu (None wyłącza hedging)"""
+        self.api_keys = dict(api_keys)
+        self.router = router
+    
+    def spawn(self) -> "ArticleWriter":
+        """Nowy writer z tą samą konfiguracją, ale własnym konspektem, śladem i licznikiem tokenów"""
+        writer = ArticleWriter()
+        writer.set_config(self.api_key, self.model_provider, self.pool_config)
+        writer.set_fallbacks(self.api_keys, self.router)
+        writer.set_cache(self.cache)
+        writer.use_cache = self.use_cache
+        writer.base_urls = dict(self.base_urls)
+        writer.research = self.research
+        writer.set_dedup(self.dedup, self.dedup_regenerate)
+        writer.routing = self.routing
+        return writer
+    
+    def _url(self, provider: str) -> str:
+        path = '/v1/messages' if provider == 'claude' else '/v1/chat/completions'
+        return self.base_urls[provider].rstrip('/') + path
+    
+    def _key_for(self, provider: str) -> str:
+        if provider == self.model_provider:
+            return self.api_key
+        return self.api_keys.get(provider, "")
+    
+    def set_routing(self, policy: Optional[RoutingPolicy], api_keys: Optional[Dict[str, str]] = None):
+        """Polityka wyboru dostawcy i modelu dla kroków (None - wszystko modelem głównym).
+
+        `api_keys` to klucze dostawców z tras innych niż główny (dopisywane do kluczy zapasowych).
+        """
+        self.routing = policy
+        if api_keys:
+            self.api_keys = {**self.api_keys, **api_keys}
+    
+    def _route(self, route: str) -> Tuple[str, str]:
+        """Dostawca i model trasy według polityki routingu; bez wpisu - model główny"""
+        target = self.routing.route(route) if self.routing is not None else None
+        if target is None:
+            return self.model_provider, MODELS[self.model_provider]
+        return target.provider, target.resolved_model
+    
+    def _ratio(self, route: str) -> TokenRatio:
+        """Przelicznik tokenów na słowo modelu, który obsługuje trasę"""
+        return get_ratio(*self._route(route))
+    
+    def _is_speculative(self, route: str) -> bool:
+        return self.routing is not None and self.routing.is_speculative(route)
+    
+    def set_cache(self, cache: Optional[CompletionCache]):
+        """Włącza (lub wyłącza dla None) cache odpowiedzi"""
+        self.cache = cache
+    
+    def set_research(self, research: Optional["ResearchResult"]):
+        """Materiały z researchu - konspekt i każda sekcja dostają pasujące do nich fragmenty"""
+        self.research = research
+    
+    def set_dedup(self, index: Optional[DuplicateIndex], regenerate: bool = False):
+        """Sprawdzanie sekcji pod kątem powtórzeń z wcześniejszych artykułów (None wyłącza)"""
+        self.dedup = index
+        self.dedup_regenerate = regenerate
+    
+    def _research_section(self, query: str, k: int) -> str:
+        if self.research is None:
+            return ""
+        passages = self.research.context_for(query, k)
+        if not passages:
+            return ""
+        return f"""
+Materiały ze źródeł (korzystaj z faktów, nie kopiuj sformułowań):
+{passages}
+"""
+    
+    def start_budget(self, title: str, outline: List[str]) -> WordBudget:
+        """Nowy budżet słów dla artykułu (wstęp i sekcje dzielą limit 800 słów)"""
+        self.budget = WordBudget(title, outline, get_ratio(self.model_provider, MODELS[self.model_provider]))
+        return self.budget
+    
+    def budget_for(self, title: str, outline: List[str]) -> WordBudget:
+        """Bieżący budżet artykułu; inny tytuł lub konspekt zaczyna nowy"""
+        if self.budget is None or not self.budget.matches(title, outline):
+            return self.start_budget(title, outline)
+        return self.budget
+    
+    def _track_budget(self, budget: WordBudget, index: int, step: str, text: str,
+                      record: Optional[CallRecord] = None):
+        """Zapisuje długość fragmentu; tokeny z usage wywołania, które go napisało (`record`, domyślnie
+        ostatnie wywołanie kroku), kalibrują przelicznik modelu, który odpowiedział (cache nie kalibruje)"""
+        if record is None:
+            record = self.trace.last(step)
+        budget.record(index, text)
+        if record is not None and not record.cached:
+            get_ratio(*served_by(record)).observe(count_words(text), record.output_tokens)
+    
+    def _tracked_stream(self, chunks: Iterator[str], budget: WordBudget, index: int, step: str) -> Iterator[str]:
+        """Przekazuje fragmenty dalej; budżet dostaje tekst obcięty do pełnego zdania (jak trafi do artykułu)"""
+        parts = []
+        for chunk in chunks:
+            parts.append(chunk)
+            yield chunk
+        self._track_budget(budget, index, step, trim_to_sentence("".join(parts)))
+    
+    def _cache_key(self, messages: List[Dict], max_tokens: int, provider: Optional[str] = None,
+                   model: Optional[str] = None) -> str:
+        provider = provider or self.model_provider
+        return cache_key(provider, model or MODELS.get(provider, ""), max_tokens, TEMPERATURES.get(provider), messages)
+    
+    def _check_config(self):
+        if not self.api_key:
+            raise ConfigurationError("Brak klucza API", self.model_provider)
+        if self.model_provider not in MODELS:
+            raise ConfigurationError("Nieznany model", self.model_provider)
+    
+    def call_api(self, messages: List[Dict], max_tokens: int = 2000, use_cache: Optional[bool] = None,
+                 step: str = "", schema: Optional[Dict] = None, route: str = "") -> str:
+        """Wywołuje odpowiednie API w zależności od wybranego modelu.
+
+        Zapytania przechodzą przez limiter dostawcy, błędy przejściowe są ponawiane,
+        a pozostałe zgłaszane jako ProviderError. `use_cache=False` pomija odczyt
+        z cache (wynik i tak jest zapisywany); domyślnie decyduje `self.use_cache`.
+        Czas i tokeny wywołania trafiają do `self.trace` pod nazwą `step`.
+        Ze `schema` odpowiedzią jest JSON zgodny z tym schematem (tool use / response_format).
+        Dostawcę i model wybiera polityka routingu według `route` (routing.py).
+        """
+        self._check_config()
+        provider, model = self._route(route)
+        
+        with self.trace.span(step or "wywołanie", provider, model, route) as record:
+            key = None
+            if self.cache is not None:
+                key = self._cache_key(messages, max_tokens, provider, model)
+                if (self.use_cache if use_cache is None else use_cache):
+                    cached = self.cache.get(key)
+                    if cached is not None:
+                        record.cached = True
+                        return cached
+            
+            if self.router is None:
+                result = self._scheduled_call(provider, messages, max_tokens, schema, model)
+            else:
+                routed = provider
+                provider, result = self.router.call(
+                    lambda candidate: self._scheduled_call(candidate, messages, max_tokens, schema,
+                                                           model if candidate == routed else None),
+                    provider
+                )
+                record.answered_by = provider
+                if provider != routed and self.cache is not None:
+                    key = cache_key(provider, MODELS[provider], max_tokens, TEMPERATURES[provider], messages)
+            
+            if key is not None:
+                self.cache.put(key, result)
+            return result
+    
+    def _record_usage(self, provider: str, usage: Optional[Dict]):
+        normalized = normalize_usage(provider, usage)
+        self.usage.add(normalized)
+        note(**normalized)
+    
+    def _scheduled_call(self, provider: str, messages: List[Dict], max_tokens: int,
+                        schema: Optional[Dict] = None, model: Optional[str] = None) -> str:
+        """Jedno wywołanie dostawcy w ramach jego limitera (`model` - inny niż domyślny model dostawcy)"""
+        if not self._key_for(provider):
+            raise ConfigurationError("Brak klucza API", provider)
+        calls = {
+            "claude": self._call_claude,
+            "openai": self._call_openai,
+            "deepseek": self._call_deepseek
+        }
+        return get_scheduler(provider).run(
+            lambda: calls[provider](messages, max_tokens, schema, model),
+            estimate_tokens(messages, max_tokens)
+        )
+    
+    def _claude_messages(self, messages: List[Dict]) -> Tuple[List[Dict], List[Dict]]:
+        """Wydziela wiadomości systemowe do pola `system` z punktem cache_control na końcu prefiksu"""
+        system = [{"type": "text", "text": m["content"]} for m in messages if m["role"] == "system"]
+        if system:
+            system[-1]["cache_control"] = {"type": "ephemeral"}
+        return system, [m for m in messages if m["role"] != "system"]
+    
+    def _structured_fields(self, provider: str, schema: Optional[Dict]) -> Dict:
+        """Pola zapytania wymuszające odpowiedź w JSON zgodnym ze schematem"""
+        if schema is None:
+            return {}
+        if provider == 'claude':
+            return {
+                'tools': [{'name': ARTICLE_TOOL, 'description': 'Zapisuje gotowy artykuł', 'input_schema': schema}],
+                'tool_choice': {'type': 'tool', 'name': ARTICLE_TOOL}
+            }
+        if provider == 'openai':
+            return {'response_format': {'type': 'json_schema',
+                                        'json_schema': {'name': ARTICLE_TOOL, 'schema': schema, 'strict': True}}}
+        # DeepSeek obsługuje tylko tryb JSON bez schematu - strukturę opisuje prompt
+        return {'response_format': {'type': 'json_object'}}
+    
+    def _post(self, provider: str, url: str, headers: Dict, data: Dict, stream: bool = False) -> "requests.Response":
+        """POST przez pulę połączeń; statusy błędów zamienia na typowane wyjątki"""
+        import requests
+        try:
+            response = get_pool(provider, self.pool_config).post(url, headers=headers, json=data, stream=stream)
+        except (requests.Timeout, requests.ConnectionError) as e:
+            raise ProviderTimeoutError(str(e), provider) from e
+        
+        note(connect=response.connect_time)
+        if not stream:
+            note(ttft=response.elapsed.total_seconds())
+        get_scheduler(provider).observe(response.headers)
+        if response.status_code >= 400:
+            error = error_for_status(provider, response.status_code, response.headers, response.text)
+            response.close()
+            raise error
+        return response
+    
+    def _request_body(self, provider: str, messages: List[Dict], max_tokens: int,
+                      schema: Optional[Dict] = None, model: Optional[str] = None) -> Dict:
+        """Treść zapytania do API dostawcy (także jako pojedyncze zapytanie w Batch API)"""
+        if provider == 'claude':
+            system, messages = self._claude_messages(messages)
+            data = {
+                'model': model or MODELS['claude'],
+                'max_tokens': max_tokens,
+                'messages': messages
+            }
+            if system:
+                data['system'] = system
+        else:
+            data = {
+                'model': model or MODELS[provider],
+                'messages': messages,
+                'max_tokens': max_tokens,
+                'temperature': TEMPERATURES[provider]
+            }
+        data.update(self._structured_fields(provider, schema))
+        return data
+    
+    def _response_text(self, provider: str, result: Dict, schema: Optional[Dict] = None) -> str:
+        """Tekst odpowiedzi (albo JSON wywołania narzędzia) z odpowiedzi API dostawcy"""
+        self._record_usage(provider, result.get('usage'))
+        if provider == 'claude':
+            if schema is not None:
+                for block in result.get('content') or []:
+                    if block.get('type') == 'tool_use':
+                        return json.dumps(block.get('input') or {}, ensure_ascii=False)
+                raise EmptyResponseError("Brak wywołania narzędzia w odpowiedzi", 'claude')
+            if 'content' in result and len(result['content']) > 0:
+                return result['content'][0]['text']
+            raise EmptyResponseError("Brak odpowiedzi od API", 'claude')
+        
+        if 'choices' in result and len(result['choices']) > 0:
+            return result['choices'][0]['message']['content']
+        raise EmptyResponseError("Brak odpowiedzi od API", provider)
+    
+    def _call_claude(self, messages: List[Dict], max_tokens: int, schema: Optional[Dict] = None,
+                     model: Optional[str] = None) -> str:
+        """Wywołuje API Claude Sonnet 4"""
+        headers = {
+            'Content-Type': 'application/json',
+            'x-api-key': self._key_for('claude'),
+            'anthropic-version': '2023-06-01'
+        }
+        data = self._request_body('claude', messages, max_tokens, schema, model)
+        response = self._post('claude', self._url('claude'), headers, data)
+        return self._response_text('claude', response.json(), schema)
+    
+    def _call_openai(self, messages: List[Dict], max_tokens: int, schema: Optional[Dict] = None,
+                     model: Optional[str] = None) -> str:
+        """Wywołuje API OpenAI"""
+        headers = {
+            'Content-Type': 'application/json',
+            'Authorization': f'Bearer {self._key_for("openai")}'
+        }
+        data = self._request_body('openai', messages, max_tokens, schema, model)
+        response = self._post('openai', self._url('openai'), headers, data)
+        return self._response_text('openai', response.json(), schema)
+    
+    def _call_deepseek(self, messages: List[Dict], max_tokens: int, schema: Optional[Dict] = None,
+                       model: Optional[str] = None) -> str:
+        """Wywołuje API DeepSeek"""
+        headers = {
+            'Content-Type': 'application/json',
+            'Authorization': f'Bearer {self._key_for("deepseek")}'
+        }
+        data = self._request_body('deepseek', messages, max_tokens, schema, model)
+        response = self._post('deepseek', self._url('deepseek'), headers, data)
+        return self._response_text('deepseek', response.json(), schema)
+    
+    def stream_api(self, messages: List[Dict], max_tokens: int = 2000,
+                   timings: Optional[Dict] = None, use_cache: Optional[bool] = None,
+                   step: str = "", schema: Optional[Dict] = None, route: str = "") -> Iterator[str]:
+        """Strumieniuje odpowiedź API fragmentami tekstu.
+
+        Jeśli podano `timings`, zapisuje w nim czas do pierwszego tokenu (`ttft`)
+        i całkowity czas odpowiedzi (`total`) w sekundach. Trafienie w cache
+        zwraca całą odpowiedź jednym fragmentem. Ponawiane jest tylko otwarcie
+        strumienia - błąd w trakcie odbioru zgłaszany jest jako ProviderError.
+        Dostawcę i model wybiera polityka routingu według `route`; trasy spekulacyjne
+        (szkic i rewizja) obsługuje `_drafted_stream`.
+        """
+        self._check_config()
+        provider, model = self._route(route)
+        
+        with self.trace.span(step or "strumień", provider, model, route) as record:
+            start = time.perf_counter()
+            key = None
+            if self.cache is not None:
+                key = self._cache_key(messages, max_tokens, provider, model)
+                cached = self.cache.get(key) if (self.use_cache if use_cache is None else use_cache) else None
+                if cached is not None:
+                    record.cached = True
+                    record.ttft = time.perf_counter() - start
+                    if timings is not None:
+                        timings['ttft'] = timings['total'] = record.ttft
+                        timings['cached'] = True
+                    yield cached
+                    return
+            
+            import requests
+            if provider == "claude":
+                chunks = self._stream_claude(messages, max_tokens, schema, model)
+            else:
+                chunks = self._stream_openai_compatible(provider, self._url(provider), model,
+                                                        messages, max_tokens, schema)
+            
+            parts = []
+            try:
+                for chunk in chunks:
+                    if record.ttft is None:
+                        record.ttft = time.perf_counter() - start
+                        if timings is not None:
+                            timings['ttft'] = record.ttft
+                    parts.append(chunk)
+                    yield chunk
+            except requests.RequestException as e:
+                raise ProviderTimeoutError(f"Przerwany strumień: {e}", provider) from e
+            finally:
+                if timings is not None:
+                    timings['total'] = time.perf_counter() - start
+            
+            if key is not None and parts:
+                self.cache.put(key, "".join(parts))
+    
+    def _stream_claude(self, messages: List[Dict], max_tokens: int, schema: Optional[Dict] = None,
+                       model: Optional[str] = None) -> Iterator[str]:
+        """Strumieniuje odpowiedź Claude (SSE)"""
+        headers = {
+            'Content-Type': 'application/json',
+            'x-api-key': self._key_for('claude'),
+            'anthropic-version': '2023-06-01'
+        }
+        
+        system, chat_messages = self._claude_messages(messages)
+        data = {
+            'model': model or MODELS['claude'],
+            'max_tokens': max_tokens,
+            'messages': chat_messages,
+            'stream': True
+        }
+        if system:
+            data['system'] = system
+        data.update(self._structured_fields('claude', schema))
+        
+        response = get_scheduler('claude').run(
+            lambda: self._post('claude', self._url('claude'), headers, data, stream=True),
+            estimate_tokens(messages, max_tokens)
+        )
+        
+        usage = {}
+        with response:
+            # text/event-stream bez charset - requests domyślnie przyjąłby ISO-8859-1
+            response.encoding = 'utf-8'
+            yield from claude_text_deltas(response.iter_lines(decode_unicode=True), usage)
+        self._record_usage('claude', usage)
+    
+    def _stream_openai_compatible(self, provider: str, url: str, model: str,
+                                  messages: List[Dict], max_tokens: int,
+                                  schema: Optional[Dict] = None) -> Iterator[str]:
+        """Strumieniuje odpowiedź API zgodnego z OpenAI (SSE)"""
+        headers = {
+            'Content-Type': 'application/json',
+            'Authorization': f'Bearer {self._key_for(provider)}'
+        }
+        
+        data = {
+            'model': model,
+            'messages': messages,
+            'max_tokens': max_tokens,
+            'temperature': TEMPERATURES[provider],
+            'stream': True,
+            'stream_options': {'include_usage': True}
+        }
+        data.update(self._structured_fields(provider, schema))
+        
+        response = get_scheduler(provider).run(
+            lambda: self._post(provider, url, headers, data, stream=True),
+            estimate_tokens(messages, max_tokens)
+        )
+        
+        usage = {}
+        with response:
+            response.encoding = 'utf-8'
+            yield from openai_text_deltas(response.iter_lines(decode_unicode=True), usage)
+        self._record_usage(provider, usage)
+    
+    def _drafted_call(self, messages: List[Dict], words: float, step: str,
+                      route: str) -> Tuple[str, Optional[CallRecord]]:
+        """Wywołanie kroku z tekstem; w trasie spekulacyjnej - szkic szybkiego modelu i rewizja silnego.
+
+        Rewizja dostaje szkic jako odpowiedź asystenta i albo go zatwierdza (kilka tokenów),
+        albo zwraca poprawioną treść, która zastępuje szkic. Gdy rewizja się nie uda,
+        zostaje szkic - jest pełnoprawną odpowiedzią na to samo polecenie.
+        Zwraca tekst i rekord wywołania, które go napisało (do kalibracji budżetu).
+        """
+        draft = self.call_api(messages, self._ratio(route).tokens_for(words), step=step, route=route)
+        draft_record = self.trace.last(step)
+        if not self._is_speculative(route) or not draft.strip():
+            return draft, draft_record
+        
+        review_step = f"{step}: rewizja"
+        review_messages = messages + [
+            {"role": "assistant", "content": draft},
+            {"role": "user", "content": draft_review_prompt()}
+        ]
+        try:
+            response = self.call_api(review_messages, self._ratio(ROUTE_REVIEW).tokens_for(words),
+                                     step=review_step, route=ROUTE_REVIEW)
+        except ProviderError:
+            return draft, draft_record
+        accepted = review_approved(response)
+        record = self.trace.last(review_step)
+        if record is not None:
+            record.accepted = accepted
+        if accepted or not response.strip():
+            return draft, draft_record
+        return response, record
+    
+    def _drafted_stream(self, messages: List[Dict], words: float, step: str, route: str, budget: WordBudget,
+                        index: int, timings: Optional[Dict] = None) -> Iterator[str]:
+        """Trasa spekulacyjna w trybie strumieniowym: szkic i rewizja bez strumieniowania,
+        gotowy tekst jednym fragmentem (podgląd na żywo pokazałby szkic, który rewizja może zastąpić)"""
+        start = time.perf_counter()
+        text, record = self._drafted_call(messages, words, step, route)
+        if timings is not None:
+            timings['ttft'] = timings['total'] = time.perf_counter() - start
+        self._track_budget(budget, index, step, trim_to_sentence(text), record)
+        yield text
+    
+    def create_outline(self, topic: str, clinic: str, context: str = "") -> Dict[str, any]:
+        """Tworzy tytuł i konspekt artykułu"""
+        response = self.call_api(self._outline_messages(topic, clinic, context), 800, step="konspekt",
+                                 route=ROUTE_OUTLINE)
+        title, outline = parse_outline(response)
+        
+        # Ograniczenie do maksymalnie 5 punktów
+        self.outline = outline[:5]
+        self.title = title
+        
+        return {"title": title, "outline": outline}
+    
+    def _outline_messages(self, topic: str, clinic: str, context: str = "") -> List[Dict]:
+        research_section = self._research_section(f"{topic} {context}", 5)
+        return [{"role": "user", "content": outline_prompt(topic, clinic, context, research_section)}]
+    
+    def write_introduction(self, title: str, topic: str, outline: List[str], context: str = "",
+                           clinic: str = "") -> str:
+        """Pisze wstęp z hookiem.
+
+        Podanie `clinic` sprawia, że prompt wstępu dzieli prefiks z promptami sekcji.
+        """
+        budget = self.budget_for(title, outline)
+        messages = self._introduction_messages(title, topic, outline, context, clinic)
+        intro, record = self._drafted_call(messages, budget.words_for(-1), "wstęp", ROUTE_INTRO)
+        intro = trim_to_sentence(intro)
+        self._track_budget(budget, -1, "wstęp", intro, record)
+        return intro
+    
+    def stream_introduction(self, title: str, topic: str, outline: List[str], context: str = "",
+                            clinic: str = "", timings: Optional[Dict] = None) -> Iterator[str]:
+        """Pisze wstęp z hookiem, zwracając tekst fragmentami.
+
+        Połączony tekst trzeba obciąć `trim_to_sentence` - limit tokenów może uciąć ostatnie zdanie.
+        W trasie spekulacyjnej wstęp przychodzi jednym fragmentem, już po rewizji.
+        """
+        budget = self.budget_for(title, outline)
+        messages = self._introduction_messages(title, topic, outline, context, clinic)
+        if self._is_speculative(ROUTE_INTRO):
+            return self._drafted_stream(messages, budget.words_for(-1), "wstęp", ROUTE_INTRO, budget, -1, timings)
+        chunks = self.stream_api(messages, self._ratio(ROUTE_INTRO).tokens_for(budget.words_for(-1)), timings,
+                                 step="wstęp", route=ROUTE_INTRO)
+        return self._tracked_stream(chunks, budget, -1, "wstęp")
+    
+    def _introduction_messages(self, title: str, topic: str, outline: List[str], context: str = "",
+                               clinic: str = "") -> List[Dict]:
+        """Buduje prompt wstępu: wspólny prefiks + krótkie polecenie"""
+        return [
+            {"role": "system", "content": article_brief(title, topic, clinic, outline, context)},
+            {"role": "user", "content": INTRODUCTION_PROMPT}
+        ]
+    
+    def write_section(self, section_title: str, section_index: int, 
+                     title: str, topic: str, clinic: str, outline: List[str], 
+                     written_content: str, context: str = "") -> str:
+        """Pisze pojedynczą sekcję artykułu, z limitem tokenów z budżetu słów"""
+        budget = self.budget_for(title, outline)
+        words = budget.words_for(section_index)
+        messages = self._section_messages(section_title, section_index, title, topic,
+                                          clinic, outline, written_content, context, words)
+        step = f"sekcja {section_index + 1}"
+        route = section_route(section_index, len(outline))
+        section, record = self._drafted_call(messages, words, step, route)
+        section = trim_to_sentence(section)
+        self._track_budget(budget, section_index, step, section, record)
+        return self.screen_section(section_title, section_index, title, topic, clinic, outline, section, context)
+    
+    def stream_section(self, section_title: str, section_index: int,
+                       title: str, topic: str, clinic: str, outline: List[str],
+                       written_content: str, context: str = "",
+                       timings: Optional[Dict] = None) -> Iterator[str]:
+        """Pisze pojedynczą sekcję artykułu, zwracając tekst fragmentami (do obcięcia jak wstęp)"""
+        budget = self.budget_for(title, outline)
+        words = budget.words_for(section_index)
+        messages = self._section_messages(section_title, section_index, title, topic,
+                                          clinic, outline, written_content, context, words)
+        step = f"sekcja {section_index + 1}"
+        route = section_route(section_index, len(outline))
+        if self._is_speculative(route):
+            return self._drafted_stream(messages, words, step, route, budget, section_index, timings)
+        chunks = self.stream_api(messages, self._ratio(route).tokens_for(words), timings, step=step, route=route)
+        return self._tracked_stream(chunks, budget, section_index, step)
+    
+    def write_sections_parallel(self, title: str, topic: str, clinic: str, outline: List[str],
+                                context: str = "", max_workers: int = 5, smooth_seams: bool = False,
+                                on_section_done: Optional[Callable[[int, str], None]] = None,
+                                sections: Optional[List[Optional[str]]] = None) -> List[str]:
+        """Pisze wszystkie sekcje równolegle.
+
+        Zamiast końcówki poprzedniej sekcji każda sekcja dostaje kontekst z konspektu.
+        `on_section_done` jest wywoływane w wątku wywołującym (bezpieczne dla Streamlit).
+        Gotowe sekcje można podać w `sections` - piszą się wtedy tylko pozycje z None,
+        a przejścia są wygładzane tylko na początku nowo napisanych sekcji.
+        Sekcje pisane jednocześnie dzielą budżet słów po równo, bez korekty między sobą.
+        """
+        self.budget_for(title, outline)  # jeden budżet dla wszystkich wątków
+        sections = list(sections) if sections is not None else [None] * len(outline)
+        pending = [i for i, section in enumerate(sections) if section is None]
+        with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(pending) or 1))) as executor:
+            futures = {
+                executor.submit(
+                    self.write_section, section_title, i, title, topic, clinic,
+                    outline, self._outline_context(outline, i), context
+                ): i
+                for i, section_title in enumerate(outline) if i in pending
+            }
+            for future in as_completed(futures):
+                i = futures[future]
+                sections[i] = future.result()
+                if on_section_done:
+                    on_section_done(i, sections[i])
+        
+            if smooth_seams and len(sections) > 1:
+                seam_futures = {
+                    executor.submit(self.smooth_seam, sections[i - 1], sections[i], outline[i]): i
+                    for i in pending if i > 0
+                }
+                for future in as_completed(seam_futures):
+                    sections[seam_futures[future]] = future.result()
+        
+        return sections
+    
+    def _outline_context(self, outline: List[str], section_index: int) -> str:
+        return outline_context(outline, section_index)
+    
+    def screen_section(self, section_title: str, section_index: int, title: str, topic: str, clinic: str,
+                       outline: List[str], text: str, context: str = "",
+                       regenerate: Optional[bool] = None) -> str:
+        """Porównuje napisaną sekcję z indeksem powtórzeń i dopisuje ją do indeksu.
+
+        Sekcja podobna do sekcji innego artykułu trafia do `duplicates`, a przy
+        `dedup_regenerate` (albo `regenerate`) jest pisana jeszcze raz (jedna próba)
+        z fragmentem, którego ma nie powtarzać. Zwraca sekcję, która trafi do artykułu.
+        """
+        if self.dedup is None:
+            return text
+        article_key = fingerprint("artykuł", title, topic, clinic, context)
+        signature = self.dedup.signature(text)
+        matches = self.dedup.find(text, article_key, signature)
+        if matches:
+            flag = DuplicateFlag(section_index, section_title, matches[0])
+            self.duplicates.append(flag)
+            if self.dedup_regenerate if regenerate is None else regenerate:
+                messages, max_tokens = self.duplicate_rewrite_messages(flag, title, topic, clinic, outline, context)
+                step = f"sekcja {section_index + 1}: bez powtórzeń"
+                text = trim_to_sentence(self.call_api(messages, max_tokens, step=step,
+                                                      route=section_route(section_index, len(outline))))
+                self._track_budget(self.budget_for(title, outline), section_index, step, text)
+                return self.accept_rewrite(flag, check_response(text, step), title, topic, clinic, context)
+        self.dedup.add(text, article_key, title, section_title, signature)
+        return text
+    
+    def duplicate_rewrite_messages(self, flag: DuplicateFlag, title: str, topic: str, clinic: str,
+                                   outline: List[str], context: str = "") -> Tuple[List[Dict], int]:
+        """Prompt i limit tokenów ponownego napisania sekcji zgłoszonej jako powtórzenie"""
+        budget = self.budget_for(title, outline)
+        words = budget.words_for(flag.index)
+        messages = self._section_messages(flag.heading, flag.index, title, topic, clinic, outline,
+                                          self._outline_context(outline, flag.index), context, words)
+        messages[-1]["content"] += duplicate_note(flag.match.excerpt)
+        return messages, self._ratio(section_route(flag.index, len(outline))).tokens_for(words)
+    
+    def accept_rewrite(self, flag: DuplicateFlag, text: str, title: str, topic: str, clinic: str,
+                       context: str = "") -> str:
+        """Zapisuje przepisaną sekcję w indeksie w miejsce powtórzenia i notuje jej podobieństwo"""
+        article_key = fingerprint("artykuł", title, topic, clinic, context)
+        signature = self.dedup.signature(text)
+        remaining = self.dedup.find(text, article_key, signature)
+        flag.regenerated = True
+        flag.similarity_after = remaining[0].similarity if remaining else 0.0
+        self.dedup.add(text, article_key, title, flag.heading, signature)
+        return text
+    
+    def smooth_seam(self, previous_section: str, section: str, section_title: str) -> str:
+        """Przepisuje pierwszy akapit sekcji tak, by płynnie wynikał z poprzedniej (tanie wywołanie)"""
+        previous_paragraphs = [p for p in previous_section.strip().split("\n\n") if p.strip()]
+        paragraphs = section.strip().split("\n\n")
+        if not previous_paragraphs or not paragraphs[0].strip():
+            return section
+        
+        prompt = seam_prompt(previous_paragraphs[-1], paragraphs[0], section_title)
+        try:
+            rewritten = self.call_api([{"role": "user", "content": prompt}], 300,
+                                      step=f"przejście: {section_title[:30]}", route=ROUTE_REWRITE).strip()
+        except ProviderError:
+            return section  # wygładzanie jest opcjonalne - zostawiamy oryginał
+        if not rewritten:
+            return section
+        return "\n\n".join([rewritten] + paragraphs[1:])
+    
+    def check_style(self, article: str, clinic: str) -> List[StyleIssue]:
+        """Lokalna kontrola: zakazane słowa, zwroty do czytelnika, liczba i miejsce wzmianek o klinice"""
+        section_count = sum(1 for line in article.splitlines() if line.startswith("## "))
+        expected = [i for i in range(section_count) if should_mention_clinic(i, section_count)]
+        clinic_name = clinic_info(clinic)["nazwa"]
+        return get_checker().check(article, clinic_name, expected)
+    
+    def rewrite_sentences(self, items: List[Tuple[str, str]]) -> List[str]:
+        """Przepisuje pojedyncze zdania według poleceń - jedno krótkie wywołanie dla całej listy.
+
+        Zdania, których nie udało się odczytać z odpowiedzi, zostają bez zmian.
+        """
+        if not items:
+            return []
+        prompt = sentence_rewrite_prompt(items)
+        max_tokens = sum(len(sentence) for sentence, _ in items) // 2 + 40 * len(items)
+        try:
+            response = self.call_api([{"role": "user", "content": prompt}], max_tokens, step="poprawki stylu",
+                                     route=ROUTE_REWRITE)
+        except ProviderError:
+            return [sentence for sentence, _ in items]  # poprawki są opcjonalne - zostawiamy oryginał
+        
+        rewritten = {}
+        for line in response.splitlines():
+            match = re.match(r"^\s*(\d+)[.)]\s*(?:\[[^\]]*\]\s*)?(.+)$", line)
+            if match:
+                rewritten[int(match.group(1))] = match.group(2).strip()
+        return [rewritten.get(i, sentence) for i, (sentence, _) in enumerate(items, 1)]
+    
+    def fix_style(self, article: str, clinic: str, issues: Optional[List[StyleIssue]] = None) -> str:
+        """Poprawia tylko zdania wskazane przez kontrolę stylu i wstawia je z powrotem do artykułu"""
+        if issues is None:
+            issues = self.check_style(article, clinic)
+        by_sentence: Dict[int, Tuple[Sentence, List[str]]] = {}
+        for issue in issues:
+            if issue.sentence is None:
+                continue
+            sentence, instructions = by_sentence.setdefault(issue.sentence.start, (issue.sentence, []))
+            instructions.append(issue.instruction)
+        if not by_sentence:
+            return article
+        
+        targets = [by_sentence[start] for start in sorted(by_sentence)]
+        rewritten = self.rewrite_sentences([(sentence.text, "; ".join(instructions))
+                                            for sentence, instructions in targets])
+        return apply_rewrites(article, [(sentence, text) for (sentence, _), text in zip(targets, rewritten)])
+    
+    def _section_messages(self, section_title: str, section_index: int,
+                          title: str, topic: str, clinic: str, outline: List[str],
+                          written_content: str, context: str = "", words: int = 200) -> List[Dict]:
+        """Buduje prompt sekcji: wspólny prefiks + część zależna od sekcji"""
+        prompt = section_prompt(section_title, section_index, clinic, outline, written_content,
+                                self._research_section(section_title, 3), words)
+        return [
+            {"role": "system", "content": article_brief(title, topic, clinic, outline, context)},
+            {"role": "user", "content": prompt}
+        ]
+    
+    def plan_revision(self, title: str, topic: str, clinic: str, outline: List[str], context: str = "",
+                      previous: Optional[ArticleDraft] = None) -> Tuple[ArticleDraft, List[SectionPlan]]:
+        """Nowy szkic artykułu i plan sekcji: które przenieść z `previous`, a które napisać.
+
+        Wstęp jest przenoszony, jeśli tytuł, temat, klinika i kontekst się nie zmieniły.
+        Przenoszone fragmenty od razu pomniejszają budżet słów pisanych sekcji.
+        """
+        draft = ArticleDraft(title, topic, clinic, context)
+        draft.intro_fingerprint = draft.intro_key()
+        draft.intro = reusable_intro(draft, previous) or ""
+        plans = plan_sections(draft, outline, previous, should_mention_clinic)
+        self.duplicates = []
+        
+        budget = self.start_budget(title, outline)
+        if draft.intro:
+            budget.record(-1, draft.intro)
+        for plan in plans:
+            if plan.reuse:
+                budget.record(plan.index, plan.reuse.text)
+        return draft, plans
+    
+    def write_article(self, title: str, topic: str, clinic: str, outline: List[str], context: str = "",
+                      previous: Optional[ArticleDraft] = None, parallel_sections: bool = False,
+                      smooth_seams: bool = False) -> ArticleDraft:
+        """Wstęp i sekcje dla gotowego konspektu.
+
+        Z `previous` (poprzednia wersja artykułu) przenoszone są niezmienione
+        sekcje i wstęp, więc edycja jednego śródtytułu kosztuje jedno wywołanie API.
+        """
+        draft, plans = self.plan_revision(title, topic, clinic, outline, context, previous)
+        if not draft.intro:
+            draft.intro = check_response(self.write_introduction(title, topic, outline, context, clinic), "wstęp")
+        
+        sections = [plan.reuse.text if plan.reuse else None for plan in plans]
+        if parallel_sections:
+            sections = self.write_sections_parallel(title, topic, clinic, outline, context,
+                                                    smooth_seams=smooth_seams, sections=sections)
+        else:
+            full_article = f"# {title}\n\n{draft.intro}\n\n"
+            for i, section_title in enumerate(outline):
+                if sections[i] is None:
+                    sections[i] = self.write_section(section_title, i, title, topic, clinic,
+                                                     outline, full_article, context)
+                full_article += f"## {section_title}\n\n{sections[i]}\n\n"
+        
+        for plan, text in zip(plans, sections):
+            check_response(text, f"sekcja {plan.index + 1}")
+            draft.sections.append(SectionRecord(plan.heading, plan.fingerprint, text, plan.mentions_clinic))
+        return draft
+    
+    def generate_article(self, topic: str, clinic: str, context: str = "",
+                         parallel_sections: bool = False, smooth_seams: bool = False,
+                         fix_style: bool = False, engine: str = "pipeline") -> Dict:
+        """Pełny proces bez interfejsu: konspekt, wstęp, sekcje i opcjonalnie poprawki stylu.
+
+        `engine="structured"` pisze cały artykuł jednym wywołaniem (generate_article_structured).
+        Zgłasza ProviderError dla błędów API i GenerationError dla pustych odpowiedzi.
+        """
+        if engine == "structured":
+            return self.generate_article_structured(topic, clinic, context, fix_style=fix_style)
+        self.usage.reset()
+        self.trace.reset()
+        result = self.create_outline(topic, clinic, context)
+        title = check_response(result["title"], "konspekt")
+        outline = self.outline
+        if not outline:
+            raise GenerationError("konspekt: brak śródtytułów w odpowiedzi")
+        
+        draft = self.write_article(title, topic, clinic, outline, context,
+                                   parallel_sections=parallel_sections, smooth_seams=smooth_seams)
+        if fix_style:
+            draft.update_from_markdown(self.fix_style(draft.render(), clinic))
+        return {"title": title, "outline": outline, "article": draft.render(), "draft": draft,
+                "usage": self.usage.summary()}
+    
+    def _structured_messages(self, topic: str, clinic: str, context: str = "") -> List[Dict]:
+        """Prompt całego artykułu w jednym wywołaniu: tytuł, wstęp i sekcje jako JSON"""
+        research_section = self._research_section(f"{topic} {context}", 5)
+        return [{"role": "user", "content": structured_prompt(topic, clinic, context, research_section)}]
+    
+    def _structured_revision_messages(self, title: str, topic: str, clinic: str, outline: List[str],
+                                      context: str, pending: List[SectionPlan], write_intro: bool) -> List[Dict]:
+        """Prompt wstępu i brakujących sekcji gotowego konspektu - wspólny prefiks jak w trybie sekcji"""
+        budget = self.budget_for(title, outline)
+        lines = []
+        for plan in pending:
+            mention = ", z subtelną wzmianką o klinice" if plan.mentions_clinic else ""
+            lines.append(f'- "{plan.heading}" (około {budget.words_for(plan.index)} słów{mention})')
+        research_section = "".join(self._research_section(plan.heading, 2) for plan in pending)
+        if write_intro:
+            intro = (f"Wstęp: 2-3 zdania (około {budget.words_for(-1)} słów), zaczyna się hookiem - faktem, "
+                     f"pytaniem retorycznym lub zaskakującą informacją.")
+        else:
+            intro = 'Wstęp już istnieje - pole "intro" zostaw puste.'
+        
+        prompt = structured_revision_prompt(title, intro, lines, research_section)
+        return [
+            {"role": "system", "content": article_brief(title, topic, clinic, outline, context)},
+            {"role": "user", "content": prompt}
+        ]
+    
+    def _structured_call(self, messages: List[Dict], max_tokens: int, stream: bool = False,
+                         on_part: Optional[Callable[[ArticlePart], None]] = None) -> StructuredArticle:
+        """Jedno wywołanie ze schematem artykułu; gotowe części trafiają do `on_part` w trakcie odbioru"""
+        step = "artykuł (JSON)"
+        reader = ArticleStream()
+        if stream:
+            chunks = self.stream_api(messages, max_tokens, step=step, schema=ARTICLE_SCHEMA, route=ROUTE_ARTICLE)
+        else:
+            chunks = [self.call_api(messages, max_tokens, step=step, schema=ARTICLE_SCHEMA, route=ROUTE_ARTICLE)]
+        for chunk in chunks:
+            for part in reader.feed(chunk):
+                if on_part:
+                    on_part(part)
+        try:
+            return parse_article(reader.buffer)
+        except StructuredOutputError as e:
+            raise GenerationError(f"{step}: {e}") from e
+    
+    def write_article_structured(self, title: str, topic: str, clinic: str, outline: List[str], context: str = "",
+                                 previous: Optional[ArticleDraft] = None, stream: bool = False,
+                                 on_part: Optional[Callable[[ArticlePart], None]] = None) -> ArticleDraft:
+        """Jak write_article, ale wstęp i wszystkie sekcje do napisania powstają w jednym wywołaniu.
+
+        Indeksy sekcji przekazywanych do `on_part` odnoszą się do `outline`.
+        """
+        draft, plans = self.plan_revision(title, topic, clinic, outline, context, previous)
+        pending = [plan for plan in plans if plan.reuse is None]
+        sections = [plan.reuse.text if plan.reuse else None for plan in plans]
+        
+        if pending or not draft.intro:
+            budget = self.budget_for(title, outline)
+            words = sum(budget.words_for(plan.index) for plan in pending)
+            if not draft.intro:
+                words += budget.words_for(-1)
+            
+            def forward(part: ArticlePart):
+                if part.kind == "section":
+                    if part.index >= len(pending):
+                        return
+                    plan = pending[part.index]
+                    part = ArticlePart("section", part.text, plan.heading, plan.index)
+                elif part.kind == "intro" and draft.intro:
+                    return
+                if on_part:
+                    on_part(part)
+            
+            messages = self._structured_revision_messages(title, topic, clinic, outline, context,
+                                                          pending, not draft.intro)
+            max_tokens = self._ratio(ROUTE_ARTICLE).tokens_for(words) + JSON_OVERHEAD_TOKENS
+            article = self._structured_call(messages, max_tokens, stream, forward)
+            if not draft.intro:
+                draft.intro = check_response(article.intro, "wstęp")
+                budget.record(-1, draft.intro)
+            for plan, (_, text) in zip(pending, article.sections):
+                sections[plan.index] = self.screen_section(plan.heading, plan.index, title, topic, clinic,
+                                                           outline, text, context)
+                budget.record(plan.index, sections[plan.index])
+        
+        for plan, text in zip(plans, sections):
+            check_response(text, f"sekcja {plan.index + 1}")
+            draft.sections.append(SectionRecord(plan.heading, plan.fingerprint, text, plan.mentions_clinic))
+        return draft
+    
+    def generate_article_structured(self, topic: str, clinic: str, context: str = "", stream: bool = False,
+                                    fix_style: bool = False,
+                                    on_part: Optional[Callable[[ArticlePart], None]] = None) -> Dict:
+        """Tytuł, wstęp i sekcje jednym wywołaniem ze schematem JSON - alternatywa dla generate_article.
+
+        Zwraca te same pola co generate_article oraz `problems` z lokalnej walidacji
+        (liczba sekcji, puste pola, długość). Gotowe części trafiają do `on_part`.
+        """
+        self.usage.reset()
+        self.trace.reset()
+        max_tokens = self._ratio(ROUTE_ARTICLE).tokens_for(ARTICLE_WORD_TARGET) + JSON_OVERHEAD_TOKENS
+        article = self._structured_call(self._structured_messages(topic, clinic, context), max_tokens,
+                                        stream, on_part)
+        return self.assemble_structured(article, topic, clinic, context, fix_style)
+    
+    def assemble_structured(self, article: StructuredArticle, topic: str, clinic: str, context: str = "",
+                            fix_style: bool = False, regenerate: Optional[bool] = None) -> Dict:
+        """Szkic i wynik jak z generate_article_structured z gotowej odpowiedzi JSON (także z Batch API)"""
+        problems = validate_article(article)
+        title = check_response(article.title, "artykuł (JSON): tytuł")
+        if not article.sections:
+            raise GenerationError("artykuł (JSON): brak sekcji w odpowiedzi")
+        
+        self.title, self.outline = title, article.outline
+        draft, plans = self.plan_revision(title, topic, clinic, article.outline, context)
+        draft.intro = check_response(article.intro, "wstęp")
+        for plan, (_, text) in zip(plans, article.sections):
+            check_response(text, f"sekcja {plan.index + 1}")
+            text = self.screen_section(plan.heading, plan.index, title, topic, clinic, article.outline, text, context,
+                                       regenerate)
+            draft.sections.append(SectionRecord(plan.heading, plan.fingerprint, text, plan.mentions_clinic))
+        if fix_style:
+            draft.update_from_markdown(self.fix_style(draft.render(), clinic))
+        return {"title": title, "outline": article.outline, "article": draft.render(), "draft": draft,
+                "usage": self.usage.summary(), "problems": problems}